@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 import os
+from importlib.util import find_spec
 
 from django.utils.translation import gettext_lazy as _
 
@@ -44,12 +45,14 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_extensions',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
     'user',
     'recipe',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
@@ -96,6 +99,65 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+# Use a shared backend (e.g. memcached) when running several processes
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Local memory is kept by each process, so a change made in one process
+# doesn't invalidate what the others cached. Responses are only cached
+# when every process reads the same cache.
+CACHE_SHARED = CACHES['default']['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+# MessagePack is negotiated only when the msgpack package is installed
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+if find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append(
+        'core.renderers.MessagePackRenderer'
+    )
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append(
+        'core.parsers.MessagePackParser'
+    )
+
+# Password hashing
+# https://docs.djangoproject.com/en/3.1/topics/auth/passwords/
+# New passwords are hashed with the first hasher, and passwords hashed
+# with the others are hashed again with it on login.
+
+PASSWORD_HASHERS = [
+    'core.hashers.ScryptPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -141,4 +203,7 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Images sent in chunks are kept here until complete
+CHUNKED_UPLOAD_DIR = '/vol/web/uploads'
+
 AUTH_USER_MODEL = 'core.User'
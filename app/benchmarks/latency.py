@@ -0,0 +1,216 @@
+import io
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+from django.db import connection, connections
+from django.test import Client
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from benchmarks.utils import percentile
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def sample_image():
+    """Return a small JPEG file to upload"""
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), (40, 120, 200)).save(buffer, format='JPEG')
+    buffer.name = 'bench.jpg'
+    buffer.seek(0)
+
+    return buffer
+
+
+class ClientTransport:
+    """Send requests through the Django test client, counting queries"""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def request(self, method, path, token=None, data=None, files=False):
+        """Send a request, returning the status code and number of queries"""
+        if not hasattr(self.local, 'client'):
+            self.local.client = Client()
+        client = self.local.client
+        extra = {'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}
+        kwargs = {}
+        if method == 'POST':
+            kwargs['content_type'] = \
+                MULTIPART_CONTENT if files else 'application/json'
+            if not files:
+                data = json.dumps(data)
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method.lower())(
+                path, data, **kwargs, **extra
+            )
+            if response.streaming:
+                b''.join(response.streaming_content)
+
+        return response.status_code, len(queries), response
+
+    def close(self):
+        connections.close_all()
+
+
+class HTTPTransport:
+    """Send requests to a running server over HTTP"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, token=None, data=None, files=False):
+        """Send a request, returning the status code and no query count"""
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        body = None
+        if method == 'POST':
+            if files:
+                body = encode_multipart(BOUNDARY, data)
+                headers['Content-Type'] = MULTIPART_CONTENT
+            else:
+                body = json.dumps(data).encode('utf-8')
+                headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(
+            self.base_url + path, data=body, headers=headers, method=method
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                content = response.read()
+                status = response.status
+        except urllib.error.HTTPError as error:
+            content = error.read()
+            status = error.code
+
+        return status, None, _HTTPResponse(content)
+
+    def close(self):
+        pass
+
+
+class _HTTPResponse:
+    """Body of an HTTP response, decoded like a test client response"""
+
+    def __init__(self, content):
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def summarize(latencies, queries, errors, seconds):
+    """Return latency percentiles, a histogram and throughput of a run"""
+    milliseconds = [latency * 1000 for latency in latencies]
+    histogram = {}
+    for bound in HISTOGRAM_BUCKETS_MS + (None,):
+        histogram[f'le_{bound}' if bound else 'inf'] = 0
+    for value in milliseconds:
+        for bound in HISTOGRAM_BUCKETS_MS:
+            if value <= bound:
+                histogram[f'le_{bound}'] += 1
+                break
+        else:
+            histogram['inf'] += 1
+
+    summary = {
+        'requests': len(milliseconds),
+        'errors': errors,
+        'p50_ms': round(percentile(milliseconds, 50), 3),
+        'p95_ms': round(percentile(milliseconds, 95), 3),
+        'p99_ms': round(percentile(milliseconds, 99), 3),
+        'mean_ms': round(sum(milliseconds) / len(milliseconds), 3),
+        'max_ms': round(max(milliseconds), 3),
+        'throughput_rps': round(len(milliseconds) / seconds, 1),
+        'histogram_ms': histogram,
+        'queries_mean': None,
+        'queries_max': None,
+    }
+    if queries:
+        summary['queries_mean'] = round(sum(queries) / len(queries), 2)
+        summary['queries_max'] = max(queries)
+
+    return summary
+
+
+def run(transport, make_request, requests, concurrency):
+    """Send requests from concurrent clients and summarize them
+
+    `make_request(i)` returns the method, path, token, data and whether the
+    data holds files of the i-th request. Responses with a status of 400
+    or more count as errors.
+    """
+    latencies = []
+    queries = []
+    errors = []
+    lock = threading.Lock()
+    numbers = count()
+
+    def client():
+        try:
+            while True:
+                with lock:
+                    i = next(numbers)
+                if i >= requests:
+                    return
+                method, path, token, data, files = make_request(i)
+                start = time.perf_counter()
+                status, query_count, _ = transport.request(
+                    method, path, token, data, files
+                )
+                latency = time.perf_counter() - start
+                with lock:
+                    latencies.append(latency)
+                    if query_count is not None:
+                        queries.append(query_count)
+                    if status >= 400:
+                        errors.append(status)
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                transport.close()
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        client()
+    else:
+        with ThreadPoolExecutor(concurrency) as executor:
+            for future in [executor.submit(client)
+                           for _ in range(concurrency)]:
+                future.result()
+    seconds = time.perf_counter() - start
+
+    return summarize(latencies, queries, len(errors), seconds)
+
+
+def compare(results, baseline, threshold):
+    """Return the regressions of results against a baseline
+
+    A scenario regresses when its p95 latency grows by more than
+    `threshold` percent or it runs more queries per request on average.
+    """
+    regressions = []
+    for name, current in results['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if before is None:
+            continue
+
+        if before['p95_ms'] and current['p95_ms'] > \
+                before['p95_ms'] * (1 + threshold / 100):
+            change = (current['p95_ms'] / before['p95_ms'] - 1) * 100
+            regressions.append(
+                f'{name}: p95 {before["p95_ms"]:.2f} ms -> '
+                f'{current["p95_ms"]:.2f} ms (+{change:.0f}%)'
+            )
+        if None not in (before['queries_mean'], current['queries_mean']) \
+                and current['queries_mean'] > before['queries_mean']:
+            regressions.append(
+                f'{name}: {before["queries_mean"]} -> '
+                f'{current["queries_mean"]} queries per request'
+            )
+
+    return regressions
@@ -0,0 +1,269 @@
+import json
+import random
+import tempfile
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from benchmarks.latency import (
+    ClientTransport, HTTPTransport, compare, run, sample_image
+)
+from benchmarks.seed import SEED_PASSWORD, seed_users
+from core.models import Tag, Ingredient, Recipe
+
+TOKEN_URL = reverse('user:token')
+ME_URL = reverse('user:me')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def _get(url, **params):
+    """Return a GET request on a URL with query parameters"""
+    if params:
+        url = f'{url}?{urlencode(params)}'
+
+    return 'GET', url, True, None, False
+
+
+def _ids(values):
+    return ','.join(map(str, values))
+
+
+# Requests of each scenario, built from the context of a seeded user
+SCENARIOS = {
+    'token': lambda user: (
+        'POST', TOKEN_URL, False,
+        {'email': user['email'], 'password': SEED_PASSWORD}, False
+    ),
+    'me': lambda user: _get(ME_URL),
+    'tags': lambda user: _get(TAGS_URL),
+    'tags-assigned': lambda user: _get(TAGS_URL, assigned_only=1),
+    'tags-by-usage': lambda user: _get(TAGS_URL, ordering='-usage'),
+    'tags-fuzzy': lambda user: _get(TAGS_URL, q=user['tag_typo']),
+    'ingredients': lambda user: _get(INGREDIENTS_URL),
+    'ingredients-min-usage': lambda user: _get(
+        INGREDIENTS_URL, min_usage=10
+    ),
+    'recipes': lambda user: _get(RECIPES_URL),
+    'recipes-fields': lambda user: _get(RECIPES_URL, fields='id,title'),
+    'recipes-expand': lambda user: _get(
+        RECIPES_URL, expand='tags,ingredients'
+    ),
+    'recipes-tags': lambda user: _get(
+        RECIPES_URL, tags=_ids(user['tag_ids'])
+    ),
+    'recipes-ingredients-all': lambda user: _get(
+        RECIPES_URL, ingredients_all=_ids(user['ingredient_ids'])
+    ),
+    'recipes-search': lambda user: _get(RECIPES_URL, search=user['word']),
+    'recipes-fuzzy': lambda user: _get(RECIPES_URL, q=user['word']),
+    'recipe-detail': lambda user: _get(
+        reverse('recipe:recipe-detail', args=[user['recipe_id']])
+    ),
+    'upload-image': lambda user: (
+        'POST',
+        reverse('recipe:recipe-upload-image', args=[user['recipe_id']]),
+        True, {'image': sample_image()}, True
+    ),
+}
+
+
+class Command(BaseCommand):
+    """Django command to measure the latency of every API endpoint"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server, instead of sending the '
+                 'requests in process through the test client',
+        )
+        parser.add_argument(
+            '--prefix', default='perf',
+            help='Email prefix of the seeded users to send requests as',
+        )
+        parser.add_argument(
+            '--users', type=int, default=10,
+            help='Number of users to seed when none exist with the prefix',
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=10000,
+            help='Number of recipes to seed when no users exist',
+        )
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--scenarios',
+            help=f'Comma separated scenarios, out of {", ".join(SCENARIOS)}',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Clear the cache before every request (in process only)',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', help='File to write the results to as JSON',
+        )
+        parser.add_argument(
+            '--baseline', help='Results to compare with, as written by '
+                               '--output',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=20.0,
+            help='Allowed growth of the p95 latency over the baseline, in '
+                 'percent',
+        )
+
+    def _users(self, options):
+        """Return the contexts of the seeded users with recipes"""
+        User = get_user_model()
+        users = User.objects.filter(
+            email__startswith=f'{options["prefix"]}-'
+        ).order_by('pk')
+        if not users.exists():
+            seed_users(
+                options['users'], options['recipes'],
+                prefix=options['prefix'], seed=options['seed'],
+                search_index=True
+            )
+
+        contexts = []
+        for user in users:
+            tags = list(
+                Tag.objects.filter(user=user).order_by('-recipe_count')
+                .values_list('pk', 'name')[:2]
+            )
+            ingredients = list(
+                Ingredient.objects.filter(user=user)
+                .order_by('-recipe_count').values_list('pk', flat=True)[:2]
+            )
+            recipe = Recipe.objects.filter(user=user).order_by('pk').first()
+            if not (tags and ingredients and recipe):
+                continue
+            contexts.append({
+                'email': user.email,
+                'tag_ids': [pk for pk, _ in tags],
+                'tag_typo': tags[0][1][1:],
+                'ingredient_ids': ingredients,
+                'recipe_id': recipe.pk,
+                'word': recipe.title.split()[0],
+            })
+
+        if not contexts:
+            raise CommandError(
+                f'No users prefixed with "{options["prefix"]}" have recipes'
+            )
+
+        return contexts
+
+    def _scenarios(self, options):
+        if not options['scenarios']:
+            return list(SCENARIOS)
+
+        names = options['scenarios'].split(',')
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Unknown scenarios: {", ".join(unknown)}')
+
+        return names
+
+    def _run(self, transport, users, names, options):
+        """Run the scenarios, returning their summaries"""
+        for user in users:
+            status, _, response = transport.request(
+                'POST', TOKEN_URL, data={
+                    'email': user['email'], 'password': SEED_PASSWORD
+                }
+            )
+            if status != 200:
+                raise CommandError(f'Could not log in as {user["email"]}')
+            user['token'] = response.json()['token']
+
+        rng = random.Random(options['seed'])
+        results = {}
+        for name in names:
+            order = [rng.choice(users) for _ in range(options['requests'])]
+
+            def make_request(i):
+                if options['cold']:
+                    cache.clear()
+                method, path, auth, data, files = SCENARIOS[name](order[i])
+                token = order[i]['token'] if auth else None
+
+                return method, path, token, data, files
+
+            results[name] = run(
+                transport, make_request, options['requests'],
+                options['concurrency']
+            )
+            self._report(name, results[name])
+
+        return results
+
+    def _report(self, name, summary):
+        queries = ''
+        if summary['queries_mean'] is not None:
+            queries = f', {summary["queries_mean"]:g} queries'
+        self.stdout.write(
+            f'{name}: p50 {summary["p50_ms"]:.2f} ms, '
+            f'p95 {summary["p95_ms"]:.2f} ms, '
+            f'p99 {summary["p99_ms"]:.2f} ms, '
+            f'{summary["throughput_rps"]:.0f} req/s{queries}'
+            + (f', {summary["errors"]} errors' if summary['errors'] else '')
+        )
+
+    def handle(self, *args, **options):
+        if options['cold'] and options['url']:
+            raise CommandError('--cold only works in process')
+
+        names = self._scenarios(options)
+        users = self._users(options)
+        if options['url']:
+            results = self._run(
+                HTTPTransport(options['url']), users, names, options
+            )
+        else:
+            # Requests all run in this process, which shares its cache
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(
+                        DEBUG=False,
+                        ALLOWED_HOSTS=['testserver'],
+                        MEDIA_ROOT=media_root,
+                        CACHE_SHARED=True,
+                    ):
+                results = self._run(ClientTransport(), users, names, options)
+
+        results = {
+            'meta': {
+                'transport': options['url'] or 'test client',
+                'database': connection.vendor,
+                'users': len(users),
+                'recipes': Recipe.objects.filter(
+                    user__email__startswith=f'{options["prefix"]}-'
+                ).count(),
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'cold': options['cold'],
+            },
+            'scenarios': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                regressions = compare(
+                    results, json.load(baseline), options['threshold']
+                )
+            if regressions:
+                raise CommandError(
+                    'Regressions over the baseline:\n' +
+                    '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('No regressions'))
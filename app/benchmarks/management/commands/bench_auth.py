@@ -0,0 +1,111 @@
+import uuid
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from benchmarks.utils import timer
+from recipe.views import TagViewSet
+from user import authentication
+from user.authentication import (
+    AccessTokenAuthentication, CachedTokenAuthentication
+)
+from user.tokens import create_access_token
+
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class Command(BaseCommand):
+    """Django command to compare the cost of token authentication"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=5000,
+            help='Number of requests authenticated in each scenario',
+        )
+
+    def _measure(self, call, before, count):
+        """Return the mean seconds and queries of `call`, after `before`"""
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            seconds = 0
+            for _ in range(count):
+                before()
+                with timer() as elapsed:
+                    call()
+                seconds += elapsed['seconds']
+
+        return seconds / count, len(queries) / count
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        user = get_user_model().objects.create_user(
+            f'bench-{uuid.uuid4().hex}@example.com'
+        )
+        token = Token.objects.create(user=user)
+        access = create_access_token(user.pk)
+
+        def forget_local():
+            authentication._snapshots.delete(token.key)
+
+        def forget_all():
+            authentication.forget_tokens([token.key])
+
+        scenarios = (
+            ('TokenAuthentication', TokenAuthentication,
+             f'Token {token.key}', lambda: None),
+            ('CachedTokenAuthentication, cold', CachedTokenAuthentication,
+             f'Token {token.key}', forget_all),
+            ('CachedTokenAuthentication, shared cache',
+             CachedTokenAuthentication, f'Token {token.key}', forget_local),
+            ('CachedTokenAuthentication, local', CachedTokenAuthentication,
+             f'Token {token.key}', lambda: None),
+            ('AccessTokenAuthentication', AccessTokenAuthentication,
+             f'Bearer {access}', lambda: None),
+        )
+        client = Client()
+        try:
+            # Requests all run in this process, which shares its cache
+            with override_settings(
+                DEBUG=False, ALLOWED_HOSTS=['testserver'], CACHE_SHARED=True
+            ):
+                for name, backend, header, before in scenarios:
+                    request = APIRequestFactory().get(
+                        '/', HTTP_AUTHORIZATION=header
+                    )
+                    cache.clear()
+                    auth_seconds, auth_queries = self._measure(
+                        lambda: backend().authenticate(request), before, count
+                    )
+                    with patch.object(
+                        TagViewSet, 'authentication_classes', (backend,)
+                    ):
+                        cache.clear()
+                        client.get(TAGS_URL, HTTP_AUTHORIZATION=header)
+                        seconds, queries = self._measure(
+                            lambda: client.get(
+                                TAGS_URL, HTTP_AUTHORIZATION=header
+                            ),
+                            before, count
+                        )
+                    self.stdout.write(
+                        f'{name}: {auth_seconds * 10 ** 6:.1f} us and '
+                        f'{auth_queries:.2f} queries to authenticate, '
+                        f'{seconds * 10 ** 6:.1f} us and {queries:.2f} '
+                        f'queries per cached tag list request'
+                    )
+        finally:
+            user.delete()
@@ -0,0 +1,75 @@
+import random
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from benchmarks.utils import delete_user, random_names, timer
+from core.models import Tag, Ingredient
+from recipe.views import RecipeViewSet
+
+
+class Command(BaseCommand):
+    """Django command to benchmark creating recipes through the bulk API"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--links', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Keep the benchmark user and its recipes'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        user = get_user_model().objects.create_user(
+            f'bench-{uuid.uuid4().hex}@example.com'
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(user=user, name=name)
+            for name in random_names(100, seed=options['seed'])
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(user=user, name=name)
+            for name in random_names(500, seed=options['seed'] + 1)
+        )
+        tag_ids = [tag.pk for tag in Tag.objects.filter(user=user)]
+        ingredient_ids = [
+            item.pk for item in Ingredient.objects.filter(user=user)
+        ]
+        titles = random_names(options['recipes'], seed=options['seed'])
+        items = [
+            {
+                'title': title,
+                'time_minutes': rng.randint(5, 120),
+                'price': f'{rng.uniform(1, 99):.2f}',
+                'tags': rng.sample(tag_ids, options['links']),
+                'ingredients': rng.sample(ingredient_ids, options['links']),
+            }
+            for title in titles
+        ]
+
+        factory = APIRequestFactory()
+        view = RecipeViewSet.as_view({'post': 'bulk_create'})
+        size = options['batch_size']
+        try:
+            with timer() as elapsed:
+                for start in range(0, len(items), size):
+                    request = factory.post(
+                        '/', items[start:start + size], format='json'
+                    )
+                    force_authenticate(request, user)
+                    res = view(request)
+                    assert res.status_code == 201, res.data
+            self.stdout.write(
+                f'Created {len(items)} recipes with {options["links"]} tags '
+                f'and ingredients each in {elapsed["seconds"]:.2f} s: '
+                f'{len(items) / elapsed["seconds"]:.0f} recipes/s '
+                f'({len(tags)} tags, {len(ingredients)} ingredients)'
+            )
+        finally:
+            if not options['keep']:
+                delete_user(user)
@@ -0,0 +1,97 @@
+import gc
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from benchmarks.seed import seed_user
+from benchmarks.utils import (
+    delete_user, peak_rss_mb, reset_peak_rss, rss_mb, timer
+)
+from core.models import Recipe
+from recipe.export import export_recipes
+from recipe.views import RecipeViewSet
+
+
+class Command(BaseCommand):
+    """Django command to benchmark streaming recipe exports"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000000)
+        parser.add_argument(
+            '--user', type=int,
+            help='Export the recipes of this user instead of creating '
+                 'new ones',
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Keep the benchmark user and its recipes'
+        )
+
+    @override_settings(DEBUG=False)
+    def _measure(self, label, chunks, count):
+        """Consume an export, without the query log kept in DEBUG mode"""
+        gc.collect()
+        reset_peak_rss()
+        start_rss = rss_mb()
+        size = 0
+        with timer() as elapsed:
+            for chunk in chunks:
+                size += len(chunk)
+        self.stdout.write(
+            f'{label}: {count} recipes, {size / 2 ** 20:.0f} MiB in '
+            f'{elapsed["seconds"]:.1f} s ({count / elapsed["seconds"]:.0f} '
+            f'recipes/s), RSS {start_rss:.0f} MiB before, peak '
+            f'{peak_rss_mb():.0f} MiB'
+        )
+
+    def _api_export(self, user, export_format):
+        request = APIRequestFactory().get('/', {'type': export_format})
+        force_authenticate(request, user)
+        response = RecipeViewSet.as_view({'get': 'export'})(request)
+
+        return response.streaming_content
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        created = options['user'] is None
+        if created:
+            user = User.objects.create_user(
+                f'bench-{uuid.uuid4().hex}@example.com'
+            )
+            with timer() as elapsed:
+                seed_user(
+                    user, options['recipes'], tags=100, ingredients=500,
+                    tags_per_recipe=3, ingredients_per_recipe=3,
+                    seed=options['seed']
+                )
+            self.stdout.write(
+                f'Created {options["recipes"]} recipes in '
+                f'{elapsed["seconds"]:.0f} s'
+            )
+        else:
+            user = User.objects.get(pk=options['user'])
+
+        try:
+            queryset = Recipe.objects.filter(user=user)
+            count = queryset.count()
+            for export_format in ('ndjson', 'csv'):
+                self._measure(
+                    f'export_recipes --format {export_format}',
+                    export_recipes(
+                        queryset, export_format, options['chunk_size']
+                    ),
+                    count
+                )
+            self._measure(
+                'GET /recipes/export/?type=ndjson',
+                self._api_export(user, 'ndjson'),
+                count
+            )
+        finally:
+            if created and not options['keep']:
+                delete_user(user)
@@ -0,0 +1,77 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from benchmarks.utils import percentile, peak_rss_mb, random_names, timer
+from core.models import Ingredient
+from recipe.fuzzy import TrigramIndex, fuzzy_filter, has_trigram_support
+
+
+class Command(BaseCommand):
+    """Django command to benchmark typo-tolerant ingredient search"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--user', type=int,
+            help='Also benchmark the database path on this user\'s '
+                 'ingredients (see seed_perf_data)',
+        )
+
+    def _typo(self, rng, name):
+        """Return a name with one character dropped"""
+        position = rng.randrange(len(name))
+        return name[:position] + name[position + 1:]
+
+    def _report(self, label, samples):
+        self.stdout.write(
+            f'{label}: p50 {percentile(samples, 50) * 1000:.2f} ms, '
+            f'p95 {percentile(samples, 95) * 1000:.2f} ms, '
+            f'p99 {percentile(samples, 99) * 1000:.2f} ms'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        names = random_names(options['rows'], seed=options['seed'])
+        queries = [
+            self._typo(rng, rng.choice(names))
+            for _ in range(options['queries'])
+        ]
+
+        with timer() as built:
+            index = TrigramIndex(enumerate(names))
+        self.stdout.write(
+            f'In-process index over {len(names)} rows: built in '
+            f'{built["seconds"]:.1f} s, peak RSS {peak_rss_mb():.0f} MiB'
+        )
+
+        samples = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query)
+            samples.append(time.perf_counter() - start)
+        self._report('In-process index search', samples)
+
+        if options['user'] is None:
+            return
+
+        queryset = Ingredient.objects.filter(user_id=options['user'])
+        backend = 'pg_trgm' if has_trigram_support(connection) \
+            else 'in-process index'
+        names = list(queryset.values_list('name', flat=True)[:1000])
+        samples = []
+        for query in queries:
+            query = self._typo(rng, rng.choice(names)) if names else query
+            start = time.perf_counter()
+            list(fuzzy_filter(
+                queryset, 'name', query, options['user']
+            ).order_by('-similarity')[:20])
+            samples.append(time.perf_counter() - start)
+        self._report(
+            f'Database search over {queryset.count()} rows ({backend})',
+            samples
+        )
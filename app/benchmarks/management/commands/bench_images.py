@@ -0,0 +1,80 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageOps
+
+from benchmarks.utils import timer
+from recipe import images
+
+
+def photo(width, height, seed):
+    """Return the bytes of a JPEG photo-like image"""
+    gradient = Image.radial_gradient('L').resize((width, height))
+    noise = Image.effect_noise((width, height), 30 + seed % 10)
+    image = Image.merge('RGB', (gradient, noise, gradient.rotate(90)))
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=90)
+
+    return output.getvalue()
+
+
+def render_naively(source):
+    """Return the variants of an image resized from its full size"""
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+    variants = {}
+    for name, (longest, image_format) in images.VARIANTS.items():
+        variant = image.resize(
+            images._fit(image.size, longest), Image.LANCZOS
+        )
+        output = io.BytesIO()
+        variant.save(
+            output, image_format, **images.SAVE_OPTIONS[image_format]
+        )
+        variants[name] = (output.getvalue(), image_format)
+
+    return variants
+
+
+class Command(BaseCommand):
+    """Django command to measure the throughput of image variants"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--images', type=int, default=20)
+        parser.add_argument('--width', type=int, default=4032)
+        parser.add_argument('--height', type=int, default=3024)
+        parser.add_argument(
+            '--workers', type=int, default=images.MAX_WORKERS,
+            help='Threads making variants at once',
+        )
+
+    def handle(self, *args, **options):
+        sources = [
+            photo(options['width'], options['height'], seed)
+            for seed in range(options['images'])
+        ]
+        workers = options['workers']
+        cores = min(workers, os.cpu_count() or 1)
+        self.stdout.write(
+            f'{len(sources)} {options["width"]}x{options["height"]} JPEGs '
+            f'of {sum(map(len, sources)) / len(sources) / 2 ** 20:.1f} MiB, '
+            f'{workers} threads on {cores} cores'
+        )
+
+        for name, render in (
+            ('full size resize', render_naively),
+            ('draft and reduce', images.render_variants),
+        ):
+            with ThreadPoolExecutor(max_workers=workers) as executor, \
+                    timer() as elapsed:
+                list(executor.map(
+                    lambda data: render(io.BytesIO(data)), sources
+                ))
+            rate = len(sources) / elapsed['seconds']
+            self.stdout.write(
+                f'{name}: {rate:.1f} images/s, {rate / cores:.1f} images/s '
+                f'per core'
+            )
@@ -0,0 +1,88 @@
+import json
+import random
+import tempfile
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from benchmarks.utils import delete_user, random_names, random_word, timer
+from recipe.importer import import_recipes
+
+
+class Command(BaseCommand):
+    """Django command to benchmark importing recipes from NDJSON"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=4)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def _write_input(self, output, users, count, seed):
+        """Write recipes with three tags and ingredients each as NDJSON"""
+        rng = random.Random(seed)
+        tags = [f'{random_word(rng)} {i}' for i in range(100)]
+        ingredients = [f'{random_word(rng)} {i}' for i in range(500)]
+        for i, title in enumerate(random_names(count, seed=seed)):
+            output.write(json.dumps({
+                'user': users[i % len(users)].id,
+                'title': title,
+                'time_minutes': rng.randint(5, 120),
+                'price': f'{rng.uniform(1, 99):.2f}',
+                'tags': rng.sample(tags, 3),
+                'ingredients': rng.sample(ingredients, 3),
+            }) + '\n')
+        output.flush()
+
+    @override_settings(DEBUG=False)
+    def _measure(self, label, run, options):
+        """Import recipes of new users with `run` and delete them after"""
+        users = [
+            get_user_model().objects.create_user(
+                f'bench-{uuid.uuid4().hex}@example.com'
+            )
+            for _ in range(options['users'])
+        ]
+        count = options['recipes']
+        try:
+            with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as output:
+                self._write_input(output, users, count, options['seed'])
+                with timer() as elapsed:
+                    run(output.name)
+            self.stdout.write(
+                f'{label}: {count} recipes in {elapsed["seconds"]:.1f} s '
+                f'({count / elapsed["seconds"]:.0f} recipes/s)'
+            )
+        finally:
+            for user in users:
+                delete_user(user)
+
+    def _import(self, path, batch_size, use_copy):
+        with open(path) as lines:
+            import_recipes(lines, batch_size=batch_size, use_copy=use_copy)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for label, use_copy in (('COPY', True), ('bulk_create', False)):
+            self._measure(
+                f'{label}, 1 process',
+                lambda path: self._import(path, batch_size, use_copy),
+                options
+            )
+
+        workers = options['workers']
+        self._measure(
+            f'COPY, {workers} processes',
+            lambda path: call_command(
+                'import_recipes',
+                input=path,
+                batch_size=batch_size,
+                workers=workers,
+                stdout=self.stderr,
+            ),
+            options
+        )
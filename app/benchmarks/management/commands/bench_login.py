@@ -0,0 +1,136 @@
+import asyncio
+import json
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import AsyncRequestFactory, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import force_authenticate
+
+from benchmarks.utils import percentile, timer
+from core.offload import offload
+from recipe.views import TagViewSet
+from user.views import CreateTokenView
+
+CREATE_USER_URL = reverse('user:create')
+TOKEN_URL = reverse('user:token')
+TAGS_URL = reverse('recipe:tag-list')
+
+HASHERS = (
+    ('PBKDF2', 'django.contrib.auth.hashers.PBKDF2PasswordHasher'),
+    ('scrypt', 'core.hashers.ScryptPasswordHasher'),
+)
+PASSWORD = 'bench-password'
+
+
+def _asgi_post(path, data):
+    """Return an ASGI request posting JSON"""
+    body = json.dumps(data).encode()
+    # Django 3.1.1's AsyncRequestFactory sets a wrong Content-Length
+    return AsyncRequestFactory().post(
+        path, body, content_type='application/json',
+        headers=[
+            (b'host', b'testserver'),
+            (b'content-length', str(len(body)).encode()),
+            (b'content-type', b'application/json'),
+        ]
+    )
+
+
+class Command(BaseCommand):
+    """Django command to measure login and signup throughput"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Number of logins and of signups with each hasher',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=8,
+            help='Concurrent logins in the ASGI login storm',
+        )
+
+    def _throughput(self, name, emails):
+        """Time sequential signups then logins with these emails"""
+        client = Client()
+        for url in (CREATE_USER_URL, TOKEN_URL):
+            with timer() as elapsed:
+                for email in emails:
+                    res = client.post(url, {
+                        'email': email, 'password': PASSWORD
+                    })
+                    assert res.status_code in (200, 201), res.content
+            self.stdout.write(
+                f'{name} {url}: {len(emails) / elapsed["seconds"]:.1f} '
+                f'requests/s'
+            )
+
+    async def _storm(self, login, user, email, logins, concurrency):
+        """Return tag list latencies in seconds during a login storm"""
+        tags = sync_to_async(
+            TagViewSet.as_view({'get': 'list'}), thread_sensitive=True
+        )
+        remaining = list(range(logins))
+        latencies = []
+
+        async def log_in():
+            while remaining:
+                remaining.pop()
+                res = await login(
+                    _asgi_post(TOKEN_URL, {
+                        'email': email, 'password': PASSWORD
+                    })
+                )
+                assert res.status_code == 200
+
+        async def list_tags():
+            while remaining:
+                request = AsyncRequestFactory().get(TAGS_URL)
+                force_authenticate(request, user)
+                with timer() as elapsed:
+                    await tags(request)
+                latencies.append(elapsed['seconds'])
+
+        await asyncio.gather(
+            list_tags(), *(log_in() for _ in range(concurrency))
+        )
+
+        return latencies
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        prefix = f'bench-{uuid.uuid4().hex}'
+        try:
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+                for name, hasher in HASHERS:
+                    with override_settings(PASSWORD_HASHERS=[hasher]):
+                        self._throughput(name, [
+                            f'{prefix}-{name}-{i}@example.com'
+                            for i in range(options['requests'])
+                        ])
+
+                email = f'{prefix}-storm@example.com'
+                user = User.objects.create_user(email, PASSWORD)
+                view = CreateTokenView.as_view()
+                for name, login in (
+                    ('sync', sync_to_async(view, thread_sensitive=True)),
+                    ('offloaded', offload(view)),
+                ):
+                    with timer() as elapsed:
+                        latencies = asyncio.run(self._storm(
+                            login, user, email, options['requests'],
+                            options['concurrency']
+                        ))
+                    self.stdout.write(
+                        f'ASGI login storm, {name}: '
+                        f'{options["requests"] / elapsed["seconds"]:.1f} '
+                        f'logins/s, tag list p50 '
+                        f'{percentile(latencies, 50) * 1000:.1f} ms, p95 '
+                        f'{percentile(latencies, 95) * 1000:.1f} ms '
+                        f'({len(latencies)} requests)'
+                    )
+        finally:
+            User.objects.filter(email__startswith=prefix).delete()
@@ -0,0 +1,86 @@
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from benchmarks.seed import seed_user
+from benchmarks.utils import delete_user, timer
+from core.models import Recipe
+from core.renderers import FastJSONRenderer, MessagePackRenderer, msgpack
+from recipe import serializers
+from recipe.rows import RowSerializer
+
+
+class Command(BaseCommand):
+    """Django command to compare the render time of large recipe lists"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--user', type=int,
+            help='Render the recipes of this user instead of creating '
+                 'new ones',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Number of renders of each list, the best one counting',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def _lists(self, user, recipes):
+        """Return the recipe lists to render, by name"""
+        queryset = Recipe.objects.filter(user=user).order_by('-id')[:recipes]
+        lists = {}
+        for name, serializer_class in (
+            ('recipes', serializers.RecipeSerializer),
+            ('expanded recipes', serializers.RecipeDetailSerializer),
+        ):
+            row_serializer = RowSerializer.compile(serializer_class())
+            lists[name] = row_serializer.serialize(
+                list(row_serializer.values(queryset))
+            )
+
+        return lists
+
+    def _measure(self, name, data, repeat):
+        renderers = [JSONRenderer(), FastJSONRenderer()]
+        if msgpack is not None:
+            renderers.append(MessagePackRenderer())
+
+        baseline = None
+        for renderer in renderers:
+            best = None
+            for _ in range(repeat):
+                with timer() as elapsed:
+                    body = renderer.render(data)
+                best = min(best or elapsed['seconds'], elapsed['seconds'])
+            baseline = baseline or best
+            self.stdout.write(
+                f'{name}, {type(renderer).__name__}: {len(data)} rows, '
+                f'{len(body) / 2 ** 20:.1f} MiB in {best * 1000:.1f} ms '
+                f'({len(data) / best:,.0f} rows/s, {baseline / best:.1f}x)'
+            )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        created = options['user'] is None
+        if created:
+            user = User.objects.create_user(
+                f'bench-{uuid.uuid4().hex}@example.com'
+            )
+            seed_user(
+                user, options['recipes'], tags=100, ingredients=500,
+                tags_per_recipe=3, ingredients_per_recipe=6,
+                seed=options['seed']
+            )
+        else:
+            user = User.objects.get(pk=options['user'])
+
+        try:
+            lists = self._lists(user, options['recipes'])
+            for name, data in lists.items():
+                self._measure(name, data, options['repeat'])
+        finally:
+            if created:
+                delete_user(user)
@@ -0,0 +1,114 @@
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from benchmarks.seed import seed_user
+from benchmarks.utils import delete_user, timer
+from core.models import Recipe
+from recipe import serializers
+from recipe.rows import RowSerializer
+from recipe.views import RecipeViewSet
+
+
+class Command(BaseCommand):
+    """Django command to compare model serializers with row serializers"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument(
+            '--user', type=int,
+            help='Serialize the rows of this user instead of creating '
+                 'new ones',
+        )
+        parser.add_argument(
+            '--page-size', type=int, default=100,
+            help='Rows fetched per query, like a page of a list',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def _instances(self, serializer_class, queryset):
+        if serializer_class.Meta.model is Recipe:
+            queryset = queryset.prefetch_related(
+                *RecipeViewSet().get_prefetches(('tags', 'ingredients'))
+            )
+
+        return queryset
+
+    def _pages(self, queryset, page_size):
+        """Yield consecutive pages of rows or instances, in ID order"""
+        last_id = 0
+        while True:
+            page = list(queryset.filter(pk__gt=last_id)[:page_size])
+            if not page:
+                return
+            yield page
+            last_id = page[-1]['id'] if isinstance(page[-1], dict) \
+                else page[-1].pk
+
+    def _time(self, label, serialize):
+        """Render the pages of serialized rows, reporting rows per second"""
+        renderer = JSONRenderer()
+        count = 0
+        with timer() as elapsed:
+            for page in serialize():
+                renderer.render(page)
+                count += len(page)
+        self.stdout.write(
+            f'{label}: {count} rows in {elapsed["seconds"]:.2f} s '
+            f'({count / elapsed["seconds"]:,.0f} rows/s)'
+        )
+
+    @override_settings(DEBUG=False)
+    def _measure(self, serializer_class, user, page_size):
+        """Serialize a user's rows with and without the model serializer"""
+        model = serializer_class.Meta.model
+        queryset = model.objects.filter(user=user).order_by('pk')
+        instances = self._instances(serializer_class, queryset)
+        row_serializer = RowSerializer.compile(serializer_class())
+        rows = row_serializer.values(queryset)
+        name = serializer_class.__name__
+
+        self._time(f'{name}, serializer, all rows', lambda: [
+            serializer_class(instances, many=True).data
+        ])
+        self._time(f'{name}, rows, all rows', lambda: [
+            row_serializer.serialize(list(rows))
+        ])
+        self._time(f'{name}, serializer, pages of {page_size}', lambda: (
+            serializer_class(page, many=True).data
+            for page in self._pages(instances, page_size)
+        ))
+        self._time(f'{name}, rows, pages of {page_size}', lambda: (
+            row_serializer.serialize(page)
+            for page in self._pages(rows, page_size)
+        ))
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        created = options['user'] is None
+        if created:
+            user = User.objects.create_user(
+                f'bench-{uuid.uuid4().hex}@example.com'
+            )
+            seed_user(
+                user, options['recipes'], tags=1000, ingredients=5000,
+                tags_per_recipe=3, ingredients_per_recipe=6,
+                seed=options['seed']
+            )
+        else:
+            user = User.objects.get(pk=options['user'])
+
+        try:
+            for serializer_class in (
+                serializers.RecipeSerializer,
+                serializers.RecipeDetailSerializer,
+                serializers.TagSerializer,
+                serializers.IngredientSerializer,
+            ):
+                self._measure(serializer_class, user, options['page_size'])
+        finally:
+            if created:
+                delete_user(user)
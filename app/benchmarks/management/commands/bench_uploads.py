@@ -0,0 +1,175 @@
+import gc
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test.utils import override_settings
+from rest_framework import serializers
+from rest_framework.parsers import MultiPartParser
+from rest_framework.test import force_authenticate
+
+from benchmarks.management.commands.bench_images import photo
+from benchmarks.utils import delete_user, peak_rss_mb, reset_peak_rss, rss_mb
+from benchmarks.utils import timer
+from core.models import Recipe
+from recipe import images, uploads
+from recipe.serializers import RecipeImageSerializer
+from recipe.views import RecipeViewSet
+
+BOUNDARY = 'bench-boundary'
+
+
+class Stream:
+    """Request body read from shared bytes, like a socket would be"""
+
+    def __init__(self, *parts):
+        self.parts = [memoryview(part) for part in parts]
+        self.length = sum(len(part) for part in self.parts)
+
+    def read(self, size=-1):
+        while self.parts and not len(self.parts[0]):
+            self.parts.pop(0)
+        if not self.parts:
+            return b''
+        if size < 0:
+            size = len(self.parts[0])
+        chunk = self.parts[0][:size]
+        self.parts[0] = self.parts[0][size:]
+
+        return bytes(chunk)
+
+
+class FormImageSerializer(RecipeImageSerializer):
+    """Recipe image serializer opening images like Django forms"""
+    image = serializers.ImageField(allow_null=True, required=False)
+
+
+class FormUploadViewSet(RecipeViewSet):
+    """Recipe viewset uploading images with Django's upload handlers"""
+    parser_classes = (MultiPartParser,)
+
+    def get_serializer_class(self):
+        return FormImageSerializer
+
+
+def _post(view, user, recipe_id, data):
+    """Post an image to a recipe's upload-image view"""
+    body = Stream(
+        (
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; '
+            f'name="image"; filename="photo.jpg"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n'
+        ).encode(),
+        data,
+        f'\r\n--{BOUNDARY}--\r\n'.encode(),
+    )
+    request = WSGIRequest({
+        'REQUEST_METHOD': 'POST',
+        'PATH_INFO': f'/api/recipes/recipes/{recipe_id}/upload-image/',
+        'CONTENT_TYPE': f'multipart/form-data; boundary={BOUNDARY}',
+        'CONTENT_LENGTH': str(body.length),
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'wsgi.input': body,
+        'wsgi.url_scheme': 'http',
+    })
+    force_authenticate(request, user)
+    close_old_connections()
+    try:
+        response = view(request, pk=recipe_id)
+    finally:
+        request.close()
+        close_old_connections()
+    assert response.status_code == 200, response.data
+
+
+def _send_chunks(recipe_id, data, chunk_size):
+    """Upload an image to a recipe in chunks"""
+    close_old_connections()
+    try:
+        upload = uploads.start_upload(
+            Recipe.objects.get(pk=recipe_id), len(data)
+        )
+        view = memoryview(data)
+        for offset in range(0, len(data), chunk_size):
+            recipe = uploads.append_chunk(
+                upload, offset, Stream(view[offset:offset + chunk_size])
+            )
+        assert recipe is not None
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    """Django command to measure memory use under concurrent uploads"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uploads', type=int, default=32)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--width', type=int, default=2048)
+        parser.add_argument('--height', type=int, default=1536)
+        parser.add_argument('--chunk-size', type=int, default=2 ** 20)
+
+    def handle(self, *args, **options):
+        data = photo(options['width'], options['height'], 0)
+        self.stdout.write(
+            f'{options["uploads"]} {options["width"]}x{options["height"]} '
+            f'JPEGs of {len(data) / 2 ** 20:.1f} MiB, '
+            f'{options["concurrency"]} at once'
+        )
+        user = get_user_model().objects.create_user(
+            f'bench-{uuid.uuid4().hex}@example.com', 'bench-password'
+        )
+        recipe_ids = [
+            Recipe.objects.create(
+                user=user, title=f'Upload {i}', time_minutes=5, price=5
+            ).id
+            for i in range(options['concurrency'])
+        ]
+        streaming = RecipeViewSet.as_view(
+            {'post': 'upload_image'}, **RecipeViewSet.upload_image.kwargs
+        )
+        default = FormUploadViewSet.as_view({'post': 'upload_image'})
+
+        # The streaming methods run first, so that they can't reuse memory
+        # freed by the default one
+        methods = (
+            ('streaming handler', lambda recipe_id: _post(
+                streaming, user, recipe_id, data
+            )),
+            ('resumable chunks', lambda recipe_id: _send_chunks(
+                recipe_id, data, options['chunk_size']
+            )),
+            ('default handlers', lambda recipe_id: _post(
+                default, user, recipe_id, data
+            )),
+        )
+        try:
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(
+                        ALLOWED_HOSTS=['testserver'], MEDIA_ROOT=media_root,
+                        CHUNKED_UPLOAD_DIR=media_root
+                    ), \
+                    patch.object(images, 'schedule_variants'):
+                for name, upload in methods:
+                    gc.collect()
+                    reset_peak_rss()
+                    baseline = rss_mb()
+                    with ThreadPoolExecutor(options['concurrency']) as pool, \
+                            timer() as elapsed:
+                        list(pool.map(upload, (
+                            recipe_ids[i % len(recipe_ids)]
+                            for i in range(options['uploads'])
+                        )))
+                    self.stdout.write(
+                        f'{name}: peak RSS +{peak_rss_mb() - baseline:.1f} '
+                        f'MiB, {options["uploads"] / elapsed["seconds"]:.1f} '
+                        f'uploads/s'
+                    )
+        finally:
+            delete_user(user)
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from benchmarks.seed import BATCH_SIZE, SEED_PASSWORD, seed_users
+from benchmarks.utils import delete_user, timer
+from core.models import Tag, Ingredient, Recipe
+
+
+class Command(BaseCommand):
+    """Django command to create a large data set for benchmarks"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument(
+            '--recipes', type=int, default=100000,
+            help='Total number of recipes, spread over the users',
+        )
+        parser.add_argument(
+            '--tags', type=int, default=50,
+            help='Mean number of tags per user',
+        )
+        parser.add_argument(
+            '--ingredients', type=int, default=200,
+            help='Mean number of ingredients per user',
+        )
+        parser.add_argument(
+            '--tags-per-recipe', type=int, default=2,
+            help='Mean number of tags linked to a recipe',
+        )
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, default=6,
+            help='Mean number of ingredients linked to a recipe',
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.0,
+            help='Zipf exponent of the data per user and of the '
+                 'popularity of tags and ingredients, 0 for uniform',
+        )
+        parser.add_argument(
+            '--images', type=float, default=0.0,
+            help='Fraction of recipes with an image',
+        )
+        parser.add_argument(
+            '--prefix', default='perf',
+            help='Prefix of the email addresses of the users',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--search-index', action='store_true',
+            help='Also build the search documents of the recipes',
+        )
+        parser.add_argument(
+            '--flush', action='store_true',
+            help='First delete the users created before with this prefix',
+        )
+
+    def handle(self, *args, **options):
+        if not 0 <= options['images'] <= 1:
+            raise CommandError('--images must be between 0 and 1')
+
+        User = get_user_model()
+        existing = User.objects.filter(
+            email__startswith=f'{options["prefix"]}-'
+        )
+        if options['flush']:
+            for user in existing:
+                delete_user(user)
+        elif existing.exists():
+            raise CommandError(
+                f'Users prefixed with "{options["prefix"]}" exist already, '
+                f'use --flush to replace them'
+            )
+
+        with timer() as elapsed:
+            users = seed_users(
+                options['users'],
+                options['recipes'],
+                tags=options['tags'],
+                ingredients=options['ingredients'],
+                tags_per_recipe=options['tags_per_recipe'],
+                ingredients_per_recipe=options['ingredients_per_recipe'],
+                skew=options['skew'],
+                images=options['images'],
+                prefix=options['prefix'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+                search_index=options['search_index'],
+            )
+
+        recipes = Recipe.objects.filter(user__in=users)
+        largest = recipes.values('user__email').annotate(
+            count=Count('pk')
+        ).order_by('-count').first()
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(users)} users with {recipes.count()} recipes, '
+            f'{Tag.objects.filter(user__in=users).count()} tags and '
+            f'{Ingredient.objects.filter(user__in=users).count()} '
+            f'ingredients in {elapsed["seconds"]:.1f} s'
+        ))
+        if largest:
+            self.stdout.write(
+                f'Largest user: {largest["user__email"]} with '
+                f'{largest["count"]} recipes, password {SEED_PASSWORD}'
+            )
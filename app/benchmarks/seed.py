@@ -0,0 +1,269 @@
+import io
+import random
+from collections import Counter
+from itertools import accumulate, islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image
+
+from benchmarks.utils import random_names, random_word
+from core.managers import normalize_name
+from core.models import Tag, Ingredient, Recipe
+from core.search import update_search_index
+from recipe.bulk import insert_links, insert_recipes
+from recipe.importer import copy_rows, reserve_ids
+
+SEED_PASSWORD = 'password123'
+BATCH_SIZE = 50000
+
+# Number of distinct recipe titles drawn from
+TITLE_POOL = 100000
+
+PRICES = [f'{cents / 100:.2f}' for cents in range(100, 10000)]
+
+RECIPE_COLUMNS = (
+    'id', 'user_id', 'title', 'time_minutes', 'price', 'link', 'image'
+)
+
+
+def zipf_weights(count, skew):
+    """Return Zipf-like weights of `count` ranks, heaviest first"""
+    return [1 / rank ** skew for rank in range(1, count + 1)]
+
+
+def split(total, weights):
+    """Split a total into integers proportional to the weights"""
+    scale = sum(weights)
+    shares = [total * weight / scale for weight in weights]
+    parts = [int(share) for share in shares]
+    by_remainder = sorted(
+        range(len(shares)), key=lambda i: parts[i] - shares[i]
+    )
+    for i in by_remainder[:total - sum(parts)]:
+        parts[i] += 1
+
+    return parts
+
+
+def plan(users, recipes, tags, ingredients, skew, seed=0):
+    """Return the recipe, tag and ingredient counts of each user
+
+    Counts follow the same Zipf-like skew over users, in a random order,
+    so a few power users own most of the data. Every user gets at least
+    one tag and one ingredient. A skew of 0 spreads data evenly.
+    """
+    weights = zipf_weights(users, skew)
+    random.Random(seed).shuffle(weights)
+
+    return [
+        {
+            'recipes': user_recipes,
+            'tags': max(1, user_tags),
+            'ingredients': max(1, user_ingredients),
+        }
+        for user_recipes, user_tags, user_ingredients in zip(
+            split(recipes, weights),
+            split(tags * users, weights),
+            split(ingredients * users, weights),
+        )
+    ]
+
+
+def placeholder_image(name):
+    """Store a small JPEG to be shared by seeded recipes, returning its name"""
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), (200, 120, 40)).save(buffer, format='JPEG')
+
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def _create_attrs(model, user, count, rng, batch_size):
+    """Create uniquely named tags or ingredients, returning their IDs"""
+    names = [f'{random_word(rng)} {i}' for i in range(count)]
+    model.objects.bulk_create(
+        (
+            model(user=user, name=name, normalized_name=normalize_name(name))
+            for name in names
+        ),
+        batch_size=batch_size
+    )
+
+    return list(
+        model.objects.filter(user=user).order_by('pk')
+        .values_list('pk', flat=True)
+    )
+
+
+def _recipe_rows(rng, count, titles, images, image_name):
+    """Return the title, time, price, link and image of new recipes"""
+    chosen = rng.choices(titles, k=count)
+    minutes = rng.choices(range(5, 121), k=count)
+    prices = rng.choices(PRICES, k=count)
+    linked = rng.choices((False, True), weights=(3, 1), k=count)
+    imaged = rng.choices((False, True), weights=(1 - images, images), k=count)
+
+    return [
+        [
+            title,
+            time_minutes,
+            price,
+            f'https://example.com/{title.replace(" ", "-")}' if link else '',
+            image_name if image else '',
+        ]
+        for title, time_minutes, price, link, image in zip(
+            chosen, minutes, prices, linked, imaged
+        )
+    ]
+
+
+def _pick_links(rng, recipe_ids, attr_ids, cum_weights, mean):
+    """Return (recipe ID, attribute ID) pairs, favouring popular ones"""
+    if not attr_ids or not mean:
+        return []
+
+    sizes = rng.choices(range(2 * mean + 1), k=len(recipe_ids))
+    picks = iter(
+        rng.choices(attr_ids, cum_weights=cum_weights, k=sum(sizes))
+    )
+
+    return [
+        (recipe_id, pk)
+        for recipe_id, size in zip(recipe_ids, sizes)
+        for pk in dict.fromkeys(islice(picks, size))
+    ]
+
+
+def _insert_recipes(connection, user, rows):
+    """Insert recipe rows, with COPY on PostgreSQL, returning their IDs"""
+    if connection.vendor == 'postgresql':
+        ids = reserve_ids(connection, Recipe, len(rows))
+        copy_rows(
+            connection,
+            Recipe._meta.db_table,
+            RECIPE_COLUMNS + ('image_variants',),
+            ([pk, user.pk] + row + ['{}'] for pk, row in zip(ids, rows)),
+            not_null=('title', 'link', 'image')
+        )
+        return ids
+
+    recipes = [
+        Recipe(user=user, **dict(zip(RECIPE_COLUMNS[2:], row)))
+        for row in rows
+    ]
+    insert_recipes(recipes)
+
+    return [recipe.pk for recipe in recipes]
+
+
+def seed_user(user, recipes, tags=50, ingredients=200, tags_per_recipe=2,
+              ingredients_per_recipe=6, skew=1.0, images=0.0,
+              image_name=None, titles=None, seed=0, batch_size=BATCH_SIZE):
+    """Create deterministic recipes, tags and ingredients for a user
+
+    Each recipe links to between none and twice the given mean of tags and
+    ingredients, popular ones being picked far more often following the
+    Zipf-like skew. A fraction `images` of the recipes refer to the stored
+    `image_name`. Rows are inserted in batches without model signals and
+    the recipe counts are set at the end, but the search index and change
+    feed are not maintained.
+    """
+    rng = random.Random(f'{seed}:{user.email}')
+    if titles is None:
+        titles = random_names(min(recipes, TITLE_POOL) or 1, seed=seed)
+
+    attrs = []
+    for field, model, count, mean in (
+        ('tags', Tag, tags, tags_per_recipe),
+        ('ingredients', Ingredient, ingredients, ingredients_per_recipe),
+    ):
+        ids = _create_attrs(model, user, count, rng, batch_size)
+        cum_weights = list(accumulate(zipf_weights(len(ids), skew)))
+        attrs.append((field, model, ids, cum_weights, mean, Counter()))
+
+    connection = connections[Recipe.objects.db]
+    for start in range(0, recipes, batch_size):
+        rows = _recipe_rows(
+            rng, min(batch_size, recipes - start), titles, images, image_name
+        )
+        recipe_ids = _insert_recipes(connection, user, rows)
+        for field, model, ids, cum_weights, mean, counts in attrs:
+            links = _pick_links(rng, recipe_ids, ids, cum_weights, mean)
+            if not links:
+                continue
+            through = getattr(Recipe, field).through
+            column = f'{model._meta.model_name}_id'
+            if connection.vendor == 'postgresql':
+                copy_rows(
+                    connection, through._meta.db_table,
+                    ('recipe_id', column), links
+                )
+            else:
+                insert_links(through, column, links)
+            counts.update(pk for _, pk in links)
+
+    for field, model, ids, cum_weights, mean, counts in attrs:
+        model.objects.add_recipe_counts(counts)
+
+
+def seed_users(users, recipes, tags=50, ingredients=200,
+               tags_per_recipe=2, ingredients_per_recipe=6, skew=1.0,
+               images=0.0, prefix='perf', seed=0, batch_size=BATCH_SIZE,
+               search_index=False):
+    """Create users with recipes, tags and ingredients for benchmarks
+
+    `tags` and `ingredients` are means per user, spread over users like
+    the recipes (see `plan`). Users are named `<prefix>-<seed>-<n>` at
+    example.com, with n from 0, and share the password SEED_PASSWORD. The
+    same arguments always create the same data. Returns the users.
+    """
+    User = get_user_model()
+    password = make_password(SEED_PASSWORD)
+    emails = [f'{prefix}-{seed}-{n}@example.com' for n in range(users)]
+    User.objects.bulk_create(
+        User(email=email, password=password) for email in emails
+    )
+    by_email = User.objects.in_bulk(emails, field_name='email')
+    created = [by_email[email] for email in emails]
+
+    image_name = None
+    if images:
+        image_name = placeholder_image(f'uploads/recipe/seed-{seed}.jpg')
+
+    titles = random_names(min(recipes, TITLE_POOL) or 1, seed=seed)
+    for user, counts in zip(
+        created, plan(users, recipes, tags, ingredients, skew, seed)
+    ):
+        with transaction.atomic():
+            seed_user(
+                user,
+                counts['recipes'],
+                tags=counts['tags'],
+                ingredients=counts['ingredients'],
+                tags_per_recipe=tags_per_recipe,
+                ingredients_per_recipe=ingredients_per_recipe,
+                skew=skew,
+                images=images,
+                image_name=image_name,
+                titles=titles,
+                seed=seed,
+                batch_size=batch_size,
+            )
+
+    if search_index:
+        recipes = Recipe.objects.filter(user__in=created).order_by('pk')
+        last_id = 0
+        while True:
+            ids = list(
+                recipes.filter(pk__gt=last_id)
+                .values_list('pk', flat=True)[:1000]
+            )
+            if not ids:
+                break
+            update_search_index(ids)
+            last_id = ids[-1]
+
+    return created
@@ -0,0 +1,69 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from benchmarks.latency import compare, summarize
+from benchmarks.seed import seed_users
+
+
+class LatencyTests(TestCase):
+    """Test the API latency benchmark"""
+
+    def test_summarize(self):
+        """Test latency percentiles, histogram and throughput"""
+        summary = summarize(
+            [0.001 * i for i in range(1, 101)], [2, 4], 1, seconds=2
+        )
+
+        self.assertEqual(summary['requests'], 100)
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['p50_ms'], 51)
+        self.assertEqual(summary['p99_ms'], 100)
+        self.assertEqual(summary['throughput_rps'], 50)
+        self.assertEqual(summary['queries_mean'], 3)
+        self.assertEqual(summary['histogram_ms']['le_1'], 1)
+        self.assertEqual(summary['histogram_ms']['le_100'], 50)
+        self.assertEqual(sum(summary['histogram_ms'].values()), 100)
+
+    def test_compare(self):
+        """Test finding latency and query count regressions"""
+        def results(p95, queries):
+            return {'scenarios': {'tags': {
+                'p95_ms': p95, 'queries_mean': queries
+            }}}
+
+        self.assertEqual(compare(results(11, 3), results(10, 3), 20), [])
+        self.assertEqual(len(compare(results(13, 3), results(10, 3), 20)), 1)
+        self.assertEqual(len(compare(results(10, 4), results(10, 3), 20)), 1)
+        self.assertEqual(compare(results(99, 9), {'scenarios': {}}, 20), [])
+
+    def test_bench_api(self):
+        """Test measuring every scenario and comparing with a baseline"""
+        seed_users(2, 20, tags=3, ingredients=5, search_index=True)
+        out = StringIO()
+
+        with tempfile.NamedTemporaryFile('r') as output:
+            call_command(
+                'bench_api', requests=3, concurrency=1, output=output.name,
+                stdout=out
+            )
+            results = json.load(output)
+
+            with self.assertRaisesMessage(CommandError, 'Regressions'):
+                call_command(
+                    'bench_api', requests=3, concurrency=1,
+                    scenarios='recipes', baseline=output.name, threshold=-100,
+                    stdout=StringIO()
+                )
+
+        self.assertIn('recipes-search: p50', out.getvalue())
+        scenarios = results['scenarios']
+        self.assertIn('upload-image', scenarios)
+        for name, summary in scenarios.items():
+            self.assertEqual(summary['errors'], 0, name)
+            self.assertEqual(summary['requests'], 3)
+        self.assertGreater(scenarios['recipes']['queries_mean'], 0)
@@ -0,0 +1,81 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
+from django.test import TestCase
+
+from benchmarks.seed import SEED_PASSWORD, plan, seed_users
+from core.models import Tag, Ingredient, Recipe
+
+
+class SeedTests(TestCase):
+    """Test generating data sets for benchmarks"""
+
+    def test_plan_is_skewed(self):
+        """Test that a few users get most of the data"""
+        counts = plan(10, 1000, 20, 50, skew=1.0)
+
+        recipes = sorted(
+            (user['recipes'] for user in counts), reverse=True
+        )
+        self.assertEqual(sum(recipes), 1000)
+        self.assertGreater(recipes[0], 5 * recipes[-1])
+        self.assertTrue(all(user['tags'] >= 1 for user in counts))
+        self.assertEqual(
+            {user['recipes'] for user in plan(4, 100, 1, 1, skew=0)}, {25}
+        )
+
+    def test_seed_users(self):
+        """Test creating users with linked recipes and recipe counts"""
+        users = seed_users(
+            3, 60, tags=4, ingredients=10, images=0.5, batch_size=7
+        )
+
+        self.assertEqual(len(users), 3)
+        self.assertTrue(users[0].check_password(SEED_PASSWORD))
+        self.assertEqual(Recipe.objects.count(), 60)
+        with_image = Recipe.objects.exclude(image='')
+        self.assertTrue(with_image.exists())
+        self.assertTrue(Recipe.objects.filter(image='').exists())
+        with_image.first().image.delete(save=False)
+        for model in (Tag, Ingredient):
+            for row in model.objects.annotate(links=Count('recipe')):
+                self.assertEqual(row.recipe_count, row.links)
+        for recipe in Recipe.objects.all():
+            self.assertFalse(
+                recipe.tags.exclude(user=recipe.user_id).exists()
+            )
+
+    def test_deterministic(self):
+        """Test that the same seed creates the same data"""
+        def snapshot():
+            return list(
+                Recipe.objects.order_by('pk').values_list(
+                    'user__email', 'title', 'time_minutes', 'price'
+                )
+            ), sorted(
+                Recipe.tags.through.objects.values_list(
+                    'recipe__title', 'tag__name'
+                )
+            )
+
+        seed_users(2, 20, tags=3, ingredients=5, seed=7)
+        first = snapshot()
+        out = StringIO()
+        call_command(
+            'seed_perf_data', users=2, recipes=20, tags=3, ingredients=5,
+            seed=7, flush=True, stdout=out
+        )
+
+        self.assertEqual(snapshot(), first)
+        self.assertIn('Seeded 2 users with 20 recipes', out.getvalue())
+        self.assertEqual(get_user_model().objects.count(), 2)
+
+    def test_existing_users_need_flush(self):
+        """Test that seeding twice without --flush fails"""
+        seed_users(1, 1)
+
+        with self.assertRaises(CommandError):
+            call_command('seed_perf_data', users=1, recipes=1)
@@ -0,0 +1,119 @@
+import random
+import resource
+import time
+from bisect import bisect
+from contextlib import contextmanager
+from itertools import accumulate
+
+CONSONANTS = 'bcdfghjklmnprstvwz'
+VOWELS = 'aeiou'
+
+
+def random_word(rng):
+    """Return a pronounceable random word"""
+    return ''.join(
+        rng.choice(CONSONANTS) + rng.choice(VOWELS)
+        for _ in range(rng.randint(2, 4))
+    )
+
+
+def random_names(count, seed=0, vocabulary=20000):
+    """Return `count` deterministic names of one to three words
+
+    Words are drawn with a Zipf-like skew from a fixed vocabulary, so a few
+    words (think "salt" or "chicken") are shared by many names.
+    """
+    rng = random.Random(seed)
+    words = [random_word(rng) for _ in range(vocabulary)]
+    cum_weights = list(
+        accumulate(1 / rank for rank in range(1, vocabulary + 1))
+    )
+    total = cum_weights[-1]
+
+    def pick():
+        return words[bisect(cum_weights, rng.random() * total)]
+
+    return [
+        ' '.join(pick() for _ in range(rng.randint(1, 3)))
+        for _ in range(count)
+    ]
+
+
+def percentile(samples, percent):
+    """Return the given percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+    return ordered[index]
+
+
+def _proc_status_kb(field):
+    """Return a memory field of /proc/self/status in KiB, if available"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith(f'{field}:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+
+    return None
+
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process in MiB"""
+    peak = _proc_status_kb('VmHWM')
+    if peak is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return peak / 1024
+
+
+def rss_mb():
+    """Return the current resident set size of this process in MiB"""
+    return (_proc_status_kb('VmRSS') or 0) / 1024
+
+
+def reset_peak_rss():
+    """Start measuring the peak resident set size from now, on Linux"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+
+
+@contextmanager
+def timer():
+    """Measure the wall time of a block, in seconds"""
+    result = {}
+    start = time.perf_counter()
+    yield result
+    result['seconds'] = time.perf_counter() - start
+
+
+def delete_user(user):
+    """Delete a benchmark user and its data without model signals"""
+    from django.db import connection
+
+    from core.models import Change, Tag, Ingredient, Recipe
+
+    tables = [
+        Recipe.tags.through, Recipe.ingredients.through, Recipe, Tag,
+        Ingredient, Change,
+    ]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model in tables:
+            table = quote(model._meta.db_table)
+            if model in (Recipe.tags.through, Recipe.ingredients.through):
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE recipe_id IN '
+                    f'(SELECT id FROM {quote(Recipe._meta.db_table)} '
+                    f'WHERE user_id = %s)',
+                    [user.pk]
+                )
+            else:
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE user_id = %s', [user.pk]
+                )
+    user.delete()
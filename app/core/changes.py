@@ -0,0 +1,86 @@
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+
+from core.models import Change, ChangeCounter
+
+
+def _allocate(user_id, count):
+    """Reserve `count` sequence numbers of a user and return the last one
+
+    The counter row stays locked until the surrounding transaction ends, so
+    a user's changes are committed in sequence order and a client never
+    skips a change that was committed after a later one.
+    """
+    counter = ChangeCounter.objects.filter(user_id=user_id)
+    if not counter.update(value=F('value') + count):
+        try:
+            with transaction.atomic():
+                ChangeCounter.objects.create(user_id=user_id, value=count)
+        except IntegrityError:
+            counter.update(value=F('value') + count)
+
+    return counter.values_list('value', flat=True).get()
+
+
+def _insert_changes(user_id, name, ids, first, deleted):
+    """Insert change rows with consecutive sequence numbers from `first`
+
+    PostgreSQL receives the IDs as one array, other databases get batched
+    multi-row INSERTs.
+    """
+    connection = connections[Change.objects.db]
+    if connection.vendor != 'postgresql':
+        Change.objects.bulk_create([
+            Change(
+                user_id=user_id,
+                model=name,
+                object_id=pk,
+                seq=seq,
+                deleted=deleted
+            )
+            for seq, pk in enumerate(ids, first)
+        ])
+        return
+
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        map(quote, ('user_id', 'model', 'object_id', 'seq', 'deleted'))
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(Change._meta.db_table)} ({columns}) '
+            f'SELECT %s, %s, pk, %s + position - 1, %s '
+            f'FROM unnest(%s::integer[]) WITH ORDINALITY AS ids(pk, position)',
+            [user_id, name, first, deleted, ids]
+        )
+
+
+def record_changes(user_id, model, ids, deleted=False):
+    """Move recipes, tags or ingredients to the end of the change feed"""
+    ids = sorted(set(ids))
+    if not ids:
+        return
+
+    name = model._meta.model_name
+    with transaction.atomic():
+        last = _allocate(user_id, len(ids))
+        Change.objects.filter(model=name, object_id__in=ids).delete()
+        _insert_changes(user_id, name, ids, last - len(ids) + 1, deleted)
+
+
+def changes_since(user_id, since, limit):
+    """Return up to `limit` + 1 of a user's changes after a sequence number
+
+    Only the latest change of each object is kept, so a client catching up
+    reads every changed object once, in the order of the changes.
+    """
+    return list(
+        Change.objects.filter(user_id=user_id, seq__gt=since)
+        .order_by('seq')[:limit + 1]
+    )
+
+
+def forget_user(user_id):
+    """Delete the change feed of a deleted user"""
+    Change.objects.filter(user_id=user_id).delete()
+    ChangeCounter.objects.filter(user_id=user_id).delete()
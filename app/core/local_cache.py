@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalLRUCache:
+    """Small thread-safe in-process LRU cache of versioned entries
+
+    Entries are stored with the version of the data they were built from,
+    and a lookup with any other version is a miss. With versions kept in
+    a cache shared between processes, a change seen by one process
+    invalidates the entries built by every other.
+
+    Each entry has a weight, e.g. the number of rows it holds, and the
+    least recently used entries are evicted once the total weight exceeds
+    `maxsize`. With a `ttl`, entries also expire that many seconds after
+    being stored.
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.weight = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version=None):
+        """Return the entry for a key if it was built from this version"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            if entry[3] is not None and entry[3] <= time.monotonic():
+                self.weight -= self._entries.pop(key)[2]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, version, value, weight=1):
+        """Store an entry, evicting the least recently used ones"""
+        expires = None
+        if self.ttl is not None:
+            expires = time.monotonic() + self.ttl
+        with self._lock:
+            if key in self._entries:
+                self.weight -= self._entries.pop(key)[2]
+            self._entries[key] = (version, value, weight, expires)
+            self.weight += weight
+            while self.weight > self.maxsize and len(self._entries) > 1:
+                self.weight -= self._entries.popitem(last=False)[1][2]
+
+    def delete(self, key):
+        """Drop the entry for a key, if any"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.weight -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.weight = 0
+
+    def __len__(self):
+        return len(self._entries)
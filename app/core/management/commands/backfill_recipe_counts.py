@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Tag, Ingredient
+
+
+class Command(BaseCommand):
+    """Django command to recompute recipe counts of tags and ingredients"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, dest='user_id',
+            help='Only backfill the tags and ingredients of this user ID',
+        )
+
+    def handle(self, *args, **options):
+        for model in (Tag, Ingredient):
+            queryset = model.objects.all()
+            if options['user_id']:
+                queryset = queryset.filter(user_id=options['user_id'])
+
+            updated = queryset.refresh_recipe_counts()
+            self.stdout.write(
+                f'Updated {updated} {model._meta.verbose_name_plural}'
+            )
+        self.stdout.write(self.style.SUCCESS('Recipe counts backfilled!'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from core.search import update_search_index
+
+
+class Command(BaseCommand):
+    """Django command to rebuild the recipe full-text search index"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of recipes indexed per query',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        indexed = 0
+        while True:
+            ids = list(
+                Recipe.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            update_search_index(ids)
+            indexed += len(ids)
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} recipes!'))
@@ -1,7 +1,17 @@
+from collections import defaultdict
+
 from django.contrib.auth.models import BaseUserManager
+from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 
 
+def normalize_name(name):
+    """Return the form of a tag or ingredient name used to find duplicates"""
+    return ' '.join(name.split()).casefold()
+
+
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **kwargs):
         """Creates and saves a new user"""
@@ -22,3 +32,70 @@ class UserManager(BaseUserManager):
         user.save()
 
         return user
+
+
+class RecipeAttrQuerySet(models.QuerySet):
+    def refresh_recipe_counts(self):
+        """Recompute the denormalized recipe count of the selected rows"""
+        through = self.model.recipe_set.through
+        field = f'{self.model._meta.model_name}_id'
+        counts = through.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            count=Count('pk')
+        ).values('count')
+
+        return self.update(recipe_count=Coalesce(Subquery(counts), 0))
+
+    def add_recipe_counts(self, counts):
+        """Increase the recipe counts of rows by new links, given by ID
+
+        Rows gaining the same number of links are updated together, so
+        this takes one query per distinct count.
+        """
+        by_count = defaultdict(list)
+        for pk, count in counts.items():
+            by_count[count].append(pk)
+
+        for count, pks in by_count.items():
+            self.filter(pk__in=pks).update(
+                recipe_count=F('recipe_count') + count
+            )
+
+    def get_or_create_names(self, user, names):
+        """Return a user's rows with the given names, creating missing ones
+
+        Names are matched on their normalized form and the rows are
+        returned in the order of the names. Rows inserted concurrently by
+        another request are found again instead of failing, thanks to the
+        (user, normalized name) unique constraint. Returns the rows and the
+        list of rows created by this call.
+        """
+        wanted = {}
+        for name in names:
+            wanted.setdefault(normalize_name(name), ' '.join(name.split()))
+
+        def find(keys):
+            return {
+                row.normalized_name: row for row in
+                self.filter(user=user, normalized_name__in=keys)
+            }
+
+        rows = find(wanted)
+        missing = [key for key in wanted if key not in rows]
+        created = []
+        if missing:
+            self.bulk_create(
+                [
+                    self.model(
+                        user=user, name=wanted[key], normalized_name=key
+                    )
+                    for key in missing
+                ],
+                ignore_conflicts=True
+            )
+            found = find(missing)
+            rows.update(found)
+            created = list(found.values())
+
+        return [rows[normalize_name(name)] for name in names], created
@@ -0,0 +1,50 @@
+from django.db import migrations
+
+TRIGRAM_INDEXES = (
+    ('core_tag_name_trgm_idx', 'core_tag', 'name'),
+    ('core_ingredient_name_trgm_idx', 'core_ingredient', 'name'),
+    ('core_recipe_title_trgm_idx', 'core_recipe', 'title'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Install pg_trgm and its GIN indexes where the extension exists
+
+    Other databases, and PostgreSQL servers without the contrib modules,
+    use the in-process trigram index in recipe.fuzzy instead.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} '
+            f'USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+PREFIX_INDEXES = (
+    ('core_tag_name_prefix_idx', 'core_tag'),
+    ('core_ingredient_name_prefix_idx', 'core_ingredient'),
+)
+
+
+def create_prefix_indexes(apps, schema_editor):
+    """Index the names for case-insensitive prefix matches per user
+
+    Matches the UPPER(name::text) LIKE 'X%' expression generated by the
+    istartswith lookup on PostgreSQL and the NOCASE LIKE of SQLite.
+    """
+    vendor = schema_editor.connection.vendor
+    for name, table in PREFIX_INDEXES:
+        if vendor == 'postgresql':
+            schema_editor.execute(
+                f'CREATE INDEX {name} ON {table} '
+                f'(user_id, UPPER(name::text) text_pattern_ops)'
+            )
+        elif vendor == 'sqlite':
+            schema_editor.execute(
+                f'CREATE INDEX {name} ON {table} '
+                f'(user_id, name COLLATE NOCASE)'
+            )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor not in ('postgresql', 'sqlite'):
+        return
+
+    for name, _ in PREFIX_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
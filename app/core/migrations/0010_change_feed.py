@@ -0,0 +1,76 @@
+# Generated by Django 3.1.1 on 2026-10-18 20:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+FEED_MODELS = ('recipe', 'tag', 'ingredient')
+BATCH_SIZE = 2000
+
+
+def backfill_changes(apps, schema_editor):
+    """Start the change feed of every user with their existing rows"""
+    Change = apps.get_model('core', 'Change')
+    ChangeCounter = apps.get_model('core', 'ChangeCounter')
+    counters = {}
+    batch = []
+    for name in FEED_MODELS:
+        model = apps.get_model('core', name)
+        rows = model.objects.order_by('user_id', 'pk').values_list(
+            'user_id', 'pk'
+        )
+        for user_id, pk in rows.iterator(chunk_size=BATCH_SIZE):
+            counters[user_id] = counters.get(user_id, 0) + 1
+            batch.append(Change(
+                user_id=user_id,
+                model=name,
+                object_id=pk,
+                seq=counters[user_id]
+            ))
+            if len(batch) >= BATCH_SIZE:
+                Change.objects.bulk_create(batch)
+                batch = []
+
+    Change.objects.bulk_create(batch)
+    ChangeCounter.objects.bulk_create(
+        [ChangeCounter(user_id=pk, value=value)
+         for pk, value in counters.items()],
+        batch_size=BATCH_SIZE
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_name_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('user', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('recipe', 'Recipe'), ('tag', 'Tag'), ('ingredient', 'Ingredient')], max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('seq', models.PositiveBigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='change',
+            constraint=models.UniqueConstraint(fields=('user', 'seq'), name='core_change_user_seq_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='change',
+            constraint=models.UniqueConstraint(fields=('model', 'object_id'), name='core_change_object_uniq'),
+        ),
+        migrations.RunPython(backfill_changes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,139 @@
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 2000
+
+
+def normalize_name(name):
+    return ' '.join(name.split()).casefold()
+
+
+def record_changes(apps, user_id, model_name, ids, deleted=False):
+    """Move objects to the end of a user's change feed"""
+    Change = apps.get_model('core', 'Change')
+    ChangeCounter = apps.get_model('core', 'ChangeCounter')
+    ids = sorted(set(ids))
+    if not ids:
+        return
+
+    counter, _ = ChangeCounter.objects.get_or_create(user_id=user_id)
+    ChangeCounter.objects.filter(pk=counter.pk).update(
+        value=F('value') + len(ids)
+    )
+    last = ChangeCounter.objects.get(pk=counter.pk).value
+    Change.objects.filter(model=model_name, object_id__in=ids).delete()
+    Change.objects.bulk_create([
+        Change(
+            user_id=user_id,
+            model=model_name,
+            object_id=pk,
+            seq=seq,
+            deleted=deleted
+        )
+        for seq, pk in enumerate(ids, last - len(ids) + 1)
+    ])
+
+
+def merge_duplicates(apps, model_name, duplicates):
+    """Move the recipes of duplicate rows to the row kept, then delete them
+
+    `duplicates` maps the ID of each duplicate to (kept ID, user ID).
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    model = apps.get_model('core', model_name)
+    through = getattr(Recipe, f'{model_name}s').through
+    column = f'{model_name}_id'
+
+    links = list(
+        through.objects.filter(**{f'{column}__in': duplicates})
+        .values_list('recipe_id', column)
+    )
+    kept_ids = {kept for kept, _ in duplicates.values()}
+    existing = set(
+        through.objects.filter(**{f'{column}__in': kept_ids})
+        .values_list('recipe_id', column)
+    )
+    moved = {
+        (recipe_id, duplicates[pk][0]) for recipe_id, pk in links
+    } - existing
+    through.objects.bulk_create(
+        [
+            through(recipe_id=recipe_id, **{column: pk})
+            for recipe_id, pk in moved
+        ],
+        batch_size=BATCH_SIZE
+    )
+    through.objects.filter(**{f'{column}__in': duplicates}).delete()
+    model.objects.filter(pk__in=duplicates).delete()
+
+    counts = through.objects.filter(
+        **{column: OuterRef('pk')}
+    ).order_by().values(column).annotate(count=Count('pk')).values('count')
+    model.objects.filter(pk__in=kept_ids).update(
+        recipe_count=Coalesce(Subquery(counts), 0)
+    )
+
+    by_user = defaultdict(lambda: (set(), set()))
+    for pk, (_, user_id) in duplicates.items():
+        by_user[user_id][0].add(pk)
+    recipe_users = dict(
+        Recipe.objects.filter(pk__in={recipe_id for recipe_id, _ in links})
+        .values_list('pk', 'user_id')
+    )
+    for recipe_id, user_id in recipe_users.items():
+        by_user[user_id][1].add(recipe_id)
+    for user_id, (deleted_ids, recipe_ids) in by_user.items():
+        record_changes(apps, user_id, model_name, deleted_ids, deleted=True)
+        record_changes(apps, user_id, 'recipe', recipe_ids)
+
+
+def normalize_names(apps, schema_editor):
+    """Fill in normalized names and merge rows whose names are duplicates"""
+    for model_name in ('tag', 'ingredient'):
+        model = apps.get_model('core', model_name)
+        kept = {}
+        duplicates = {}
+        batch = []
+        rows = model.objects.order_by('pk').only('id', 'user_id', 'name')
+        for row in rows.iterator(chunk_size=BATCH_SIZE):
+            row.normalized_name = normalize_name(row.name)
+            key = (row.user_id, row.normalized_name)
+            if key in kept:
+                duplicates[row.pk] = (kept[key], row.user_id)
+                continue
+
+            kept[key] = row.pk
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                model.objects.bulk_update(batch, ['normalized_name'])
+                batch = []
+        model.objects.bulk_update(batch, ['normalized_name'])
+
+        if duplicates:
+            merge_duplicates(apps, model_name, duplicates)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='normalized_name',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='normalized_name',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(normalize_names, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,14 @@
 import uuid
 import os
 
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 
-from core.managers import UserManager
+from core.managers import UserManager, RecipeAttrQuerySet, normalize_name
 
 
 def recipe_image_file_path(instance, filename):
@@ -51,10 +52,32 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    normalized_name = models.CharField(max_length=255, editable=False)
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = RecipeAttrQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'recipe_count'],
+                name='core_tag_user_usage_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'normalized_name'],
+                name='core_tag_user_name_uniq'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_name(self.name)
+        super().save(*args, **kwargs)
+
 
 class Ingredient(models.Model):
     """Ingredient to be used in a recipe"""
@@ -63,10 +86,32 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    normalized_name = models.CharField(max_length=255, editable=False)
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = RecipeAttrQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'recipe_count'],
+                name='core_ingredient_user_usage_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'normalized_name'],
+                name='core_ingredient_user_name_uniq'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_name(self.name)
+        super().save(*args, **kwargs)
+
 
 class Recipe(models.Model):
     """Recipe model"""
@@ -81,6 +126,105 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image_variants = models.JSONField(default=dict, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def __str__(self):
         return self.title
+
+
+class ChangeCounter(models.Model):
+    """Last sequence number given to a change of a user's data"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        primary_key=True,
+        related_name='+'
+    )
+    value = models.PositiveBigIntegerField(default=0)
+
+
+class Change(models.Model):
+    """Latest change to a recipe, tag or ingredient, for delta sync"""
+    RECIPE = 'recipe'
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+    MODEL_CHOICES = (
+        (RECIPE, 'Recipe'),
+        (TAG, 'Tag'),
+        (INGREDIENT, 'Ingredient'),
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.PositiveIntegerField()
+    seq = models.PositiveBigIntegerField()
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'seq'],
+                name='core_change_user_seq_uniq'
+            ),
+            models.UniqueConstraint(
+                fields=['model', 'object_id'],
+                name='core_change_object_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.model} {self.object_id} at {self.seq}'
+
+
+class ImportCheckpoint(models.Model):
+    """Number of input records an import has committed, to resume it"""
+    name = models.CharField(max_length=255, unique=True)
+    position = models.PositiveBigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name} at {self.position}'
+
+
+class RefreshToken(models.Model):
+    """Single use token to get a new access token, stored as a digest
+
+    Refreshing replaces a token by a new one of the same family. Using a
+    replaced token again revokes its whole family.
+    """
+    digest = models.CharField(max_length=64, primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    family = models.UUIDField(default=uuid.uuid4, db_index=True)
+    expires = models.DateTimeField()
+    used = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f'{self.user_id} {self.family}'
+
+
+class ImageUpload(models.Model):
+    """Recipe image sent in chunks, with the number of bytes received"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    size = models.PositiveIntegerField()
+    offset = models.PositiveIntegerField(default=0)
+    format = models.CharField(max_length=10, blank=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.id} at {self.offset} of {self.size}'
@@ -0,0 +1,47 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+
+# Threads running offloaded views. Each hashes one password at a time,
+# taking 16 MiB with the default scrypt cost.
+MAX_WORKERS = 4
+
+_executor = ThreadPoolExecutor(
+    max_workers=MAX_WORKERS, thread_name_prefix='offload'
+)
+
+
+def _run(view, request, *args, **kwargs):
+    """Run a view in a worker thread, with its own database connection"""
+    close_old_connections()
+    try:
+        return view(request, *args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def offload(view):
+    """Return a view running a slow sync view in a pool of threads
+
+    Under ASGI Django runs all sync views in one thread, so a view hashing
+    passwords for tens of milliseconds holds up every other request.
+    Offloaded views run in up to MAX_WORKERS threads of their own instead.
+    Under WSGI they run in the request's thread, as before.
+    """
+    @functools.wraps(view)
+    async def offloaded_view(request, *args, **kwargs):
+        if isinstance(request, ASGIRequest):
+            return await asyncio.get_running_loop().run_in_executor(
+                _executor,
+                functools.partial(_run, view, request, *args, **kwargs)
+            )
+
+        return await sync_to_async(view, thread_sensitive=True)(
+            request, *args, **kwargs
+        )
+
+    return offloaded_view
@@ -0,0 +1,46 @@
+import io
+
+from django.conf import settings
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from core import renderers
+from core.renderers import msgpack, orjson
+
+
+class FastJSONParser(parsers.JSONParser):
+    """Parse JSON with orjson, falling back to the stdlib
+
+    Bodies orjson rejects are parsed again by `JSONParser`, so they get
+    the same error messages, and values orjson can't hold, such as
+    integers over 64 bits, still parse.
+    """
+    renderer_class = renderers.FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        body = stream.read()
+        try:
+            if encoding.lower().replace('-', '') == 'utf8':
+                return orjson.loads(body)
+            return orjson.loads(body.decode(encoding))
+        except (orjson.JSONDecodeError, UnicodeDecodeError):
+            return super().parse(
+                io.BytesIO(body), media_type, parser_context
+            )
+
+
+class MessagePackParser(parsers.BaseParser):
+    """Parse MessagePack request bodies"""
+    media_type = 'application/msgpack'
+    renderer_class = renderers.MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except ValueError as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
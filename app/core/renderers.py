@@ -0,0 +1,68 @@
+from rest_framework import renderers
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# JSON can hold these characters raw, but JavaScript strings can't
+_LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """Render compact JSON with orjson, falling back to the stdlib
+
+    The output is the same as DRF's `JSONRenderer`, but for the exponent
+    notation of very large or small floats. Decimals, dates and anything
+    else orjson doesn't handle as DRF would go through DRF's encoder.
+    Indented output, ASCII-only output and data orjson rejects, such as
+    integers over 64 bits, are rendered by `JSONRenderer`.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or not self.compact or \
+                self.get_indent(accepted_media_type, renderer_context or {}) \
+                is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        for raw, escaped in _LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+
+        return ret
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """Render MessagePack, with values JSON has no type for as in JSON"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    encoder_class = renderers.JSONRenderer.encoder_class
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return msgpack.packb(
+            data, default=self.encoder_class().default, use_bin_type=True
+        )
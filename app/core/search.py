@@ -0,0 +1,130 @@
+import re
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector
+)
+from django.db import connections
+from django.db.models import F, FloatField, OuterRef, Subquery, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Coalesce
+
+from core.models import Tag, Ingredient, Recipe
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'core_recipe_fts'
+
+# bm25 weights of the title, link, tags and ingredients FTS5 columns
+FTS_WEIGHTS = (4.0, 1.0, 2.0, 2.0)
+
+
+def _names(model):
+    """Return a subquery joining the names linked to the outer recipe"""
+    names = model.objects.filter(
+        recipe=OuterRef('pk')
+    ).order_by().values('recipe').annotate(
+        names=StringAgg('name', ' ')
+    ).values('names')
+
+    return Coalesce(Subquery(names), Value(''))
+
+
+def _update_postgresql(queryset):
+    queryset.update(search_vector=(
+        SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+        SearchVector(_names(Tag), weight='B', config=SEARCH_CONFIG) +
+        SearchVector(_names(Ingredient), weight='B', config=SEARCH_CONFIG) +
+        SearchVector('link', weight='C', config=SEARCH_CONFIG)
+    ))
+
+
+def _update_sqlite(queryset, connection):
+    recipes = queryset.only('id', 'title', 'link').prefetch_related(
+        'tags', 'ingredients'
+    )
+    rows = [
+        (
+            recipe.id,
+            recipe.title,
+            recipe.link,
+            ' '.join(tag.name for tag in recipe.tags.all()),
+            ' '.join(item.name for item in recipe.ingredients.all()),
+        )
+        for recipe in recipes
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(row[0],) for row in rows]
+        )
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} '
+            f'(rowid, title, link, tags, ingredients) '
+            f'VALUES (%s, %s, %s, %s, %s)',
+            rows
+        )
+
+
+def update_search_index(recipe_ids):
+    """Refresh the search documents of the given recipes"""
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+
+    queryset = Recipe.objects.filter(pk__in=recipe_ids)
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        _update_postgresql(queryset)
+    elif connection.vendor == 'sqlite':
+        _update_sqlite(queryset, connection)
+
+
+def remove_from_search_index(recipe_ids):
+    """Drop deleted recipes from the search index"""
+    connection = connections[Recipe.objects.db]
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(recipe_id,) for recipe_id in recipe_ids]
+        )
+
+
+def search_recipes(queryset, text):
+    """Filter recipes matching a search text, annotated with a rank
+
+    Matching rows are ranked by relevance in the `rank` annotation, higher
+    being more relevant.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(text, config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+        )
+
+    if connection.vendor == 'sqlite':
+        terms = re.findall(r'\w+', text)
+        if not terms:
+            return queryset.annotate(
+                rank=Value(0.0, output_field=FloatField())
+            ).none()
+
+        match = ' '.join('"%s"' % term for term in terms)
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        table = Recipe._meta.db_table
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match]
+        )).annotate(rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = "{table}"."id"',
+            [match],
+            output_field=FloatField()
+        ))
+
+    return queryset.filter(title__icontains=text).annotate(
+        rank=Value(1.0, output_field=FloatField())
+    )
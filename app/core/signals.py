@@ -0,0 +1,148 @@
+from django.db.models.signals import (
+    m2m_changed, post_save, pre_delete, post_delete
+)
+from django.contrib.auth import get_user_model
+from django.dispatch import receiver
+
+from core import changes, search
+from core.models import Tag, Ingredient, Recipe
+
+
+def _linked_ids(recipe, model):
+    """Return the IDs of the tags or ingredients linked to a recipe"""
+    through = model.recipe_set.through
+    field = f'{model._meta.model_name}_id'
+
+    return set(
+        through.objects.filter(recipe=recipe).values_list(field, flat=True)
+    )
+
+
+def _refresh_recipe_counts(model, pks):
+    """Recompute the recipe count of the given tags or ingredients"""
+    if pks:
+        model.objects.filter(pk__in=pks).refresh_recipe_counts()
+
+
+def recipe_attr_changed(sender, instance, action, reverse, model, pk_set,
+                        **kwargs):
+    """Keep recipe counts in sync with the recipe M2M tables"""
+    attr_model = type(instance) if reverse else model
+
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _refresh_recipe_counts(attr_model, {instance.pk})
+    elif action == 'pre_clear':
+        instance._cleared_attr_ids = _linked_ids(instance, attr_model)
+    elif action == 'post_clear':
+        _refresh_recipe_counts(
+            attr_model, instance.__dict__.pop('_cleared_attr_ids', None)
+        )
+    elif action in ('post_add', 'post_remove'):
+        _refresh_recipe_counts(attr_model, pk_set)
+
+
+m2m_changed.connect(recipe_attr_changed, sender=Recipe.tags.through)
+m2m_changed.connect(recipe_attr_changed, sender=Recipe.ingredients.through)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_pre_delete(sender, instance, **kwargs):
+    """Remember the tags and ingredients of a recipe being deleted"""
+    instance._deleted_attr_ids = {
+        Tag: _linked_ids(instance, Tag),
+        Ingredient: _linked_ids(instance, Ingredient),
+    }
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_post_delete(sender, instance, **kwargs):
+    """Update the recipe counts and search index after a recipe delete"""
+    linked = instance.__dict__.pop('_deleted_attr_ids', {})
+    for model, pks in linked.items():
+        _refresh_recipe_counts(model, pks)
+    search.remove_from_search_index([instance.pk])
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, update_fields=None, **kwargs):
+    """Refresh the search document of a saved recipe"""
+    if update_fields and not {'title', 'link'} & set(update_fields):
+        return
+    search.update_search_index([instance.pk])
+
+
+def recipe_links_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """Refresh the search documents and change feed of relinked recipes"""
+    recipe_ids = ()
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            recipe_ids = [instance.pk]
+    elif action == 'pre_clear':
+        instance._cleared_recipe_ids = set(
+            instance.recipe_set.values_list('pk', flat=True)
+        )
+    elif action == 'post_clear':
+        recipe_ids = instance.__dict__.pop('_cleared_recipe_ids', ())
+    elif action in ('post_add', 'post_remove'):
+        recipe_ids = pk_set
+
+    if recipe_ids:
+        search.update_search_index(recipe_ids)
+        changes.record_changes(instance.user_id, Recipe, recipe_ids)
+
+
+m2m_changed.connect(recipe_links_changed, sender=Recipe.tags.through)
+m2m_changed.connect(recipe_links_changed, sender=Recipe.ingredients.through)
+
+
+def recipe_attr_saved(sender, instance, created, **kwargs):
+    """Refresh the search documents of recipes using a renamed attribute"""
+    if not created:
+        search.update_search_index(
+            instance.recipe_set.values_list('pk', flat=True)
+        )
+
+
+def recipe_attr_pre_delete(sender, instance, **kwargs):
+    """Remember the recipes using a tag or ingredient being deleted"""
+    instance._deleted_recipe_ids = set(
+        instance.recipe_set.values_list('pk', flat=True)
+    )
+
+
+def recipe_attr_post_delete(sender, instance, **kwargs):
+    """Refresh the search documents and feed of recipes losing an attribute"""
+    recipe_ids = instance.__dict__.pop('_deleted_recipe_ids', ())
+    search.update_search_index(recipe_ids)
+    changes.record_changes(instance.user_id, Recipe, recipe_ids)
+
+
+for model in (Tag, Ingredient):
+    post_save.connect(recipe_attr_saved, sender=model)
+    pre_delete.connect(recipe_attr_pre_delete, sender=model)
+    post_delete.connect(recipe_attr_post_delete, sender=model)
+
+
+def change_saved(sender, instance, **kwargs):
+    """Add a saved recipe, tag or ingredient to the change feed"""
+    changes.record_changes(instance.user_id, sender, [instance.pk])
+
+
+def change_deleted(sender, instance, **kwargs):
+    """Add the tombstone of a deleted row to the change feed"""
+    changes.record_changes(
+        instance.user_id, sender, [instance.pk], deleted=True
+    )
+
+
+for model in (Tag, Ingredient, Recipe):
+    post_save.connect(change_saved, sender=model)
+    post_delete.connect(change_deleted, sender=model)
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_deleted(sender, instance, **kwargs):
+    """Drop the change feed of a deleted user"""
+    changes.forget_user(instance.pk)
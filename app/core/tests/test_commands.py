@@ -1,9 +1,15 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
 from django.db.utils import OperationalError
 from django.test import TestCase
 
 from unittest.mock import patch
 
+from core.models import Tag, Ingredient, Recipe
+from core.search import search_recipes
+
 
 class CommandTests(TestCase):
     def test_wait_for_db_ready(self):
@@ -20,3 +26,55 @@ class CommandTests(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+    def test_backfill_recipe_counts(self):
+        """Test recomputing recipe counts from the recipe links"""
+        user = get_user_model().objects.create_user(
+            'test@example.com',
+            'password123'
+        )
+        tag = Tag.objects.create(user=user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=user, name='Kale')
+        recipe = Recipe.objects.create(
+            user=user,
+            title='Kale salad',
+            time_minutes=5,
+            price=5.00
+        )
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+        Tag.objects.update(recipe_count=0)
+        Ingredient.objects.update(recipe_count=7)
+
+        call_command('backfill_recipe_counts', stdout=StringIO())
+
+        tag.refresh_from_db()
+        ingredient.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 1)
+        self.assertEqual(ingredient.recipe_count, 1)
+
+    def test_rebuild_search_index(self):
+        """Test rebuilding the recipe search index"""
+        user = get_user_model().objects.create_user(
+            'test@example.com',
+            'password123'
+        )
+        for title in ('Pancakes', 'Waffles', 'Crepes'):
+            Recipe.objects.create(
+                user=user,
+                title=title,
+                time_minutes=5,
+                price=5.00
+            )
+        out = StringIO()
+
+        call_command('rebuild_search_index', batch_size=2, stdout=out)
+
+        self.assertIn('Indexed 3 recipes', out.getvalue())
+        self.assertEqual(
+            list(
+                search_recipes(Recipe.objects.all(), 'waffles')
+                .values_list('title', flat=True)
+            ),
+            ['Waffles']
+        )
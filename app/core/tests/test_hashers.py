@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.hashers import ScryptPasswordHasher
+
+TOKEN_URL = reverse('user:token')
+
+
+class CheapScryptPasswordHasher(ScryptPasswordHasher):
+    work_factor = 2 ** 10
+
+
+class ScryptPasswordHasherTests(TestCase):
+    """Test the scrypt password hasher"""
+
+    def test_encode_verify(self):
+        """Test that passwords are checked against their scrypt hash"""
+        encoded = make_password('testpass')
+
+        self.assertTrue(encoded.startswith('scrypt$16384$'))
+        self.assertTrue(check_password('testpass', encoded))
+        self.assertFalse(check_password('testpas', encoded))
+        self.assertNotEqual(encoded, make_password('testpass'))
+
+    def test_must_update(self):
+        """Test that hashes of another cost must be updated"""
+        hasher = ScryptPasswordHasher()
+        encoded = hasher.encode('testpass', hasher.salt())
+
+        self.assertFalse(hasher.must_update(encoded))
+        self.assertTrue(CheapScryptPasswordHasher().must_update(encoded))
+        self.assertIn('work factor', hasher.safe_summary(encoded))
+
+    def test_upgrade_on_login(self):
+        """Test that a PBKDF2 password is hashed with scrypt on login"""
+        user = get_user_model().objects.create_user('test@example.com')
+        user.password = make_password('testpass', hasher='pbkdf2_sha256')
+        user.save()
+
+        res = APIClient().post(
+            TOKEN_URL, {'email': 'test@example.com', 'password': 'testpass'}
+        )
+        user.refresh_from_db()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(user.password.startswith('scrypt$'))
+        self.assertTrue(user.check_password('testpass'))
@@ -0,0 +1,53 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core.local_cache import LocalLRUCache
+
+
+class LocalLRUCacheTestCase(SimpleTestCase):
+    """Test the in-process LRU cache"""
+
+    def test_versioned_entries(self):
+        """Test that an entry is only returned for its own version"""
+        cache = LocalLRUCache(maxsize=2)
+        cache.set('key', 1, 'value')
+
+        self.assertEqual(cache.get('key', 1), 'value')
+        self.assertIsNone(cache.get('key', 2))
+
+    def test_least_recently_used_evicted(self):
+        """Test that the least recently used entry is evicted"""
+        cache = LocalLRUCache(maxsize=2)
+        cache.set('a', 1, 'a')
+        cache.set('b', 1, 'b')
+        cache.get('a', 1)
+        cache.set('c', 1, 'c')
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b', 1))
+        self.assertEqual(cache.get('a', 1), 'a')
+
+    def test_evicted_by_weight(self):
+        """Test that entries are evicted once the total weight is exceeded"""
+        cache = LocalLRUCache(maxsize=10)
+        cache.set('a', 1, 'a', weight=6)
+        cache.set('b', 1, 'b', weight=6)
+
+        self.assertIsNone(cache.get('a', 1))
+        self.assertEqual(cache.get('b', 1), 'b')
+        self.assertEqual(cache.weight, 6)
+
+    def test_expired_entries(self):
+        """Test that entries expire after the TTL or once deleted"""
+        cache = LocalLRUCache(maxsize=10, ttl=5)
+        with patch('core.local_cache.time.monotonic', return_value=100):
+            cache.set('a', None, 'a')
+            cache.set('b', None, 'b')
+            self.assertEqual(cache.get('a'), 'a')
+        with patch('core.local_cache.time.monotonic', return_value=105):
+            self.assertIsNone(cache.get('a'))
+        cache.delete('b')
+
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.weight, 0)
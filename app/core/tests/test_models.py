@@ -96,3 +96,136 @@ class TestModels(TestCase):
         expected_path = f'uploads/recipe/{uuid}.jpg'
 
         self.assertEqual(file_path, expected_path)
+
+
+class RecipeCountTests(TestCase):
+    """Test the denormalized recipe counts of tags and ingredients"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.tag = models.Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = models.Ingredient.objects.create(
+            user=self.user,
+            name='Kale'
+        )
+
+    def _recipe(self):
+        return models.Recipe.objects.create(
+            user=self.user,
+            title='Kale salad',
+            time_minutes=5,
+            price=5.00
+        )
+
+    def _assertCounts(self, tag_count, ingredient_count):
+        self.tag.refresh_from_db()
+        self.ingredient.refresh_from_db()
+        self.assertEqual(self.tag.recipe_count, tag_count)
+        self.assertEqual(self.ingredient.recipe_count, ingredient_count)
+
+    def test_counts_follow_add_and_remove(self):
+        """Test that adding and removing links updates the counts"""
+        recipe1 = self._recipe()
+        recipe2 = self._recipe()
+
+        recipe1.tags.add(self.tag)
+        recipe1.tags.add(self.tag)
+        recipe2.tags.add(self.tag)
+        recipe1.ingredients.add(self.ingredient)
+        self._assertCounts(2, 1)
+
+        recipe1.tags.remove(self.tag)
+        recipe1.tags.remove(self.tag)
+        self._assertCounts(1, 1)
+
+    def test_counts_follow_clear_and_set(self):
+        """Test that clearing and setting links updates the counts"""
+        recipe = self._recipe()
+        recipe.tags.set([self.tag])
+        recipe.ingredients.set([self.ingredient])
+        self._assertCounts(1, 1)
+
+        recipe.tags.clear()
+        recipe.ingredients.set([])
+        self._assertCounts(0, 0)
+
+    def test_counts_follow_reverse_side(self):
+        """Test that changes from the tag side update the counts"""
+        recipe1 = self._recipe()
+        recipe2 = self._recipe()
+
+        self.tag.recipe_set.add(recipe1, recipe2)
+        self._assertCounts(2, 0)
+
+        self.tag.recipe_set.clear()
+        self._assertCounts(0, 0)
+
+    def test_counts_follow_recipe_delete(self):
+        """Test that deleting a recipe decrements the counts"""
+        recipe = self._recipe()
+        recipe.tags.add(self.tag)
+        recipe.ingredients.add(self.ingredient)
+        self._recipe().tags.add(self.tag)
+
+        recipe.delete()
+        self._assertCounts(1, 0)
+
+        models.Recipe.objects.all().delete()
+        self._assertCounts(0, 0)
+
+
+class ChangeLogTests(TestCase):
+    def setUp(self):
+        self.user = sample_user()
+
+    def _changes(self):
+        return list(
+            models.Change.objects.filter(user=self.user).order_by('seq')
+            .values_list('model', 'object_id', 'deleted')
+        )
+
+    def test_latest_change_per_object(self):
+        """Test that each object keeps only its latest change"""
+        tag = models.Tag.objects.create(user=self.user, name='Vegan')
+        recipe = models.Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=5, price=5.00
+        )
+        tag.name = 'Vegetarian'
+        tag.save()
+
+        self.assertEqual(self._changes(), [
+            ('recipe', recipe.id, False),
+            ('tag', tag.id, False),
+        ])
+
+        recipe_id = recipe.id
+        recipe.delete()
+        self.assertEqual(self._changes(), [
+            ('tag', tag.id, False),
+            ('recipe', recipe_id, True),
+        ])
+
+    def test_sequence_numbers_increase(self):
+        """Test that every change gets a new sequence number per user"""
+        tag = models.Tag.objects.create(user=self.user, name='Vegan')
+        first = models.Change.objects.get(object_id=tag.id).seq
+        tag.save()
+
+        self.assertEqual(
+            models.Change.objects.get(object_id=tag.id).seq, first + 1
+        )
+        self.assertEqual(
+            models.ChangeCounter.objects.get(user=self.user).value, first + 1
+        )
+
+    def test_user_delete_drops_feed(self):
+        """Test that deleting a user deletes their change feed"""
+        recipe = models.Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=5, price=5.00
+        )
+        recipe.tags.create(user=self.user, name='Vegan')
+
+        self.user.delete()
+
+        self.assertFalse(models.Change.objects.exists())
+        self.assertFalse(models.ChangeCounter.objects.exists())
@@ -0,0 +1,48 @@
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TransactionTestCase
+from django.urls import reverse
+
+from core import offload
+
+TOKEN_URL = reverse('user:token')
+BODY = json.dumps({'email': 'test@example.com', 'password': 'testpass'})
+
+
+class OffloadTests(TransactionTestCase):
+    """Test running password hashing views in worker threads"""
+
+    def setUp(self):
+        get_user_model().objects.create_user('test@example.com', 'testpass')
+
+    async def test_asgi(self):
+        """Test that ASGI requests run in the worker threads"""
+        # Django 3.1.1's AsyncClient sends a wrong Content-Length
+        with patch.object(
+            offload._executor, 'submit', wraps=offload._executor.submit
+        ) as submit:
+            res = await AsyncClient().post(
+                TOKEN_URL, BODY, content_type='application/json',
+                headers=[
+                    (b'host', b'testserver'),
+                    (b'content-length', str(len(BODY)).encode()),
+                    (b'content-type', b'application/json'),
+                ]
+            )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('access', res.json())
+        submit.assert_called_once()
+
+    def test_wsgi(self):
+        """Test that WSGI requests run in the request's thread"""
+        with patch.object(offload._executor, 'submit') as submit:
+            res = self.client.post(
+                TOKEN_URL,
+                {'email': 'test@example.com', 'password': 'testpass'},
+            )
+
+        self.assertEqual(res.status_code, 200)
+        submit.assert_not_called()
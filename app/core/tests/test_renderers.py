@@ -0,0 +1,127 @@
+import io
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.parsers import FastJSONParser, MessagePackParser
+from core.renderers import FastJSONRenderer, MessagePackRenderer, msgpack
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TOKEN_URL = reverse('user:token')
+
+
+class FastJSONTests(TestCase):
+    """Test the orjson renderer and parser against DRF's"""
+
+    def test_same_output(self):
+        """Test that the rendered bytes are those of JSONRenderer"""
+        for data in (
+            None,
+            [],
+            {'id': 1, 'title': 'Crêpes 😀', 'price': '5.50'},
+            {'text': 'a\u2028b\u2029c\n\t"\\\x01\x7f', 'none': None},
+            {'price': Decimal('5.50'), 'at': datetime(
+                2020, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc
+            )},
+            {'name': _('email address'), 'values': (1, 2.5, True)},
+            {'big': 2 ** 70},
+        ):
+            self.assertEqual(
+                FastJSONRenderer().render(data), JSONRenderer().render(data)
+            )
+
+    def test_indent(self):
+        """Test that indented output is left to JSONRenderer"""
+        data = {'id': 1}
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            FastJSONRenderer().render(data, media_type),
+            JSONRenderer().render(data, media_type)
+        )
+
+    def test_parse(self):
+        """Test parsing JSON like JSONParser"""
+        for body in (b'{"title": "Cr\xc3\xaapes", "price": 5.5}',
+                     b'[1, 2, 36893488147419103232]'):
+            self.assertEqual(
+                FastJSONParser().parse(io.BytesIO(body)),
+                JSONParser().parse(io.BytesIO(body))
+            )
+
+    def test_parse_error(self):
+        """Test that invalid JSON gives a parse error"""
+        for body in (b'{"title": ', b'NaN', b''):
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(io.BytesIO(body))
+
+
+class MessagePackTests(TestCase):
+    """Test MessagePack content negotiation"""
+
+    def setUp(self):
+        if msgpack is None:
+            self.skipTest('msgpack is not installed')
+
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_render_and_parse(self):
+        """Test that data survives a round trip, decimals as in JSON"""
+        data = {'price': '5.50', 'total': Decimal('5.5'), 'tags': [1, 2]}
+        body = MessagePackRenderer().render(data)
+
+        self.assertEqual(
+            MessagePackParser().parse(io.BytesIO(body)),
+            json.loads(JSONRenderer().render(data))
+        )
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(io.BytesIO(body[:-1]))
+
+    def test_negotiation(self):
+        """Test creating and listing recipes in MessagePack"""
+        payload = {'title': 'Crêpes', 'time_minutes': 10, 'price': '5.50',
+                   'tags': [], 'ingredients': []}
+        res = self.client.post(
+            RECIPES_URL, msgpack.packb(payload),
+            content_type='application/msgpack',
+            HTTP_ACCEPT='application/msgpack'
+        )
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(res.content)['title'], 'Crêpes')
+        self.assertTrue(Recipe.objects.filter(title='Crêpes').exists())
+
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT='application/msgpack')
+        json_res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(
+            msgpack.unpackb(res.content), json.loads(json_res.content)
+        )
+
+    def test_token(self):
+        """Test that tokens can be requested in MessagePack"""
+        res = self.client.post(
+            TOKEN_URL,
+            msgpack.packb({'email': 'test@example.com',
+                           'password': 'testpass'}),
+            content_type='application/msgpack',
+            HTTP_ACCEPT='application/msgpack'
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('token', msgpack.unpackb(res.content))
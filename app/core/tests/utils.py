@@ -0,0 +1,43 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+@contextmanager
+def run_on_commit(using=DEFAULT_DB_ALIAS):
+    """Run the on_commit callbacks registered in the wrapped block
+
+    Test cases roll back instead of committing, so these callbacks would
+    never run otherwise.
+    """
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    yield
+
+    callbacks = connection.run_on_commit[start:]
+    del connection.run_on_commit[start:]
+    for _, callback in callbacks:
+        callback()
+
+
+class QueryBudgetMixin:
+    """Mixin for test cases asserting a maximum number of queries"""
+
+    @contextmanager
+    def assertMaxQueries(self, num, using=DEFAULT_DB_ALIAS):
+        """Fail if the wrapped block runs more than `num` queries"""
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+
+        executed = len(context)
+        self.assertLessEqual(
+            executed, num,
+            '%d queries executed, budget is %d\n%s' % (
+                executed, num,
+                '\n'.join(
+                    '%d. %s' % (i, query['sql'])
+                    for i, query in enumerate(context.captured_queries, 1)
+                )
+            )
+        )
@@ -0,0 +1,110 @@
+import heapq
+from array import array
+from bisect import bisect_left
+
+from django.db.models.functions import Lower
+
+from core.local_cache import LocalLRUCache
+from recipe.versions import get_version
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# Users with more rows than this are always answered by the database
+MAX_CACHED_ROWS = 20000
+
+# Bounded by the total number of names held by the cached indexes
+_indexes = LocalLRUCache(maxsize=500000)
+
+# Sorts after every character, so prefix + _HIGHEST ends a prefix range
+_HIGHEST = '\U0010ffff'
+
+
+class PrefixIndex:
+    """Compact prefix index over the names of a user's rows
+
+    Names are case-folded and kept sorted in flat arrays, the leaves of a
+    trie laid out in order, so the names starting with a prefix form one
+    contiguous range found by binary search. Matches are ranked by usage,
+    then name, and the rankings of one and two letter prefixes, which
+    match the most names, are memoized.
+    """
+
+    def __init__(self, rows):
+        rows = sorted(
+            (name.casefold(), pk, name, usage) for pk, name, usage in rows
+        )
+        self.keys = [row[0] for row in rows]
+        self.ids = array('q', (row[1] for row in rows))
+        self.names = [row[2] for row in rows]
+        self.usage = array('q', (row[3] for row in rows))
+        self._ranked = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _rank(self, prefix, limit):
+        low = bisect_left(self.keys, prefix)
+        high = bisect_left(self.keys, prefix + _HIGHEST, low)
+        usage = self.usage
+
+        def key(i):
+            return -usage[i], i
+
+        if high - low <= limit:
+            return sorted(range(low, high), key=key)
+        return heapq.nsmallest(limit, range(low, high), key=key)
+
+    def search(self, prefix, limit=DEFAULT_LIMIT):
+        """Return (id, name) pairs of the best names starting with prefix"""
+        prefix = prefix.casefold()
+        if len(prefix) <= 2:
+            ranked = self._ranked.get(prefix)
+            if ranked is None:
+                ranked = self._ranked[prefix] = self._rank(prefix, MAX_LIMIT)
+        else:
+            ranked = self._rank(prefix, limit)
+
+        return [(self.ids[i], self.names[i]) for i in ranked[:limit]]
+
+
+def _database_search(queryset, prefix, limit):
+    """Answer a prefix query with the (user_id, UPPER(name)) index"""
+    return list(
+        queryset.filter(name__istartswith=prefix)
+        .order_by('-recipe_count', Lower('name'), 'id')
+        .values_list('id', 'name')[:limit]
+    )
+
+
+def prefix_matches(queryset, user_id, prefix, limit=DEFAULT_LIMIT):
+    """Return the (id, name) pairs of a user's best prefix matches
+
+    Answered from the in-process PrefixIndex of the user when it is cached.
+    On a miss the database answers and the index is built for the next
+    keystroke, unless the user has too many rows to be cached.
+    """
+    model = queryset.model
+    queryset = queryset.filter(user_id=user_id)
+    key = (model._meta.label, user_id)
+    version = (
+        get_version(model._meta.model_name, user_id),
+        get_version('index', user_id),
+    )
+    index = _indexes.get(key, version)
+    if isinstance(index, PrefixIndex):
+        return index.search(prefix, limit)
+
+    results = _database_search(queryset, prefix, limit)
+    if index is None:
+        rows = list(
+            queryset.values_list('id', 'name', 'recipe_count')
+            [:MAX_CACHED_ROWS + 1]
+        )
+        if len(rows) > MAX_CACHED_ROWS:
+            _indexes.set(key, version, 'too large')
+        else:
+            index = PrefixIndex(rows)
+            _indexes.set(key, version, index, weight=max(1, len(index)))
+
+    return results
@@ -0,0 +1,167 @@
+from django.db import IntegrityError, connections, transaction
+from rest_framework.exceptions import ValidationError
+
+from core import changes, search
+from core.models import Tag, Ingredient, Recipe
+from recipe.signals import invalidate
+
+BATCH_SIZE = 1000
+
+LINKS = (('tags', Tag), ('ingredients', Ingredient))
+
+
+def _owned_ids(model, user, items, field):
+    """Return the IDs referenced by the items that the user owns
+
+    The rows are locked until the transaction ends, so that they can't be
+    deleted before the recipes linking to them are committed.
+    """
+    ids = {pk for item in items for pk in item.get(field, ())}
+    if not ids:
+        return set()
+
+    return set(
+        model.objects.select_for_update().filter(user=user, pk__in=ids)
+        .order_by('pk').values_list('pk', flat=True)
+    )
+
+
+def _check_links(user, items):
+    """Raise per item errors for tags or ingredients the user doesn't own"""
+    errors = [{} for _ in items]
+    for field, model in LINKS:
+        owned = _owned_ids(model, user, items, field)
+        for item, item_errors in zip(items, errors):
+            missing = [pk for pk in item.get(field, ()) if pk not in owned]
+            if missing:
+                item_errors[field] = [
+                    f'Invalid pk "{pk}" - object does not exist.'
+                    for pk in missing
+                ]
+
+    if any(errors):
+        raise ValidationError(errors)
+
+
+def insert_recipes(recipes):
+    """Insert recipes, setting their primary keys
+
+    Returns whether the recipes were saved one by one, on databases that
+    can't return the keys of bulk inserts, in which case model signals
+    have already added them to the change feed.
+    """
+    connection = connections[Recipe.objects.db]
+    if connection.features.can_return_rows_from_bulk_insert:
+        Recipe.objects.bulk_create(recipes, batch_size=BATCH_SIZE)
+        return False
+
+    for recipe in recipes:
+        recipe.save(force_insert=True)
+
+    return True
+
+
+def insert_links(through, column, links):
+    """Insert (recipe ID, tag or ingredient ID) rows into a M2M table
+
+    PostgreSQL receives all the rows in one statement as two arrays, other
+    databases get batched multi-row INSERTs.
+    """
+    connection = connections[through.objects.db]
+    if connection.vendor != 'postgresql':
+        through.objects.bulk_create(
+            [
+                through(recipe_id=pk, **{column: attr_pk})
+                for pk, attr_pk in links
+            ],
+            batch_size=BATCH_SIZE
+        )
+        return
+
+    quote = connection.ops.quote_name
+    recipe_ids, attr_ids = zip(*links)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(through._meta.db_table)} '
+            f'({quote("recipe_id")}, {quote(column)}) '
+            f'SELECT * FROM unnest(%s::integer[], %s::integer[])',
+            [list(recipe_ids), list(attr_ids)]
+        )
+
+
+def _create_recipes(user, items):
+    """Insert checked recipes with their links, returning the recipes"""
+    _check_links(user, items)
+    recipes = [
+        Recipe(
+            user=user,
+            **{
+                key: value for key, value in item.items()
+                if key not in ('tags', 'ingredients')
+            }
+        )
+        for item in items
+    ]
+    signals_sent = insert_recipes(recipes)
+
+    for field, model in LINKS:
+        through = getattr(Recipe, field).through
+        column = f'{model._meta.model_name}_id'
+        links = [
+            (recipe.pk, pk)
+            for recipe, item in zip(recipes, items)
+            for pk in dict.fromkeys(item.get(field, ()))
+        ]
+        if links:
+            insert_links(through, column, links)
+            model.objects.filter(
+                pk__in={pk for _, pk in links}
+            ).refresh_recipe_counts()
+
+    recipe_ids = [recipe.pk for recipe in recipes]
+    search.update_search_index(recipe_ids)
+    if not signals_sent:
+        changes.record_changes(user.id, Recipe, recipe_ids)
+    invalidate(user.id, 'index', 'recipe', 'tag', 'ingredient', 'data')
+
+    return recipes
+
+
+def create_recipes(user, items):
+    """Create recipes with their tags and ingredients in one transaction
+
+    The items are validated recipe data with lists of tag and ingredient
+    IDs. Referenced IDs are checked and locked with one query per model,
+    recipes and links are inserted in batches, then the recipe counts,
+    search index, change feed and caches that signals would maintain are
+    refreshed once for the whole batch. Returns the items with their new
+    IDs.
+    """
+    try:
+        with transaction.atomic():
+            recipes = _create_recipes(user, items)
+    except IntegrityError:
+        raise ValidationError(
+            'A tag or ingredient was deleted while creating the recipes.'
+        )
+
+    return [
+        {**item, 'id': recipe.pk} for recipe, item in zip(recipes, items)
+    ]
+
+
+def get_or_create_attrs(model, user, names):
+    """Return a user's tags or ingredients by name, creating missing ones
+
+    Rows are inserted without model signals, so the change feed and cache
+    versions are updated here for the rows created.
+    """
+    with transaction.atomic():
+        rows, created = model.objects.get_or_create_names(user, names)
+        if created:
+            changes.record_changes(
+                user.id, model, [row.pk for row in created]
+            )
+            invalidate(user.id, model._meta.model_name, 'data')
+
+    return rows
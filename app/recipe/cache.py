@@ -0,0 +1,152 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers
+)
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from recipe.versions import get_last_modified, get_version
+
+LIST_CACHE_TIMEOUT = 60 * 5
+
+_STATS_KEYS = {
+    'hits': 'recipe:list-cache:hits',
+    'misses': 'recipe:list-cache:misses',
+}
+
+
+def _count(name):
+    key = _STATS_KEYS[name]
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def _request_digest(request, *extra):
+    """Return a digest of a request's normalized query parameters"""
+    params = urlencode(sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    ))
+    text = '|'.join(map(str, extra + (params,)))
+
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
+def list_cache_stats():
+    """Return the hit and miss counters of the list response cache"""
+    return {
+        name: cache.get(key, 0) for name, key in _STATS_KEYS.items()
+    }
+
+
+def reset_list_cache_stats():
+    """Reset the hit and miss counters of the list response cache"""
+    cache.delete_many(list(_STATS_KEYS.values()))
+
+
+class CachedListMixin:
+    """Cache list responses until the user's recipe data changes
+
+    Responses are keyed by user, endpoint, host and normalized query
+    parameters, plus the user's data version, which signals bump whenever
+    a recipe, tag or ingredient of the user changes. Stale entries are
+    never read again and simply expire. Nothing is cached unless the
+    cache is shared by every process.
+    """
+    list_cache_timeout = LIST_CACHE_TIMEOUT
+
+    def get_list_cache_key(self, request):
+        digest = _request_digest(request, request.get_host())
+        version = get_version('data', request.user.id)
+
+        return f'recipe:list:{request.user.id}:{version}:' \
+               f'{self.basename}:{digest}'
+
+    def list(self, request, *args, **kwargs):
+        if not settings.CACHE_SHARED:
+            return super().list(request, *args, **kwargs)
+
+        key = self.get_list_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None and cached['user_id'] == request.user.id:
+            _count('hits')
+            return Response(cached['data'], headers={'X-Cache': 'HIT'})
+
+        _count('misses')
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(
+                key,
+                {'user_id': request.user.id, 'data': response.data},
+                self.list_cache_timeout
+            )
+        response['X-Cache'] = 'MISS'
+
+        return response
+
+
+class ConditionalGetMixin:
+    """Answer conditional list requests with 304 Not Modified
+
+    Validators are taken from the user's data version and last change
+    timestamp, which signals maintain, so a client whose copy is current
+    gets an empty 304 without the response being built. The ETag also
+    covers the path, query parameters and rendered format, and tells apart
+    changes made within the same second. Responses carry no validators
+    unless the cache is shared by every process.
+    """
+
+    def get_validators(self, request):
+        """Return the ETag and Last-Modified timestamp of a response"""
+        user_id = request.user.id
+        digest = _request_digest(
+            request,
+            user_id,
+            get_version('data', user_id),
+            request.path,
+            request.accepted_renderer.format,
+        )
+
+        return f'"{digest}"', get_last_modified(user_id)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        """Return 304 if the client's copy is current, else call handler"""
+        if not settings.CACHE_SHARED:
+            return handler(request, *args, **kwargs)
+
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Authorization',))
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+
+class ConditionalRetrieveMixin(ConditionalGetMixin):
+    """Answer conditional list and detail requests with 304 Not Modified"""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
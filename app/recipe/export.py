@@ -0,0 +1,99 @@
+import csv
+import io
+import json
+from collections import defaultdict
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.models import Tag, Ingredient, Recipe
+
+CHUNK_SIZE = 2000
+
+RECIPE_FIELDS = ('id', 'title', 'time_minutes', 'price', 'link')
+CSV_COLUMNS = RECIPE_FIELDS + ('tags', 'ingredients')
+
+# Separates the tag and ingredient names of a recipe in CSV exports
+CSV_NAME_SEPARATOR = '|'
+
+
+def _linked(model, recipe_ids):
+    """Return the tags or ingredients of recipes, by recipe ID"""
+    name = model._meta.model_name
+    through = getattr(Recipe, f'{name}s').through
+    rows = through.objects.filter(recipe_id__in=recipe_ids).order_by(
+        'recipe_id', f'{name}_id'
+    ).values_list('recipe_id', f'{name}_id', f'{name}__name')
+
+    linked = defaultdict(list)
+    for recipe_id, pk, value in rows:
+        linked[recipe_id].append({'id': pk, 'name': value})
+
+    return linked
+
+
+def iter_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """Yield lists of recipes as dicts with their tags and ingredients
+
+    Recipes are read in ID order through a server-side cursor where the
+    database has them, and the tags and ingredients of each chunk are
+    fetched with one query per model, so memory use depends on the chunk
+    size only.
+    """
+    rows = queryset.order_by('id').values(*RECIPE_FIELDS).iterator(
+        chunk_size=chunk_size
+    )
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+
+        ids = [row['id'] for row in chunk]
+        tags = _linked(Tag, ids)
+        ingredients = _linked(Ingredient, ids)
+        for row in chunk:
+            row['tags'] = tags.get(row['id'], [])
+            row['ingredients'] = ingredients.get(row['id'], [])
+
+        yield chunk
+
+
+def render_ndjson(chunk):
+    """Return recipes as lines of JSON"""
+    return ''.join(
+        json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in chunk
+    )
+
+
+def render_csv(chunk, header=False):
+    """Return recipes as CSV rows, tags and ingredients given by name"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_COLUMNS)
+    for row in chunk:
+        writer.writerow(
+            [row[field] for field in RECIPE_FIELDS] + [
+                CSV_NAME_SEPARATOR.join(item['name'] for item in row[field])
+                for field in ('tags', 'ingredients')
+            ]
+        )
+
+    return buffer.getvalue()
+
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def export_recipes(queryset, export_format, chunk_size=CHUNK_SIZE):
+    """Yield the text of an NDJSON or CSV export of recipes, chunk by chunk"""
+    if export_format == 'csv':
+        yield render_csv([], header=True)
+        for chunk in iter_chunks(queryset, chunk_size):
+            yield render_csv(chunk)
+    else:
+        for chunk in iter_chunks(queryset, chunk_size):
+            yield render_ndjson(chunk)
@@ -0,0 +1,147 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+
+def _parse_names(value):
+    """Return the field names of a comma separated query parameter"""
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+class SparseFieldsetMixin:
+    """Serialize only the fields a read request asks for, and load no more
+
+    `?fields=id,title` keeps the listed fields and `?omit=link` drops the
+    listed ones. The queryset then selects only the columns the remaining
+    fields and the ordering need, and prefetches only the many-to-many
+    relations that are still serialized.
+    """
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+    sparse_actions = ('list', 'retrieve')
+
+    def get_sparse_fields(self):
+        """Return the names of the fields to serialize, or None for all"""
+        if hasattr(self, '_sparse_fields'):
+            return self._sparse_fields
+
+        self._sparse_fields = None
+        params = self.request.query_params
+        requested = _parse_names(params.get(self.fields_query_param))
+        omitted = _parse_names(params.get(self.omit_query_param))
+        if self.action not in self.sparse_actions or \
+                not (requested or omitted):
+            return None
+
+        available = list(self.get_serializer_class()().fields)
+        for param, names in ((self.fields_query_param, requested),
+                             (self.omit_query_param, omitted)):
+            unknown = [name for name in names if name not in available]
+            if unknown:
+                raise ValidationError({param: [
+                    f'Unknown fields: {", ".join(unknown)}. Choose from '
+                    f'{", ".join(available)}.'
+                ]})
+
+        self._sparse_fields = [
+            name for name in available
+            if (not requested or name in requested) and name not in omitted
+        ]
+
+        return self._sparse_fields
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            target = getattr(serializer, 'child', serializer)
+            for name in list(target.fields):
+                if name not in fields:
+                    target.fields.pop(name)
+
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+
+        return self.prune_queryset(queryset, fields)
+
+    def prune_queryset(self, queryset, fields):
+        """Load only the columns and relations of the given fields
+
+        The queryset is left as is if a field doesn't map to a model field.
+        """
+        opts = queryset.model._meta
+        serializer_fields = self.get_serializer_class()().fields
+        ordering = getattr(self, 'get_ordering', lambda: ())()
+        columns = {opts.pk.name}
+        relations = []
+        for name in fields:
+            try:
+                field = opts.get_field(serializer_fields[name].source)
+            except FieldDoesNotExist:
+                return queryset
+            if field.many_to_many:
+                relations.append(field.name)
+            elif field.concrete:
+                columns.add(field.name)
+        for name in ordering:
+            try:
+                columns.add(opts.get_field(name.lstrip('-')).name)
+            except FieldDoesNotExist:
+                pass
+
+        queryset = queryset.only(*columns).prefetch_related(None)
+
+        prefetches = getattr(self, 'get_prefetches', lambda names: names)
+
+        return queryset.prefetch_related(*prefetches(relations))
+
+
+class ExpandableFieldsMixin:
+    """Nest the related objects a list request asks for instead of IDs
+
+    `?expand=tags` replaces the `tags` field of the serializer by the
+    serializer of `expandable_fields['tags']`, like the detail action.
+    """
+    expand_query_param = 'expand'
+    expand_actions = ('list',)
+    expandable_fields = {}
+
+    def get_expanded_fields(self):
+        """Return the names of the fields to expand, or None"""
+        if hasattr(self, '_expanded_fields'):
+            return self._expanded_fields
+
+        self._expanded_fields = None
+        names = _parse_names(
+            self.request.query_params.get(self.expand_query_param)
+        )
+        if self.action not in self.expand_actions or not names:
+            return None
+
+        unknown = [name for name in names if name not in
+                   self.expandable_fields]
+        if unknown:
+            raise ValidationError({self.expand_query_param: [
+                f'Unknown fields: {", ".join(unknown)}. Choose from '
+                f'{", ".join(self.expandable_fields)}.'
+            ]})
+        self._expanded_fields = [
+            name for name in self.expandable_fields if name in names
+        ]
+
+        return self._expanded_fields
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        target = getattr(serializer, 'child', serializer)
+        for name in self.get_expanded_fields() or ():
+            if name in target.fields:
+                target.fields[name] = self.expandable_fields[name](
+                    many=True, read_only=True
+                )
+
+        return serializer
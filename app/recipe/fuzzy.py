@@ -0,0 +1,160 @@
+import heapq
+import math
+import re
+import sys
+from array import array
+from collections import Counter, defaultdict
+from itertools import chain
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, FloatField, Value, When
+from django.db.models.functions import Cast
+
+from core.local_cache import LocalLRUCache
+from recipe.versions import get_version
+
+SIMILARITY_THRESHOLD = 0.3
+
+# Most similar rows kept by a fuzzy filter, on every database
+MAX_RESULTS = 500
+
+# Estimated bytes of the indexes cached by each process. Larger indexes
+# are built for each request and never cached.
+MAX_INDEX_BYTES = 64 * 2 ** 20
+
+_WORD_RE = re.compile(r'[^\W_]+')
+
+_indexes = LocalLRUCache(maxsize=MAX_INDEX_BYTES)
+_trigram_support = {}
+
+
+def trigrams(text):
+    """Return the trigrams of a text the way pg_trgm extracts them"""
+    grams = set()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    return grams
+
+
+class TrigramIndex:
+    """In-memory inverted index from trigrams to row IDs
+
+    Similarity is computed like pg_trgm's similarity(): the number of
+    shared trigrams divided by the number of distinct trigrams of both
+    strings. Only the posting lists of the query trigrams are read, and
+    rows sharing fewer than ceil(threshold * n) of the n query trigrams
+    cannot reach the threshold, so they are dropped before scoring.
+    """
+
+    def __init__(self, rows):
+        postings = defaultdict(list)
+        self.sizes = {}
+        for pk, text in rows:
+            grams = trigrams(text)
+            self.sizes[pk] = len(grams)
+            for gram in grams:
+                postings[gram].append(pk)
+
+        self.postings = {
+            gram: array('q', pks) for gram, pks in postings.items()
+        }
+
+    @property
+    def nbytes(self):
+        """Return an estimate of the memory held by the index"""
+        return (
+            sys.getsizeof(self.sizes) + sys.getsizeof(self.postings)
+            + sum(map(sys.getsizeof, self.postings.values()))
+            # Row IDs and trigram strings, besides the containers
+            + 32 * len(self.sizes) + 56 * len(self.postings)
+        )
+
+    def search(self, text, threshold=SIMILARITY_THRESHOLD,
+               limit=MAX_RESULTS):
+        """Return up to `limit` (similarity, pk) pairs, best first"""
+        grams = trigrams(text)
+        size = len(grams)
+        if not size:
+            return []
+
+        shared = Counter(chain.from_iterable(
+            self.postings.get(gram, ()) for gram in grams
+        ))
+        required = max(1, math.ceil(threshold * size))
+        sizes = self.sizes
+        matches = []
+        for pk, count in shared.items():
+            if count >= required:
+                score = count / (size + sizes[pk] - count)
+                if score >= threshold:
+                    matches.append((score, pk))
+
+        return heapq.nlargest(limit, matches)
+
+
+def has_trigram_support(connection):
+    """Return whether the pg_trgm extension is installed on a database"""
+    if connection.vendor != 'postgresql':
+        return False
+
+    if connection.alias not in _trigram_support:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            )
+            _trigram_support[connection.alias] = cursor.fetchone() is not None
+
+    return _trigram_support[connection.alias]
+
+
+def get_index(model, field, user_id):
+    """Return the trigram index of a user's rows, building it if needed"""
+    key = (model._meta.label, field, user_id)
+    version = get_version(model._meta.model_name, user_id)
+    index = _indexes.get(key, version)
+    if index is None:
+        rows = model.objects.filter(user_id=user_id).values_list('pk', field)
+        index = TrigramIndex(rows.iterator())
+        nbytes = index.nbytes
+        if nbytes <= MAX_INDEX_BYTES:
+            _indexes.set(key, version, index, weight=nbytes)
+
+    return index
+
+
+def fuzzy_filter(queryset, field, text, user_id):
+    """Filter rows whose field is similar to a text
+
+    Matching rows get a `similarity` annotation between 0 and 1, and only
+    the user's MAX_RESULTS most similar rows are kept. PostgreSQL with
+    pg_trgm answers from its trigram GIN index, other databases from an
+    in-process TrigramIndex of the user's rows.
+    """
+    connection = connections[queryset.db]
+    if has_trigram_support(connection):
+        similarity = Cast(TrigramSimilarity(field, text), FloatField())
+        best = queryset.model.objects.filter(
+            user_id=user_id, **{f'{field}__trigram_similar': text}
+        ).annotate(similarity=similarity).order_by(
+            '-similarity', '-pk'
+        ).values('pk')[:MAX_RESULTS]
+        return queryset.filter(pk__in=best).annotate(similarity=similarity)
+
+    matches = get_index(queryset.model, field, user_id).search(
+        text, limit=MAX_RESULTS
+    )
+    if not matches:
+        return queryset.annotate(
+            similarity=Value(0.0, output_field=FloatField())
+        ).none()
+
+    return queryset.filter(pk__in=[pk for _, pk in matches]).annotate(
+        similarity=Case(
+            *[When(pk=pk, then=Value(score)) for score, pk in matches],
+            default=Value(0.0),
+            output_field=FloatField()
+        )
+    )
@@ -0,0 +1,229 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from core.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+# Longest side in pixels and format of each variant of a recipe image
+VARIANTS = {
+    'thumbnail': (200, 'JPEG'),
+    'thumbnail_webp': (200, 'WEBP'),
+    'medium': (800, 'JPEG'),
+    'medium_webp': (800, 'WEBP'),
+}
+
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'progressive': True},
+    'WEBP': {'quality': 80},
+}
+
+# Threads making variants. Pillow releases the GIL while decoding,
+# resizing and encoding, so they can use as many cores.
+MAX_WORKERS = os.cpu_count() or 1
+
+# Large images decoded at once. Images other than JPEG are decoded at
+# full size, about 150 MB for 50 megapixels, until reduced to the largest
+# variant, and images decoded at more than LARGE_DECODE_PIXELS wait for
+# one of MAX_DECODES slots.
+MAX_DECODES = 2
+LARGE_DECODE_PIXELS = 16 * 10 ** 6
+
+# Images waiting for their variants at most. Further images are left
+# without variants for the make_image_variants command.
+MAX_PENDING = 256
+
+# Images are reduced by whole factors to about this many times their
+# final size, then resampled
+REDUCING_GAP = 2
+
+_executor = ThreadPoolExecutor(
+    max_workers=MAX_WORKERS, thread_name_prefix='recipe-images'
+)
+_decodes = threading.BoundedSemaphore(MAX_DECODES)
+_pending = threading.BoundedSemaphore(MAX_PENDING)
+
+
+def _fit(size, longest):
+    """Return a size scaled down to fit a square, keeping its ratio"""
+    width, height = size
+    scale = longest / max(width, height)
+    if scale >= 1:
+        return size
+
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _downscale(image, size):
+    """Return an image resized to `size`, reducing it first if much larger"""
+    if image.size == size:
+        return image
+
+    factor = min(
+        image.width // (size[0] * REDUCING_GAP),
+        image.height // (size[1] * REDUCING_GAP)
+    )
+    if factor > 1:
+        image = image.reduce(factor)
+
+    return image.resize(size, Image.LANCZOS)
+
+
+def render_variants(source):
+    """Return the bytes of each variant of an image file, by name
+
+    JPEG files are decoded at the smallest scale the largest variant
+    allows, and at most MAX_DECODES large images are decoded at once.
+    Variants are made from the largest to the smallest, each from the
+    previous one, and keep no EXIF or other metadata.
+    """
+    largest = max(size for size, _ in VARIANTS.values())
+    with Image.open(source) as image:
+        width, height = _fit(image.size, largest)
+        image.draft('RGB', (width * REDUCING_GAP, height * REDUCING_GAP))
+        large = image.width * image.height > LARGE_DECODE_PIXELS
+        with _decodes if large else nullcontext():
+            image = ImageOps.exif_transpose(image)
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            image = _downscale(image, _fit(image.size, largest))
+
+    variants = {}
+    for name, (longest, image_format) in sorted(
+        VARIANTS.items(), key=lambda item: -item[1][0]
+    ):
+        image = _downscale(image, _fit(image.size, longest))
+        output = io.BytesIO()
+        image.save(output, image_format, **SAVE_OPTIONS[image_format])
+        variants[name] = (output.getvalue(), image_format)
+
+    return variants
+
+
+def make_variants(recipe_id, name):
+    """Store the variants of a recipe image and link them to the recipe
+
+    Returns the stored names by variant, or None, deleting the variants,
+    when the recipe's image changed in the meantime.
+    """
+    storage = Recipe._meta.get_field('image').storage
+    with storage.open(name) as source:
+        variants = render_variants(source)
+
+    stem = os.path.splitext(name)[0]
+    names = {
+        variant: storage.save(
+            f'{stem}-{variant}.{EXTENSIONS[image_format]}',
+            ContentFile(data)
+        )
+        for variant, (data, image_format) in variants.items()
+    }
+
+    with transaction.atomic():
+        recipe = Recipe.objects.select_for_update().filter(
+            pk=recipe_id, image=name
+        ).first()
+        if recipe is None:
+            delete_variants(names)
+            return None
+        recipe.image_variants = names
+        recipe.save(update_fields=['image_variants'])
+
+    return names
+
+
+def delete_variants(names):
+    """Delete stored variants, given their names by variant"""
+    storage = Recipe._meta.get_field('image').storage
+    for name in names.values():
+        storage.delete(name)
+
+
+def _process(recipe_id, name, stale):
+    """Make the variants of a new image and delete those of the old one
+
+    Returns the names of the variants, or None if none were stored.
+    """
+    try:
+        names = make_variants(recipe_id, name)
+        delete_variants(stale)
+    except Exception:
+        logger.exception('Failed to make the variants of %s', name)
+        return None
+
+    return names
+
+
+def _process_in_thread(recipe_id, name, stale):
+    """Process an image in a worker thread, with its own connection"""
+    close_old_connections()
+    try:
+        return _process(recipe_id, name, stale)
+    finally:
+        close_old_connections()
+
+
+def _process_pending(recipe_id, name, stale):
+    """Process a scheduled image, making room for another"""
+    try:
+        _process_in_thread(recipe_id, name, stale)
+    finally:
+        _pending.release()
+
+
+def _submit(recipe_id, name, stale):
+    """Queue an image for its variants, unless too many already wait"""
+    if not _pending.acquire(blocking=False):
+        logger.warning(
+            'Too many images waiting for variants, leaving %s without', name
+        )
+        return
+    _executor.submit(_process_pending, recipe_id, name, stale)
+
+
+def schedule_variants(recipe, stale=None):
+    """Make the variants of a recipe's image in the background
+
+    The work starts once the current transaction commits. `stale` holds
+    the variants of the recipe's previous image, deleted afterwards.
+    Images not processed, because too many were waiting or the process
+    stopped, keep empty variants until make_image_variants is run.
+    """
+    recipe_id, name = recipe.pk, recipe.image.name
+    transaction.on_commit(lambda: _submit(recipe_id, name, stale or {}))
+
+
+def missing_variants():
+    """Return the recipes with an image but no variants"""
+    return Recipe.objects.exclude(image__isnull=True).exclude(
+        image=''
+    ).filter(image_variants={})
+
+
+def make_missing_variants(workers=MAX_WORKERS):
+    """Make the variants of every image lacking them, returning how many
+
+    Images are processed by `workers` threads, or in this thread for one.
+    The variants of images replaced while theirs were lost aren't known
+    anymore, and stay in storage.
+    """
+    recipes = list(missing_variants().values_list('pk', 'image'))
+    if workers == 1:
+        made = [_process(pk, name, {}) for pk, name in recipes]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            made = list(executor.map(
+                lambda recipe: _process_in_thread(*recipe, {}), recipes
+            ))
+
+    return sum(names is not None for names in made)
@@ -0,0 +1,258 @@
+import csv
+import io
+import json
+from collections import Counter, defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connections, transaction
+
+from core import changes, search
+from core.models import ImportCheckpoint, Recipe
+from recipe.bulk import (
+    LINKS, get_or_create_attrs, insert_links, insert_recipes
+)
+from recipe.export import CSV_NAME_SEPARATOR, RECIPE_FIELDS
+from recipe.signals import invalidate
+
+BATCH_SIZE = 5000
+
+IMPORT_FORMATS = ('ndjson', 'csv')
+
+# Recipe columns read from each record, the ID of exports being ignored
+IMPORT_FIELDS = tuple(field for field in RECIPE_FIELDS if field != 'id')
+
+
+def read_records(lines, import_format):
+    """Yield recipes as dicts from the lines of an NDJSON or CSV export"""
+    if import_format == 'csv':
+        for row in csv.DictReader(lines):
+            for field, _ in LINKS:
+                value = row.get(field) or ''
+                row[field] = value.split(CSV_NAME_SEPARATOR) if value else []
+            yield row
+        return
+
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            raise ValidationError(f'Line {number}: invalid JSON')
+
+
+def _record_user_id(record, user_id, position):
+    """Return the ID of the user a record belongs to"""
+    value = record.get('user') or user_id
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f'Record {position}: no valid user ID given')
+
+
+def _clean_names(values):
+    """Return tag or ingredient names given as strings or objects"""
+    names = []
+    for value in values or ():
+        if isinstance(value, dict):
+            value = value.get('name')
+        value = ' '.join(str(value or '').split())
+        if value:
+            names.append(value)
+
+    return names
+
+
+def _clean(record, position):
+    """Return the recipe fields and link names of a record"""
+    data = {}
+    errors = []
+    for name in IMPORT_FIELDS:
+        field = Recipe._meta.get_field(name)
+        value = record.get(name)
+        if value is None and field.blank:
+            value = ''
+        try:
+            data[name] = field.clean(value, None)
+        except ValidationError as error:
+            errors.append(f'{name}: {" ".join(error.messages)}')
+
+    for name, model in LINKS:
+        data[name] = _clean_names(record.get(name))
+        max_length = model._meta.get_field('name').max_length
+        if any(len(value) > max_length for value in data[name]):
+            errors.append(
+                f'{name}: names have at most {max_length} characters'
+            )
+
+    if errors:
+        raise ValidationError(f'Record {position}: {"; ".join(errors)}')
+
+    return data
+
+
+def copy_rows(connection, table, columns, rows, not_null=()):
+    """Load rows into a PostgreSQL table with COPY in CSV format
+
+    Columns listed in `not_null` read empty values as empty strings rather
+    than NULL.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+
+    quote = connection.ops.quote_name
+    options = 'FORMAT csv'
+    if not_null:
+        options += f', FORCE_NOT_NULL ({", ".join(map(quote, not_null))})'
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {quote(table)} ({", ".join(map(quote, columns))}) '
+            f'FROM STDIN WITH ({options})',
+            buffer
+        )
+
+
+def reserve_ids(connection, model, count):
+    """Return `count` new IDs from the sequence of a PostgreSQL table"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+            "FROM generate_series(1, %s)",
+            [model._meta.db_table, count]
+        )
+        return [pk for pk, in cursor.fetchall()]
+
+
+def _copy_recipes(connection, user, records):
+    """Insert recipes with COPY, returning their IDs"""
+    ids = reserve_ids(connection, Recipe, len(records))
+    copy_rows(
+        connection,
+        Recipe._meta.db_table,
+        ('id', 'user_id') + IMPORT_FIELDS + ('image_variants',),
+        (
+            [pk, user.id] + [record[field] for field in IMPORT_FIELDS] +
+            ['{}']
+            for pk, record in zip(ids, records)
+        ),
+        not_null=('title', 'link')
+    )
+
+    return ids
+
+
+def _load_user(user, records, use_copy):
+    """Insert a user's recipes with their tags and ingredients"""
+    attrs = {}
+    for field, model in LINKS:
+        names = list(dict.fromkeys(
+            name for record in records for name in record[field]
+        ))
+        rows = get_or_create_attrs(model, user, names) if names else []
+        attrs[field] = {name: row.pk for name, row in zip(names, rows)}
+
+    connection = connections[Recipe.objects.db]
+    use_copy = use_copy and connection.vendor == 'postgresql'
+    signals_sent = False
+    if use_copy:
+        recipe_ids = _copy_recipes(connection, user, records)
+    else:
+        recipes = [
+            Recipe(
+                user=user, **{name: record[name] for name in IMPORT_FIELDS}
+            )
+            for record in records
+        ]
+        signals_sent = insert_recipes(recipes)
+        recipe_ids = [recipe.pk for recipe in recipes]
+
+    for field, model in LINKS:
+        through = getattr(Recipe, field).through
+        column = f'{model._meta.model_name}_id'
+        links = [
+            (recipe_id, pk)
+            for recipe_id, record in zip(recipe_ids, records)
+            for pk in dict.fromkeys(
+                attrs[field][name] for name in record[field]
+            )
+        ]
+        if not links:
+            continue
+        if use_copy:
+            copy_rows(
+                connection, through._meta.db_table, ('recipe_id', column),
+                links
+            )
+        else:
+            insert_links(through, column, links)
+        model.objects.add_recipe_counts(Counter(pk for _, pk in links))
+
+    search.update_search_index(recipe_ids)
+    if not signals_sent:
+        changes.record_changes(user.id, Recipe, recipe_ids)
+    invalidate(user.id, 'index', 'recipe', 'tag', 'ingredient', 'data')
+
+
+def _load(batch, checkpoint, position, use_copy):
+    """Import a batch of records in one transaction, moving the checkpoint"""
+    by_user = defaultdict(list)
+    for user_id, record in batch:
+        by_user[user_id].append(record)
+
+    with transaction.atomic():
+        users = get_user_model().objects.in_bulk(list(by_user))
+        for user_id, records in by_user.items():
+            if user_id not in users:
+                raise ValidationError(f'User {user_id} does not exist')
+            _load_user(users[user_id], records, use_copy)
+
+        if checkpoint:
+            ImportCheckpoint.objects.filter(name=checkpoint).update(
+                position=position
+            )
+
+
+def import_recipes(lines, import_format='ndjson', user_id=None,
+                   batch_size=BATCH_SIZE, checkpoint=None, workers=1,
+                   worker=0, use_copy=True):
+    """Import recipes from the lines of an NDJSON or CSV file
+
+    Records have the fields of an export, with tags and ingredients given
+    by name, and belong to their `user` ID or else to `user_id`. Missing
+    tags and ingredients are created. Every batch is committed in its own
+    transaction together with the position of the named checkpoint, so an
+    interrupted import given the same checkpoint resumes after the last
+    committed batch. With several workers, each one imports the records of
+    the users whose ID modulo `workers` equals `worker`. On PostgreSQL rows
+    are loaded with COPY unless `use_copy` is false. Returns the number of
+    recipes imported.
+    """
+    start = 0
+    if checkpoint:
+        start = ImportCheckpoint.objects.get_or_create(
+            name=checkpoint
+        )[0].position
+
+    imported = 0
+    batch = []
+    position = start
+    for position, record in enumerate(read_records(lines, import_format), 1):
+        if position <= start:
+            continue
+        record_user_id = _record_user_id(record, user_id, position)
+        if record_user_id % workers != worker:
+            continue
+
+        batch.append((record_user_id, _clean(record, position)))
+        if len(batch) >= batch_size:
+            _load(batch, checkpoint, position, use_copy)
+            imported += len(batch)
+            batch = []
+
+    if batch or (checkpoint and position > start):
+        _load(batch, checkpoint, position, use_copy)
+        imported += len(batch)
+
+    return imported
@@ -0,0 +1,19 @@
+from django.db.models import Count
+
+
+def recipes_with_all(model, ids):
+    """Return a subquery of the IDs of recipes linked to all the given IDs
+
+    The link table is read through its index on the tag or ingredient
+    column, and recipes are kept when they are linked to as many distinct
+    IDs as were asked for. Nothing is cached, so there is nothing to
+    rebuild when links change.
+    """
+    field = f'{model._meta.model_name}_id'
+    ids = set(ids)
+
+    return model.recipe_set.through.objects.filter(
+        **{f'{field}__in': ids}
+    ).values('recipe_id').annotate(
+        links=Count(field, distinct=True)
+    ).filter(links=len(ids)).values('recipe_id')
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from recipe.export import CHUNK_SIZE, EXPORT_FORMATS, export_recipes
+
+
+class Command(BaseCommand):
+    """Django command to export recipes as NDJSON or CSV"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, dest='user_id',
+            help='Only export the recipes of this user ID',
+        )
+        parser.add_argument(
+            '--format', choices=sorted(EXPORT_FORMATS), default='ndjson',
+            dest='export_format',
+        )
+        parser.add_argument(
+            '--output', default='-',
+            help='File to write the export to, - for standard output',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Number of recipes read per round trip',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.all()
+        if options['user_id']:
+            queryset = queryset.filter(user_id=options['user_id'])
+
+        output = self.stdout
+        if options['output'] != '-':
+            output = open(options['output'], 'w', newline='')
+        try:
+            for text in export_recipes(
+                queryset, options['export_format'], options['chunk_size']
+            ):
+                output.write(text)
+        finally:
+            if output is not self.stdout:
+                output.close()
+
+        self.stderr.write(self.style.SUCCESS('Recipes exported!'))
@@ -0,0 +1,100 @@
+import multiprocessing
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from recipe.importer import BATCH_SIZE, IMPORT_FORMATS, import_recipes
+
+
+def _import_part(options, worker):
+    """Import the share of the input file of one worker"""
+    checkpoint = options['checkpoint']
+    if checkpoint and options['workers'] > 1:
+        checkpoint = f'{checkpoint}.{worker}'
+
+    with open(options['input'], newline='') as lines:
+        return import_recipes(
+            lines,
+            options['import_format'],
+            user_id=options['user_id'],
+            batch_size=options['batch_size'],
+            checkpoint=checkpoint,
+            workers=options['workers'],
+            worker=worker,
+        )
+
+
+def _import_in_process(options, worker):
+    """Import the share of a worker process, closing its connections"""
+    try:
+        return _import_part(options, worker)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    """Django command to import recipes from NDJSON or CSV exports"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--input', default='-',
+            help='File to read the recipes from, - for standard input',
+        )
+        parser.add_argument(
+            '--user', type=int, dest='user_id',
+            help='User ID of the records that do not give one',
+        )
+        parser.add_argument(
+            '--format', choices=IMPORT_FORMATS, default='ndjson',
+            dest='import_format',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Number of recipes committed per transaction',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Name under which progress is saved, to resume the '
+                 'import after an interruption',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of processes, each importing a share of the users',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers < 1:
+            raise CommandError('--workers must be at least 1')
+        if workers > 1 and options['input'] == '-':
+            raise CommandError('--workers needs an --input file')
+
+        try:
+            if options['input'] == '-':
+                imported = import_recipes(
+                    sys.stdin,
+                    options['import_format'],
+                    user_id=options['user_id'],
+                    batch_size=options['batch_size'],
+                    checkpoint=options['checkpoint'],
+                )
+            elif workers == 1:
+                imported = _import_part(options, 0)
+            else:
+                part = {key: options[key] for key in (
+                    'input', 'import_format', 'user_id', 'batch_size',
+                    'checkpoint', 'workers',
+                )}
+                # Forked processes must not share the parent's connections
+                connections.close_all()
+                with multiprocessing.get_context('fork').Pool(workers) as pool:
+                    imported = sum(pool.starmap(
+                        _import_in_process,
+                        [(part, worker) for worker in range(workers)]
+                    ))
+        except ValidationError as error:
+            raise CommandError(' '.join(error.messages))
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {imported} recipes!'))
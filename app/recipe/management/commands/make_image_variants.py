@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from recipe import images
+
+
+class Command(BaseCommand):
+    """Django command to make the variants of images left without them"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=images.MAX_WORKERS,
+            help='Number of threads making variants',
+        )
+
+    def handle(self, *args, **options):
+        made = images.make_missing_variants(max(1, options['workers']))
+        self.stdout.write(f'Made the variants of {made} images')
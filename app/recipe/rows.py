@@ -0,0 +1,276 @@
+from collections import defaultdict
+from functools import lru_cache
+from operator import itemgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import JSONField
+from django.db.models.expressions import RawSQL
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+# Fields whose representation of a database value is the value itself
+_PLAIN_FIELDS = (
+    serializers.IntegerField, serializers.CharField, serializers.URLField,
+    serializers.EmailField, serializers.SlugField,
+)
+
+# Row serializers of views, by view, serializer class and sparse and
+# expanded fields
+_compiled = {}
+
+
+def _column(source, convert):
+    """Return a getter of a converted column of a row"""
+    if convert is None:
+        return itemgetter(source)
+
+    def get(row):
+        value = row[source]
+        return None if value is None else convert(value)
+
+    return get
+
+
+class RowSerializer:
+    """Serialize `values()` rows like a model serializer does instances
+
+    Each readable field of the serializer is compiled once into a column
+    getter: plain columns are read as is, decimals go through a memoized
+    copy of the field's own `to_representation`, fields flagged with
+    `column_representation` through their `to_representation`, and primary
+    key lists of many-to-many fields are read from the through table, one
+    query per relation. Nested serializers of many-to-many fields are
+    compiled too: on PostgreSQL the main query builds their rows as JSON
+    arrays when they only hold plain columns, elsewhere they are read with
+    one joined query per relation. The output is the same as the
+    serializer's, key for key.
+    """
+
+    def __init__(self, model, columns, relations):
+        # (name, attname, converter) of each field, attname being None for
+        # the many-to-many fields in `relations`, which maps their names to
+        # the model field and the row serializer of nested rows, if any
+        self.model = model
+        self.columns = columns
+        self.relations = relations
+        self.names = [model._meta.pk.attname]
+        for _, attname, _ in columns:
+            if attname is not None and attname not in self.names:
+                self.names.append(attname)
+
+    @classmethod
+    def compile(cls, serializer):
+        """Return the row serializer of a model serializer, or None
+
+        None is returned when a field isn't a plain column, a list of
+        primary keys or a nested list of plain columns, such as a method
+        field.
+        """
+        opts = serializer.Meta.model._meta
+        columns = []
+        relations = {}
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            try:
+                model_field = opts.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+
+            if isinstance(field, (ManyRelatedField,
+                                  serializers.ListSerializer)):
+                nested = cls._compile_relation(field, model_field)
+                if nested is False:
+                    return None
+                relations[name] = (model_field, nested)
+                columns.append((name, None, None))
+            elif not model_field.concrete or model_field.is_relation:
+                return None
+            elif getattr(field, 'column_representation', False):
+                columns.append((
+                    name, model_field.attname, field.to_representation
+                ))
+            elif type(field) in _PLAIN_FIELDS:
+                columns.append((name, model_field.attname, None))
+            elif type(field) is serializers.DecimalField:
+                columns.append((
+                    name, model_field.attname,
+                    lru_cache(maxsize=4096)(field.to_representation)
+                ))
+            else:
+                return None
+
+        return cls(serializer.Meta.model, columns, relations)
+
+    @classmethod
+    def _compile_relation(cls, field, model_field):
+        """Return the row serializer of a nested list of related rows
+
+        None stands for a list of primary keys and False for a field that
+        can't be compiled.
+        """
+        if not model_field.many_to_many:
+            return False
+        if isinstance(field, ManyRelatedField):
+            child = field.child_relation
+            if isinstance(child, PrimaryKeyRelatedField) and \
+                    child.pk_field is None:
+                return None
+            return False
+        if not isinstance(field.child, serializers.ModelSerializer) or \
+                field.child.Meta.model is not model_field.related_model:
+            return False
+
+        nested = cls.compile(field.child)
+        if nested is None or nested.relations:
+            return False
+
+        return nested
+
+    def _json_array(self, name, connection):
+        """Return an expression of the JSON array of a relation's rows
+
+        None is returned where the database can't build it or the nested
+        rows have columns to convert.
+        """
+        model_field, nested = self.relations[name]
+        if connection.vendor != 'postgresql' or \
+                any(convert for _, _, convert in nested.columns):
+            return None
+
+        quote = connection.ops.quote_name
+        related = nested.model._meta
+        pairs = ', '.join(
+            f'%s, r.{quote(attname)}' for _, attname, _ in nested.columns
+        )
+        sql = (
+            f'SELECT COALESCE(json_agg(json_build_object({pairs}) '
+            f'ORDER BY r.{quote(related.pk.column)}), \'[]\')::text '
+            f'FROM {quote(model_field.m2m_db_table())} l '
+            f'JOIN {quote(related.db_table)} r '
+            f'ON r.{quote(related.pk.column)} = '
+            f'l.{quote(model_field.m2m_reverse_name())} '
+            f'WHERE l.{quote(model_field.m2m_column_name())} = '
+            f'{quote(self.model._meta.db_table)}.'
+            f'{quote(self.model._meta.pk.column)}'
+        )
+
+        return RawSQL(
+            sql, [name for name, _, _ in nested.columns],
+            output_field=JSONField()
+        )
+
+    def values(self, queryset, extra=()):
+        """Return a queryset of the rows to serialize, as dicts
+
+        `extra` names other columns or annotations to read, such as the
+        ordering fields a paginator needs.
+        """
+        connection = connections[queryset.db]
+        names = self.names + [name for name in extra if name not in self.names]
+        arrays = {}
+        for name, (_, nested) in self.relations.items():
+            if nested is not None:
+                sql = self._json_array(name, connection)
+                if sql is not None:
+                    arrays[f'{name}_json'] = sql
+        if arrays:
+            queryset = queryset.annotate(**arrays)
+
+        return queryset.prefetch_related(None).values(*names, *arrays)
+
+    def _related(self, name, ids):
+        """Return the linked primary keys or nested rows, by row ID"""
+        model_field, nested = self.relations[name]
+        through = model_field.remote_field.through
+        source = model_field.m2m_column_name()
+        target = model_field.m2m_reverse_name()
+        links = through.objects.filter(**{f'{source}__in': ids}).order_by(
+            source, target
+        )
+
+        related = defaultdict(list)
+        if nested is None:
+            for row_id, pk in links.values_list(source, target):
+                related[row_id].append(pk)
+            return related
+
+        prefix = model_field.m2m_reverse_field_name()
+        owners = []
+        rows = []
+        for row_id, *values in links.values_list(source, *(
+            f'{prefix}__{name}' for name in nested.names
+        )):
+            owners.append(row_id)
+            rows.append(dict(zip(nested.names, values)))
+        for row_id, item in zip(owners, nested.serialize(rows)):
+            related[row_id].append(item)
+
+        return related
+
+    def serialize(self, rows):
+        """Return the representation of a list of rows"""
+        pk = self.model._meta.pk.attname
+        ids = [row[pk] for row in rows]
+        getters = []
+        for name, attname, convert in self.columns:
+            if attname is not None:
+                getters.append((name, _column(attname, convert)))
+            elif rows and f'{name}_json' in rows[0]:
+                getters.append((name, itemgetter(f'{name}_json')))
+            else:
+                related = self._related(name, ids) if ids else {}
+                getters.append((name, self._relation_getter(pk, related)))
+
+        return [{name: get(row) for name, get in getters} for row in rows]
+
+    @staticmethod
+    def _relation_getter(pk, related):
+        def get(row):
+            return related.get(row[pk], [])
+
+        return get
+
+
+class RowListMixin:
+    """Serve list actions from `values()` rows instead of model instances
+
+    The view's serializer, stripped of sparse fields and with expanded
+    fields if any, is compiled into a `RowSerializer` once per set of
+    fields. Views whose serializer can't be compiled, or with `row_list`
+    off, list instances as usual.
+    """
+    row_list = True
+
+    def get_row_serializer(self):
+        """Return the row serializer of the list action, or None"""
+        if not self.row_list:
+            return None
+
+        key = [type(self), self.get_serializer_class()]
+        for method in ('get_sparse_fields', 'get_expanded_fields'):
+            fields = getattr(self, method, lambda: None)()
+            key.append(None if fields is None else tuple(fields))
+        key = tuple(key)
+        if key not in _compiled:
+            _compiled[key] = RowSerializer.compile(self.get_serializer())
+
+        return _compiled[key]
+
+    def list(self, request, *args, **kwargs):
+        row_serializer = self.get_row_serializer()
+        if row_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        ordering = getattr(self, 'get_ordering', lambda: ())()
+        queryset = row_serializer.values(
+            self.filter_queryset(self.get_queryset()),
+            [name.lstrip('-') for name in ordering]
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(row_serializer.serialize(page))
+
+        return Response(row_serializer.serialize(list(queryset)))
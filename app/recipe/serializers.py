@@ -1,9 +1,48 @@
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
-from core.models import Tag, Ingredient, Recipe
+from core.managers import normalize_name
+from core.models import ImageUpload, Tag, Ingredient, Recipe
+from recipe import uploads
 
 
-class TagSerializer(serializers.ModelSerializer):
+class RecipeAttrSerializer(serializers.ModelSerializer):
+    """Serializer for tags and ingredients, whose names are unique per user"""
+
+    def duplicate_name_message(self):
+        """Return the error message for a name used by another row"""
+        verbose_name = self.Meta.model._meta.verbose_name
+
+        return f'A {verbose_name} with this name already exists.'
+
+    def validate_name(self, value):
+        """Reject the name of another row of the user"""
+        request = self.context.get('request')
+        if request is None:
+            return value
+
+        model = self.Meta.model
+        duplicates = model.objects.filter(
+            user=request.user, normalized_name=normalize_name(value)
+        )
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError(self.duplicate_name_message())
+
+        return value
+
+
+class RecipeAttrNamesSerializer(serializers.Serializer):
+    """Serializer for a list of tag or ingredient names"""
+    names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        allow_empty=False,
+        max_length=1000
+    )
+
+
+class TagSerializer(RecipeAttrSerializer):
     """Serializer for tag objects"""
 
     class Meta:
@@ -12,7 +51,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(RecipeAttrSerializer):
     """Serializer for ingredient objects"""
 
     class Meta:
@@ -21,6 +60,24 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+class ImageVariantsField(serializers.Field):
+    """Serializer for the URLs of a recipe's image variants, by variant
+
+    The URLs are the storage's, the same for every request, and the field
+    is empty while the variants of a new image are being made.
+    """
+    # The representation only depends on the column value (see rows.py)
+    column_representation = True
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        storage = Recipe._meta.get_field('image').storage
+        return {variant: storage.url(name) for variant, name in value.items()}
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     """Serializer for recipes objects"""
     ingredients = serializers.PrimaryKeyRelatedField(
@@ -31,12 +88,13 @@ class RecipeSerializer(serializers.ModelSerializer):
         many=True,
         queryset=Tag.objects.all()
     )
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'title', 'ingredients', 'tags',
-            'time_minutes', 'price', 'link'
+            'time_minutes', 'price', 'link', 'image_variants'
         )
         read_only_fields = ('id',)
 
@@ -47,10 +105,76 @@ class RecipeDetailSerializer(RecipeSerializer):
     tags = TagSerializer(many=True, read_only=True)
 
 
+class BulkListSerializer(serializers.ListSerializer):
+    """Validate lists of at most `max_length` items"""
+    max_length = 10000
+
+    def to_internal_value(self, data):
+        if isinstance(data, list) and len(data) > self.max_length:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    f'Ensure this list has at most {self.max_length} items.'
+                ]
+            })
+
+        return super().to_internal_value(data)
+
+
+class RecipeBulkSerializer(RecipeSerializer):
+    """Serializer for recipes created in bulk, linked by ID"""
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(),
+        default=list
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        default=list
+    )
+
+    class Meta(RecipeSerializer.Meta):
+        list_serializer_class = BulkListSerializer
+
+
+class ImageHeaderField(serializers.ImageField):
+    """Image field checking only the header of images
+
+    Files streamed through `recipe.uploads.ImageUploadHandler` were checked
+    while received, others have their first bytes read. Files are named
+    after their detected format, whatever extension they came with.
+    """
+
+    def to_internal_value(self, data):
+        file = serializers.FileField.to_internal_value(self, data)
+        if getattr(file, 'image_header', None) is None:
+            if file.size > uploads.MAX_UPLOAD_SIZE:
+                raise uploads.UploadTooLarge()
+            file.seek(0)
+            file.image_header = uploads.check_header(
+                file.read(uploads.HEADER_SIZE), complete=True
+            )
+            file.seek(0)
+        image_format = file.image_header[0]
+        file.name = f'image.{uploads.IMAGE_FORMATS[image_format]}'
+
+        return file
+
+
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
+    image = ImageHeaderField(allow_null=True, required=False)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
+        fields = ('id', 'image', 'image_variants')
         ready_only_fields = 'id'
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    """Serializer for the chunked uploads of recipe images"""
+
+    class Meta:
+        model = ImageUpload
+        fields = ('id', 'size', 'offset')
+        read_only_fields = ('id', 'offset')
+        extra_kwargs = {'size': {'min_value': 1}}
@@ -0,0 +1,52 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete
+
+from core.models import ImageUpload, Tag, Ingredient, Recipe
+from recipe import uploads
+from recipe.versions import bump_version, mark_modified
+
+
+def invalidate(user_id, *scopes):
+    """Bump a user's versions once the transaction commits
+
+    Versions are read before the data they cover, so anything cached by a
+    request that read the data before the commit is cached under the old
+    version, and never read again.
+    """
+    def bump():
+        for scope in scopes:
+            bump_version(scope, user_id)
+        if 'data' in scopes:
+            mark_modified(user_id)
+
+    transaction.on_commit(bump)
+
+
+def recipe_links_changed(sender, instance, action, **kwargs):
+    """Invalidate the recipe index and responses when links change"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate(instance.user_id, 'index', 'data')
+
+
+def recipe_data_saved(sender, instance, **kwargs):
+    """Invalidate the search index of the row's model and responses"""
+    invalidate(instance.user_id, sender._meta.model_name, 'data')
+
+
+def recipe_data_deleted(sender, instance, **kwargs):
+    """Invalidate every index covering a deleted row and responses"""
+    invalidate(instance.user_id, 'index', sender._meta.model_name, 'data')
+
+
+def image_upload_deleted(sender, instance, **kwargs):
+    """Delete the bytes received for a chunked upload once it's gone"""
+    upload_id = instance.id
+    transaction.on_commit(lambda: uploads.remove_received(upload_id))
+
+
+m2m_changed.connect(recipe_links_changed, sender=Recipe.tags.through)
+m2m_changed.connect(recipe_links_changed, sender=Recipe.ingredients.through)
+for model in (Tag, Ingredient, Recipe):
+    post_save.connect(recipe_data_saved, sender=model)
+    post_delete.connect(recipe_data_deleted, sender=model)
+post_delete.connect(image_upload_deleted, sender=ImageUpload)
@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from core.models import Tag
+from core.tests.utils import run_on_commit
+from recipe import autocomplete
+from recipe.autocomplete import PrefixIndex, prefix_matches
+
+User = get_user_model()
+
+
+class PrefixIndexTestCase(SimpleTestCase):
+    """Test the in-process prefix index"""
+
+    def setUp(self):
+        self.index = PrefixIndex([
+            (1, 'Tomato', 3),
+            (2, 'tofu', 5),
+            (3, 'Tomatillo', 3),
+            (4, 'Thyme', 9),
+            (5, 'Salt', 1),
+        ])
+
+    def test_prefix_ranked_by_usage(self):
+        """Test that matches are ranked by usage, then name"""
+        self.assertEqual(
+            self.index.search('TO'),
+            [(2, 'tofu'), (3, 'Tomatillo'), (1, 'Tomato')]
+        )
+        self.assertEqual(
+            self.index.search('toma'), [(3, 'Tomatillo'), (1, 'Tomato')]
+        )
+        self.assertEqual(self.index.search('t', limit=1), [(4, 'Thyme')])
+        self.assertEqual(self.index.search('x'), [])
+
+    def test_empty_prefix(self):
+        """Test that an empty prefix returns the most used names"""
+        self.assertEqual(
+            [pk for pk, _ in self.index.search('', limit=2)], [4, 2]
+        )
+
+
+class PrefixMatchesTestCase(TestCase):
+    """Test serving prefix matches from the cache or the database"""
+
+    def setUp(self):
+        cache.clear()
+        autocomplete._indexes.clear()
+        self.user = User.objects.create_user(
+            'test@example.com',
+            'password123'
+        )
+        self.tomato = Tag.objects.create(user=self.user, name='Tomato')
+        Tag.objects.create(user=self.user, name='Salt')
+
+    def test_miss_then_hit(self):
+        """Test that a miss is answered by the database and warms up"""
+        with self.assertNumQueries(2):
+            matches = prefix_matches(Tag.objects.all(), self.user.id, 'to')
+        self.assertEqual(matches, [(self.tomato.id, 'Tomato')])
+
+        with self.assertNumQueries(0):
+            matches = prefix_matches(Tag.objects.all(), self.user.id, 'to')
+        self.assertEqual(matches, [(self.tomato.id, 'Tomato')])
+
+    def test_invalidated_on_change(self):
+        """Test that new rows are visible right away"""
+        prefix_matches(Tag.objects.all(), self.user.id, 'to')
+        with run_on_commit():
+            tofu = Tag.objects.create(user=self.user, name='Tofu')
+
+        matches = prefix_matches(Tag.objects.all(), self.user.id, 'to')
+
+        self.assertEqual(
+            matches, [(tofu.id, 'Tofu'), (self.tomato.id, 'Tomato')]
+        )
+
+    def test_large_users_served_by_database(self):
+        """Test that users with too many rows are never cached"""
+        max_rows = autocomplete.MAX_CACHED_ROWS
+        autocomplete.MAX_CACHED_ROWS = 1
+        try:
+            prefix_matches(Tag.objects.all(), self.user.id, 'to')
+            with self.assertNumQueries(1):
+                matches = prefix_matches(
+                    Tag.objects.all(), self.user.id, 'sa'
+                )
+        finally:
+            autocomplete.MAX_CACHED_ROWS = max_rows
+
+        self.assertEqual([name for _, name in matches], ['Salt'])
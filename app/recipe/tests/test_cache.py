@@ -0,0 +1,234 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils.http import http_date, parse_http_date
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Recipe
+from core.tests.utils import run_on_commit
+from recipe import versions
+from recipe.cache import list_cache_stats, reset_list_cache_stats
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+User = get_user_model()
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@override_settings(CACHE_SHARED=True)
+class ListCacheTestCase(TestCase):
+    """Test caching list responses per user"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            'test@example.com',
+            'password123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Tag.objects.create(user=self.user, name='Vegan')
+
+    def test_second_request_served_from_cache(self):
+        """Test that repeating a request is answered without queries"""
+        first = self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(TAGS_URL)
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+
+    def test_query_params_normalized(self):
+        """Test that the order of query parameters does not matter"""
+        self.client.get(TAGS_URL, {'assigned_only': 1, 'ordering': 'usage'})
+
+        res = self.client.get(f'{TAGS_URL}?ordering=usage&assigned_only=1')
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+    def test_invalidated_on_create(self):
+        """Test that creating a row invalidates the cached responses"""
+        self.client.get(TAGS_URL)
+        with run_on_commit():
+            self.client.post(TAGS_URL, {'name': 'Dessert'})
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_invalidated_on_link_change(self):
+        """Test that changing the tags of a recipe invalidates responses"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=10, price=5.00
+        )
+        self.client.get(RECIPES_URL)
+        with run_on_commit():
+            recipe.tags.add(Tag.objects.get(name='Vegan'))
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results'][0]['tags']), 1)
+
+    def test_cache_is_per_user(self):
+        """Test that a user is never served another user's response"""
+        self.client.get(TAGS_URL)
+        other = User.objects.create_user('other@example.com', 'password123')
+        Tag.objects.create(user=other, name='Spicy')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']], ['Spicy']
+        )
+
+    def test_stats(self):
+        """Test counting cache hits and misses"""
+        reset_list_cache_stats()
+        self.client.get(TAGS_URL)
+        self.client.get(TAGS_URL)
+        self.client.get(TAGS_URL)
+
+        self.assertEqual(list_cache_stats(), {'hits': 2, 'misses': 1})
+
+    @override_settings(CACHE_SHARED=False)
+    def test_not_cached_in_local_memory(self):
+        """Test that responses aren't cached unless the cache is shared"""
+        self.client.get(TAGS_URL)
+        Tag.objects.filter(user=self.user).update(name='Vegetarian')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertNotIn('X-Cache', res)
+        self.assertEqual(res.data['results'][0]['name'], 'Vegetarian')
+
+
+@override_settings(CACHE_SHARED=True)
+class ConditionalGetTestCase(TestCase):
+    """Test answering conditional requests with 304 Not Modified"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            'test@example.com',
+            'password123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=10, price=5.00
+        )
+
+    def test_list_not_modified(self):
+        """Test that a current ETag gets a 304 without queries"""
+        res = self.client.get(RECIPES_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def test_detail_not_modified(self):
+        """Test conditional requests on the detail endpoint"""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertNotEqual(self.client.get(RECIPES_URL)['ETag'], etag)
+
+    def test_modified_after_change(self):
+        """Test that changing the user's data invalidates validators"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+        with run_on_commit():
+            tag = Tag.objects.create(user=self.user, name='Vegan')
+            self.recipe.tags.add(tag)
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_last_modified_is_change_time(self):
+        """Test that Last-Modified is when the data last changed"""
+        self.client.get(RECIPES_URL)
+        with patch.object(versions.time, 'time', return_value=2e9), \
+                run_on_commit():
+            Tag.objects.create(user=self.user, name='Vegan')
+            Tag.objects.create(user=self.user, name='Dessert')
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(parse_http_date(res['Last-Modified']), 2e9)
+
+    def test_not_modified_after_commit_only(self):
+        """Test that validators change once the change is committed"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+        with run_on_commit():
+            Tag.objects.create(user=self.user, name='Vegan')
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_if_modified_since(self):
+        """Test conditional requests using Last-Modified"""
+        url = reverse('recipe:tag-list')
+        last_modified = self.client.get(url)['Last-Modified']
+
+        res = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        res = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(0))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_validators_depend_on_request(self):
+        """Test that ETags differ by query parameters and user"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        res = self.client.get(
+            RECIPES_URL, {'page_size': 1}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        other = User.objects.create_user('other@example.com', 'password123')
+        self.client.force_authenticate(other)
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_private_responses(self):
+        """Test that shared caches are told not to store responses"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertIn('private', res['Cache-Control'])
+        self.assertIn('no-cache', res['Cache-Control'])
+
+    @override_settings(CACHE_SHARED=False)
+    def test_no_validators_in_local_memory(self):
+        """Test that validators are only sent when the cache is shared"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('ETag', res)
+        self.assertNotIn('Last-Modified', res)
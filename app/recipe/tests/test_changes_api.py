@@ -0,0 +1,170 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+CHANGES_URL = reverse('recipe:changes')
+
+User = get_user_model()
+
+
+def sample_recipe(user, **kwargs):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample Title',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(kwargs)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicChangesApiTestCase(TestCase):
+    """Test the publicly available change feed API"""
+
+    def test_login_required(self):
+        """Test that login is required to read the change feed"""
+        res = APIClient().get(CHANGES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateChangesApiTestCase(TestCase):
+    """Test the authorized user change feed API"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            'test@example.com',
+            'password123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _sync(self, since=0, **params):
+        res = self.client.get(CHANGES_URL, {'since': since, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res.data
+
+    def _entries(self, data):
+        return [
+            (change['type'], change['id'], change['deleted'])
+            for change in data['changes']
+        ]
+
+    def test_initial_sync(self):
+        """Test that a sync from scratch returns every object"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(tag)
+
+        data = self._sync()
+
+        self.assertEqual(self._entries(data), [
+            ('tag', tag.id, False),
+            ('ingredient', ingredient.id, False),
+            ('recipe', recipe.id, False),
+        ])
+        self.assertEqual(data['changes'][2]['data']['tags'], [tag.id])
+        self.assertEqual(data['changes'][0]['data'], {
+            'id': tag.id, 'name': 'Vegan'
+        })
+        self.assertFalse(data['has_more'])
+
+    def test_changes_since_cursor(self):
+        """Test that only objects changed after the cursor are returned"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = sample_recipe(self.user)
+        cursor = self._sync()['cursor']
+
+        self.assertEqual(self._sync(cursor)['changes'], [])
+
+        recipe.title = 'Curry'
+        recipe.save()
+        recipe.tags.add(tag)
+        data = self._sync(cursor)
+
+        self.assertEqual(self._entries(data), [('recipe', recipe.id, False)])
+        self.assertEqual(data['changes'][0]['data']['title'], 'Curry')
+        self.assertGreater(data['cursor'], cursor)
+
+    def test_tombstones(self):
+        """Test that deleted objects are reported as tombstones"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(tag)
+        cursor = self._sync()['cursor']
+        tag_id = tag.id
+
+        tag.delete()
+        data = self._sync(cursor)
+
+        self.assertEqual(self._entries(data), [
+            ('recipe', recipe.id, False),
+            ('tag', tag_id, True),
+        ])
+        self.assertEqual(data['changes'][0]['data']['tags'], [])
+        self.assertIsNone(data['changes'][1]['data'])
+
+    def test_reverse_link_changes(self):
+        """Test that linking from the tag side reports the recipes"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe1 = sample_recipe(self.user)
+        recipe2 = sample_recipe(self.user)
+        cursor = self._sync()['cursor']
+
+        tag.recipe_set.add(recipe1, recipe2)
+
+        self.assertEqual(self._entries(self._sync(cursor)), [
+            ('recipe', recipe1.id, False),
+            ('recipe', recipe2.id, False),
+        ])
+
+    def test_changes_limited_to_user(self):
+        """Test that other users' changes are not returned"""
+        other = User.objects.create_user('other@example.com', 'password123')
+        Tag.objects.create(user=other, name='Spicy')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        self.assertEqual(
+            self._entries(self._sync()), [('tag', tag.id, False)]
+        )
+
+    def test_pages(self):
+        """Test following the cursor through several pages"""
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(5)
+        ]
+
+        first = self._sync(limit=3)
+        second = self._sync(first['cursor'], limit=3)
+
+        self.assertTrue(first['has_more'])
+        self.assertFalse(second['has_more'])
+        self.assertEqual(
+            [change['id'] for change in first['changes'] + second['changes']],
+            [tag.id for tag in tags]
+        )
+
+    def test_query_count(self):
+        """Test that a sync costs a fixed number of queries"""
+        recipe = sample_recipe(self.user)
+        recipe.tags.create(user=self.user, name='Vegan')
+        recipe.ingredients.create(user=self.user, name='Salt')
+
+        with self.assertNumQueries(6):
+            self._sync()
+
+    def test_invalid_cursor(self):
+        """Test that an invalid cursor is rejected"""
+        for since in ('abc', '-1'):
+            res = self.client.get(CHANGES_URL, {'since': since})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
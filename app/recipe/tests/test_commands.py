@@ -0,0 +1,176 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.models import Change, ImportCheckpoint, Tag, Ingredient, Recipe
+from core.search import search_recipes
+from recipe.importer import import_recipes
+
+
+class ExportRecipesTests(TestCase):
+    """Test exporting recipes with the management command"""
+
+    def test_export_recipes(self):
+        """Test exporting the recipes of a user as NDJSON"""
+        user = get_user_model().objects.create_user(
+            'test@example.com',
+            'password123'
+        )
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'password123'
+        )
+        tag = Tag.objects.create(user=user, name='Vegan')
+        for owner, title in ((user, 'Pancakes'), (user, 'Waffles'),
+                             (other, 'Crepes')):
+            Recipe.objects.create(
+                user=owner,
+                title=title,
+                time_minutes=5,
+                price=5.00
+            )
+        Recipe.objects.get(title='Pancakes').tags.add(tag)
+        out = StringIO()
+
+        call_command(
+            'export_recipes', user_id=user.id, chunk_size=1,
+            stdout=out, stderr=StringIO()
+        )
+
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(
+            [row['title'] for row in rows], ['Pancakes', 'Waffles']
+        )
+        self.assertEqual(rows[0]['tags'], [{'id': tag.id, 'name': 'Vegan'}])
+        self.assertEqual(rows[0]['price'], '5.00')
+        self.assertEqual(rows[1]['ingredients'], [])
+
+
+class ImportRecipesTests(TestCase):
+    """Test importing recipes from exports"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@example.com',
+            'password123'
+        )
+
+    def import_file(self, text, **options):
+        """Run the import command on a file with the given contents"""
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as input_file:
+            input_file.write(text)
+            input_file.flush()
+            out = StringIO()
+            call_command(
+                'import_recipes', input=input_file.name, stdout=out,
+                **options
+            )
+
+        return out.getvalue()
+
+    def test_import_ndjson(self):
+        """Test importing recipes, creating missing tags and ingredients"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        lines = [
+            {'title': 'Curry', 'time_minutes': 20, 'price': '7.50',
+             'tags': [{'id': 99, 'name': 'vegan'}, 'Spicy'],
+             'ingredients': ['Rice']},
+            {'title': 'Dal', 'time_minutes': 30, 'price': 4,
+             'link': 'https://example.com', 'tags': ['VEGAN']},
+        ]
+
+        out = self.import_file(
+            '\n'.join(json.dumps(line) for line in lines),
+            user_id=self.user.id
+        )
+
+        self.assertIn('Imported 2 recipes', out)
+        curry = Recipe.objects.get(title='Curry')
+        self.assertEqual(
+            sorted(tag.name for tag in curry.tags.all()), ['Spicy', 'Vegan']
+        )
+        self.assertEqual(str(curry.price), '7.50')
+        self.assertEqual(Recipe.objects.get(title='Dal').link,
+                         'https://example.com')
+        self.assertEqual(Tag.objects.get(name='Vegan').recipe_count, 2)
+        self.assertEqual(Ingredient.objects.get(name='Rice').recipe_count, 1)
+        self.assertEqual(
+            search_recipes(Recipe.objects.all(), 'rice').get(), curry
+        )
+        self.assertTrue(
+            Change.objects.filter(model='recipe', object_id=curry.id).exists()
+        )
+
+    def test_import_csv(self):
+        """Test importing a CSV export with a user column"""
+        text = (
+            'title,time_minutes,price,link,tags,ingredients,user\n'
+            f'Toast,5,1.00,,Quick|Breakfast,Bread,{self.user.id}\n'
+        )
+
+        self.import_file(text, import_format='csv', batch_size=1)
+
+        recipe = Recipe.objects.get()
+        self.assertEqual(recipe.user, self.user)
+        self.assertEqual(recipe.link, '')
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertEqual(recipe.ingredients.get().name, 'Bread')
+
+    def test_invalid_record(self):
+        """Test that an invalid record fails with its position"""
+        lines = [
+            {'title': 'Curry', 'time_minutes': 20, 'price': '7.50'},
+            {'title': '', 'time_minutes': 'soon', 'price': '7.50'},
+        ]
+
+        with self.assertRaisesMessage(CommandError, 'Record 2: title'):
+            self.import_file(
+                '\n'.join(json.dumps(line) for line in lines),
+                user_id=self.user.id, batch_size=1
+            )
+
+        self.assertEqual(
+            list(Recipe.objects.values_list('title', flat=True)), ['Curry']
+        )
+
+    def test_resume_from_checkpoint(self):
+        """Test that an import resumes after the last committed batch"""
+        text = '\n'.join(
+            json.dumps({'title': f'Recipe {i}', 'time_minutes': 5,
+                        'price': '1.00', 'user': self.user.id})
+            for i in range(5)
+        )
+        ImportCheckpoint.objects.create(name='load', position=3)
+
+        self.import_file(text, checkpoint='load', batch_size=1)
+
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('title', flat=True)),
+            ['Recipe 3', 'Recipe 4']
+        )
+        self.assertEqual(ImportCheckpoint.objects.get().position, 5)
+
+    def test_workers_import_their_users(self):
+        """Test that each worker imports the recipes of its share of users"""
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'password123'
+        )
+        lines = [
+            json.dumps({'title': str(user.id), 'time_minutes': 5,
+                        'price': '1.00', 'user': user.id})
+            for user in (self.user, other)
+        ]
+
+        for worker in range(2):
+            imported = import_recipes(lines, workers=2, worker=worker)
+
+            self.assertEqual(imported, 1)
+            recipe = Recipe.objects.latest('id')
+            self.assertEqual(recipe.user_id % 2, worker)
+            self.assertEqual(recipe.title, str(recipe.user_id))
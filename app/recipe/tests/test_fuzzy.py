@@ -0,0 +1,97 @@
+import tracemalloc
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from benchmarks.utils import random_names
+from core.models import Tag
+from recipe import fuzzy
+from recipe.fuzzy import TrigramIndex, fuzzy_filter, get_index, trigrams
+
+
+class TrigramIndexTestCase(SimpleTestCase):
+    """Test the in-process trigram index"""
+
+    def test_trigrams_match_pg_trgm(self):
+        """Test that trigrams are extracted like pg_trgm's show_trgm"""
+        self.assertEqual(trigrams('Cat'), {'  c', ' ca', 'cat', 'at '})
+        self.assertEqual(trigrams('a-b'), {'  a', ' a ', '  b', ' b '})
+        self.assertEqual(trigrams('!!'), set())
+
+    def test_similarity_matches_pg_trgm(self):
+        """Test that similarity is computed like pg_trgm's similarity"""
+        index = TrigramIndex([(1, 'two words')])
+
+        (score, pk), = index.search('word', threshold=0)
+
+        self.assertEqual(pk, 1)
+        self.assertAlmostEqual(score, 4 / 11)
+
+    def test_search_ranks_typos(self):
+        """Test that misspelt queries find the closest rows first"""
+        index = TrigramIndex([
+            (1, 'Tomato'),
+            (2, 'Cherry tomatoes'),
+            (3, 'Potato'),
+            (4, 'Chicken'),
+        ])
+
+        self.assertEqual(
+            [pk for _, pk in index.search('tomatoe')], [1, 2]
+        )
+        self.assertEqual([pk for _, pk in index.search('chiken')], [4])
+        self.assertEqual(index.search('zzz'), [])
+
+    def test_search_limit(self):
+        """Test that only the best matches are returned"""
+        index = TrigramIndex((pk, 'salt') for pk in range(10))
+
+        self.assertEqual(len(index.search('salt', limit=3)), 3)
+
+    def test_nbytes(self):
+        """Test that the memory estimate doesn't fall short"""
+        rows = list(enumerate(random_names(20000)))
+        tracemalloc.start()
+        try:
+            index = TrigramIndex(rows)
+            allocated = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+        self.assertGreaterEqual(index.nbytes, allocated * 0.9)
+        self.assertLess(index.nbytes, allocated * 2)
+
+
+class FuzzyFilterTestCase(TestCase):
+    """Test fuzzy filtering on the current database"""
+
+    def setUp(self):
+        fuzzy._indexes.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass'
+        )
+        for name in ('Salt', 'Salty', 'Sea salt', 'Pepper'):
+            Tag.objects.create(user=self.user, name=name)
+
+    def _names(self):
+        return sorted(
+            fuzzy_filter(Tag.objects.all(), 'name', 'salt', self.user.id)
+            .values_list('name', flat=True)
+        )
+
+    def test_results_limited(self):
+        """Test that only the most similar rows are kept"""
+        self.assertEqual(self._names(), ['Salt', 'Salty', 'Sea salt'])
+
+        with patch.object(fuzzy, 'MAX_RESULTS', 1):
+            self.assertEqual(self._names(), ['Salt'])
+
+    def test_large_index_not_cached(self):
+        """Test that indexes over the memory budget aren't kept"""
+        with patch.object(fuzzy, 'MAX_INDEX_BYTES', 0):
+            get_index(Tag, 'name', self.user.id)
+        self.assertEqual(len(fuzzy._indexes), 0)
+
+        get_index(Tag, 'name', self.user.id)
+        self.assertEqual(len(fuzzy._indexes), 1)
@@ -0,0 +1,173 @@
+import io
+import os
+import tempfile
+import threading
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe import images
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def jpeg(size, orientation=None):
+    """Return the bytes of a JPEG image, with EXIF data"""
+    image = Image.new('RGB', size, (200, 100, 50))
+    exif = Image.Exif()
+    exif[0x010f] = 'Camera maker'
+    if orientation is not None:
+        exif[0x0112] = orientation
+    output = io.BytesIO()
+    image.save(output, 'JPEG', exif=exif)
+
+    return output.getvalue()
+
+
+class ImageVariantsTests(TestCase):
+    """Test making the variants of recipe images"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = override_settings(MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=5
+        )
+
+    def test_render_variants(self):
+        """Test the sizes and formats of variants, without EXIF"""
+        variants = images.render_variants(io.BytesIO(jpeg((3000, 2000))))
+
+        self.assertEqual(set(variants), set(images.VARIANTS))
+        for name, (data, image_format) in variants.items():
+            longest, expected_format = images.VARIANTS[name]
+            with Image.open(io.BytesIO(data)) as image:
+                self.assertEqual(image.format, expected_format)
+                self.assertEqual(image.size, (longest, longest * 2 // 3))
+                self.assertEqual(len(image.getexif()), 0)
+
+    def test_render_variants_rotated(self):
+        """Test that EXIF orientation is applied and small images kept"""
+        variants = images.render_variants(
+            io.BytesIO(jpeg((300, 100), orientation=6))
+        )
+
+        with Image.open(io.BytesIO(variants['medium'][0])) as image:
+            self.assertEqual(image.size, (100, 300))
+        with Image.open(io.BytesIO(variants['thumbnail'][0])) as image:
+            self.assertEqual(image.size, (67, 200))
+
+    def test_make_variants(self):
+        """Test storing variants and linking them to the recipe"""
+        self.recipe.image.save('soup.jpg', ContentFile(jpeg((1000, 1000))))
+
+        names = images.make_variants(self.recipe.pk, self.recipe.image.name)
+        self.recipe.refresh_from_db()
+
+        self.assertEqual(self.recipe.image_variants, names)
+        storage = self.recipe.image.storage
+        for name in names.values():
+            self.assertTrue(storage.exists(name))
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        data = client.get(RECIPES_URL).data['results'][0]
+        self.assertEqual(
+            data['image_variants']['thumbnail'],
+            storage.url(names['thumbnail'])
+        )
+
+    def test_make_variants_replaced(self):
+        """Test that variants of a replaced image are dropped"""
+        self.recipe.image.save('soup.jpg', ContentFile(jpeg((100, 100))))
+        name = self.recipe.image.name
+        self.recipe.image.save('stew.jpg', ContentFile(jpeg((100, 100))))
+        files = set(os.listdir(os.path.dirname(self.recipe.image.path)))
+
+        self.assertIsNone(images.make_variants(self.recipe.pk, name))
+        self.recipe.refresh_from_db()
+
+        self.assertEqual(self.recipe.image_variants, {})
+        self.assertEqual(
+            set(os.listdir(os.path.dirname(self.recipe.image.path))), files
+        )
+
+    def test_upload_schedules_variants(self):
+        """Test that uploads return before the variants are made"""
+        self.recipe.image_variants = {'thumbnail': 'old-thumbnail.jpg'}
+        self.recipe.save()
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('recipe:recipe-upload-image', args=[self.recipe.id])
+
+        with patch.object(images, 'schedule_variants') as schedule:
+            res = client.post(
+                url,
+                {'image': SimpleUploadedFile('soup.jpg', jpeg((100, 100)))},
+                format='multipart'
+            )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['image_variants'], {})
+        recipe, stale = schedule.call_args[0]
+        self.assertEqual(recipe.pk, self.recipe.pk)
+        self.assertEqual(stale, {'thumbnail': 'old-thumbnail.jpg'})
+
+    def test_large_decodes_limited(self):
+        """Test that only images decoded at a large size wait for a slot"""
+        png = io.BytesIO()
+        Image.new('RGB', (800, 800)).save(png, 'PNG')
+        decodes = MagicMock()
+
+        with patch.object(images, '_decodes', decodes), \
+                patch.object(images, 'VARIANTS', {'small': (50, 'JPEG')}), \
+                patch.object(images, 'LARGE_DECODE_PIXELS', 100000):
+            images.render_variants(io.BytesIO(jpeg((800, 800))))
+            self.assertFalse(decodes.__enter__.called)
+            images.render_variants(png)
+
+        self.assertTrue(decodes.__enter__.called)
+
+    def test_pending_images_bounded(self):
+        """Test that images are left without variants once too many wait"""
+        with patch.object(images, '_pending', threading.BoundedSemaphore(1)), \
+                patch.object(images._executor, 'submit') as submit, \
+                self.assertLogs('recipe.images', 'WARNING'):
+            images._submit(self.recipe.pk, 'a.jpg', {})
+            images._submit(self.recipe.pk, 'b.jpg', {})
+
+        self.assertEqual(submit.call_count, 1)
+
+    def test_make_missing_variants(self):
+        """Test making the variants of images left without them"""
+        self.recipe.image.save('soup.jpg', ContentFile(jpeg((300, 300))))
+        Recipe.objects.create(
+            user=self.user, title='Stew', time_minutes=5, price=5
+        )
+        out = StringIO()
+
+        call_command('make_image_variants', workers=1, stdout=out)
+
+        self.assertIn('Made the variants of 1 images', out.getvalue())
+        self.recipe.refresh_from_db()
+        self.assertEqual(set(self.recipe.image_variants), set(images.VARIANTS))
+        self.assertFalse(images.missing_variants().exists())
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 from django.test import TestCase
 
@@ -6,12 +7,20 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Ingredient, Recipe
+from core.tests.utils import QueryBudgetMixin, run_on_commit
 
 from recipe.serializers import IngredientSerializer
 
 User = get_user_model()
 
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
+AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
+BULK_URL = reverse('recipe:ingredient-bulk-get-or-create')
+
+# Maximum number of queries allowed per action, whatever the data size
+QUERY_BUDGETS = {
+    'list': 1,
+}
 
 
 class PublicIngredientsApiTestCase(TestCase):
@@ -49,7 +58,7 @@ class PrivateIngredientsApiTestCase(TestCase):
         serializer = IngredientSerializer(ingredients, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """Test that ingredients returned are for the authenticated user"""
@@ -68,8 +77,8 @@ class PrivateIngredientsApiTestCase(TestCase):
         serializer = IngredientSerializer(ingredients, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_create_ingredient_successful(self):
         """Test creating a new ingredient"""
@@ -84,6 +93,39 @@ class PrivateIngredientsApiTestCase(TestCase):
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
         self.assertTrue(exists)
 
+    def test_create_ingredient_duplicate_name(self):
+        """Test that a user cannot create two ingredients with the same name"""
+        Ingredient.objects.create(user=self.user, name='Salt')
+
+        res = self.client.post(INGREDIENTS_URL, {'name': ' salt '})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_get_or_create(self):
+        """Test getting ingredients by name, creating the missing ones"""
+        existing = Ingredient.objects.create(user=self.user, name='Salt')
+        other = User.objects.create(email='other@example.com')
+        Ingredient.objects.create(user=other, name='Pepper')
+
+        res = self.client.post(BULK_URL, {
+            'names': ['SALT', 'Pepper', '  pepper', 'Salt']
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        created = Ingredient.objects.get(user=self.user, name='Pepper')
+        self.assertEqual(
+            [row['id'] for row in res.data],
+            [existing.id, created.id, created.id, existing.id]
+        )
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_get_or_create_invalid(self):
+        """Test that an empty list of names is rejected"""
+        res = self.client.post(BULK_URL, {'names': []}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_create_ingredient_invalid(self):
         """Test creating a new ingredient with invalid payload"""
         ingredient_data = {'name': ''}
@@ -114,8 +156,8 @@ class PrivateIngredientsApiTestCase(TestCase):
         serializer1 = IngredientSerializer(ingredient1)
         serializer2 = IngredientSerializer(ingredient2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_ingredients_assigned_unique(self):
         """Test filtering ingredients by assigned returns unique items"""
@@ -140,4 +182,138 @@ class PrivateIngredientsApiTestCase(TestCase):
 
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_filter_ingredients_by_min_usage(self):
+        """Test filtering ingredients used by at least N recipes"""
+        ingredient1 = Ingredient.objects.create(user=self.user, name='Eggs')
+        ingredient2 = Ingredient.objects.create(user=self.user, name='Bacon')
+
+        for title in ('Full english', 'Omelette'):
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=10,
+                price=5.00,
+                user=self.user
+            )
+            recipe.ingredients.add(ingredient1)
+        recipe.ingredients.add(ingredient2)
+
+        res = self.client.get(INGREDIENTS_URL, {'min_usage': 2})
+
+        ids = [row['id'] for row in res.data['results']]
+        self.assertEqual(ids, [ingredient1.id])
+
+    def test_order_ingredients_by_usage(self):
+        """Test ordering ingredients by the number of recipes using them"""
+        ingredient1 = Ingredient.objects.create(user=self.user, name='Eggs')
+        ingredient2 = Ingredient.objects.create(user=self.user, name='Bacon')
+        ingredient3 = Ingredient.objects.create(user=self.user, name='Beans')
+
+        for title in ('Full english', 'Omelette'):
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=10,
+                price=5.00,
+                user=self.user
+            )
+            recipe.ingredients.add(ingredient2)
+        recipe.ingredients.add(ingredient3)
+
+        res = self.client.get(INGREDIENTS_URL, {'ordering': '-usage'})
+
+        ids = [row['id'] for row in res.data['results']]
+        self.assertEqual(ids, [ingredient2.id, ingredient3.id, ingredient1.id])
+
+    def test_fuzzy_search_ingredients(self):
+        """Test finding ingredients with a misspelt name"""
+        cache.clear()
+        ingredient1 = Ingredient.objects.create(user=self.user, name='Chicken')
+        Ingredient.objects.create(user=self.user, name='Salt')
+        user2 = User.objects.create(
+            email='test2@example.com',
+            password='test_password'
+        )
+        Ingredient.objects.create(user=user2, name='Chicken')
+
+        res = self.client.get(INGREDIENTS_URL, {'q': 'chiken'})
+
+        ids = [row['id'] for row in res.data['results']]
+        self.assertEqual(ids, [ingredient1.id])
+
+        with run_on_commit():
+            ingredient2 = Ingredient.objects.create(
+                user=self.user,
+                name='Chickens'
+            )
+        res = self.client.get(INGREDIENTS_URL, {'q': 'chiken'})
+
+        ids = [row['id'] for row in res.data['results']]
+        self.assertEqual(ids, [ingredient1.id, ingredient2.id])
+
+    def test_autocomplete_ingredients(self):
+        """Test completing ingredient names from a prefix"""
+        cache.clear()
+        ingredient1 = Ingredient.objects.create(
+            user=self.user,
+            name='Cucumber'
+        )
+        ingredient2 = Ingredient.objects.create(
+            user=self.user,
+            name='Curry leaves'
+        )
+        Ingredient.objects.create(user=self.user, name='Salt')
+        user2 = User.objects.create(
+            email='test2@example.com',
+            password='test_password'
+        )
+        Ingredient.objects.create(user=user2, name='Cucumber')
+
+        for _ in range(2):
+            res = self.client.get(AUTOCOMPLETE_URL, {'prefix': 'cu'})
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.data, [
+                {'id': ingredient1.id, 'name': 'Cucumber'},
+                {'id': ingredient2.id, 'name': 'Curry leaves'},
+            ])
+
+        res = self.client.get(
+            AUTOCOMPLETE_URL, {'prefix': 'Cu', 'limit': 1}
+        )
         self.assertEqual(len(res.data), 1)
+
+
+class IngredientsQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    """Test that the ingredients API stays within its query budget"""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email='test@example.com',
+            password='root1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_ingredients_query_budget(self):
+        """Test listing ingredients runs a fixed number of queries"""
+        for i in range(10):
+            ingredient = Ingredient.objects.create(
+                user=self.user,
+                name=f'Ingredient {i}'
+            )
+            recipe = Recipe.objects.create(
+                title=f'Recipe {i}',
+                time_minutes=10,
+                price=5.00,
+                user=self.user
+            )
+            recipe.ingredients.add(ingredient)
+
+        with self.assertMaxQueries(QUERY_BUDGETS['list']):
+            res = self.client.get(INGREDIENTS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertMaxQueries(QUERY_BUDGETS['list']):
+            res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
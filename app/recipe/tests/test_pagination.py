@@ -0,0 +1,146 @@
+import json
+from base64 import urlsafe_b64encode
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from core.tests.utils import QueryBudgetMixin
+
+User = get_user_model()
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def sample_recipe(user, **kwargs):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample Title',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(kwargs)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class KeysetPaginationTestCase(QueryBudgetMixin, TestCase):
+    """Test cursor pagination of the recipe API endpoints"""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email='test@example.com',
+            password='root1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _walk(self, url, params):
+        """Follow next links and return every page"""
+        pages = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data)
+            if not res.data['next']:
+                return pages
+            res = self.client.get(res.data['next'])
+
+    def test_recipes_paginated(self):
+        """Test that recipes are split into pages ordered by id"""
+        recipes = [sample_recipe(user=self.user) for _ in range(5)]
+
+        pages = self._walk(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual([len(page['results']) for page in pages], [2, 2, 1])
+        ids = [row['id'] for page in pages for row in page['results']]
+        self.assertEqual(ids, [recipe.id for recipe in reversed(recipes)])
+        self.assertIsNone(pages[0]['previous'])
+        self.assertNotIn('total', pages[0])
+
+    def test_tags_paginated_with_equal_usage(self):
+        """Test that tags sharing a usage are neither skipped nor repeated"""
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ('Vegan', 'Spicy', 'Dessert')]
+
+        pages = self._walk(TAGS_URL, {'page_size': 1, 'ordering': 'usage'})
+
+        ids = [row['id'] for page in pages for row in page['results']]
+        self.assertEqual(ids, [tag.id for tag in tags])
+
+    def test_previous_link(self):
+        """Test that the previous link returns the preceding page"""
+        for _ in range(5):
+            sample_recipe(user=self.user)
+
+        first = self.client.get(RECIPES_URL, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+        previous = self.client.get(second.data['previous'])
+
+        self.assertEqual(previous.data['results'], first.data['results'])
+        self.assertIsNotNone(previous.data['next'])
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is rejected"""
+        res = self.client.get(RECIPES_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_bad_values(self):
+        """Test that well-formed cursors with bad values are rejected"""
+        sample_recipe(user=self.user)
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        for url, position in (
+            (RECIPES_URL, [{'a': 1}]),
+            (RECIPES_URL, ['abc']),
+            (TAGS_URL, [None, None]),
+            (TAGS_URL, ['Vegan', 'abc']),
+        ):
+            cursor = urlsafe_b64encode(
+                json.dumps({'p': position}).encode()
+            ).decode()
+            res = self.client.get(url, {'cursor': cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_size_capped(self):
+        """Test that the page size cannot exceed the maximum"""
+        for _ in range(3):
+            sample_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, {'page_size': 0})
+        self.assertEqual(len(res.data['results']), 3)
+
+        res = self.client.get(RECIPES_URL, {'page_size': 10 ** 9})
+        self.assertEqual(len(res.data['results']), 3)
+
+    def test_total_on_request(self):
+        """Test that the approximate total is returned when asked for"""
+        for _ in range(3):
+            sample_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, {'page_size': 1, 'total': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('total', res.data)
+        self.assertGreaterEqual(res.data['total'], 1)
+
+    def test_later_pages_query_budget(self):
+        """Test that a later page costs the same queries as the first"""
+        for _ in range(10):
+            sample_recipe(user=self.user)
+
+        with self.assertMaxQueries(3) as first:
+            res = self.client.get(RECIPES_URL, {'page_size': 2})
+        first_page_queries = len(first)
+
+        for _ in range(3):
+            res = self.client.get(res.data['next'])
+        with self.assertMaxQueries(first_page_queries):
+            self.client.get(res.data['next'])
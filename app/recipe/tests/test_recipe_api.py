@@ -1,22 +1,39 @@
+import csv
+import json
 import tempfile
 import os
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, connection
 from django.urls import reverse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Recipe, Tag, Ingredient
+from core.models import Change, Recipe, Tag, Ingredient
+from core.tests.utils import QueryBudgetMixin, run_on_commit
 
+from recipe import bulk
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 User = get_user_model()
 
 RECIPES_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk-create')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+# Maximum number of queries allowed per action, whatever the data size
+QUERY_BUDGETS = {
+    'list': 3,
+    'list_all_cold': 5,
+    'retrieve': 3,
+}
 
 
 def image_upload_url(recipe_id):
@@ -86,7 +103,7 @@ class PrivateRecipesApiTestCase(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Test that recipes returned are for the authenticated user"""
@@ -103,8 +120,8 @@ class PrivateRecipesApiTestCase(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_recipe_detail(self):
         """Test viewing a recipe detail"""
@@ -278,9 +295,9 @@ class RecipeImageUploadTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """Test returning recipes with specific ingredients"""
@@ -304,6 +321,650 @@ class RecipeImageUploadTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+
+class RecipeFilterTestCase(TestCase):
+    """Test filtering recipes by tags and ingredients"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(
+            email='test@example.com',
+            password='root1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.vegan = sample_tag(user=self.user, name='Vegan')
+        self.quick = sample_tag(user=self.user, name='Quick')
+        self.tofu = sample_ingredient(user=self.user, name='Tofu')
+
+        self.curry = sample_recipe(user=self.user, title='Tofu curry')
+        self.curry.tags.add(self.vegan, self.quick)
+        self.curry.ingredients.add(self.tofu)
+        self.salad = sample_recipe(user=self.user, title='Salad')
+        self.salad.tags.add(self.vegan, self.quick)
+        self.stew = sample_recipe(user=self.user, title='Stew')
+        self.stew.tags.add(self.vegan)
+
+    def _ids(self, params):
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in res.data['results']]
+
+    def test_filter_any_tags_unique(self):
+        """Test that recipes matching several tags are returned once"""
+        ids = self._ids({'tags': f'{self.vegan.id},{self.quick.id}'})
+
+        self.assertEqual(ids, [self.stew.id, self.salad.id, self.curry.id])
+
+    def test_filter_all_tags(self):
+        """Test returning recipes having every listed tag"""
+        ids = self._ids({'tags_all': f'{self.vegan.id},{self.quick.id}'})
+
+        self.assertEqual(ids, [self.salad.id, self.curry.id])
+
+    def test_filter_all_tags_and_ingredients(self):
+        """Test combining tag and ingredient filters"""
+        ids = self._ids({
+            'tags_all': f'{self.vegan.id},{self.quick.id}',
+            'ingredients_all': str(self.tofu.id),
+        })
+
+        self.assertEqual(ids, [self.curry.id])
+
+    def test_filter_all_unknown_tag(self):
+        """Test that an unused tag matches no recipes"""
+        unused = sample_tag(user=self.user, name='Unused')
+
+        ids = self._ids({'tags_all': f'{self.vegan.id},{unused.id}'})
+
+        self.assertEqual(ids, [])
+
+    def test_filter_all_follows_changes(self):
+        """Test that the results follow changes to recipe links"""
+        self._ids({'tags_all': str(self.quick.id)})
+
+        self.salad.tags.remove(self.quick)
+        self.stew.tags.add(self.quick)
+        self.curry.delete()
+
+        ids = self._ids({'tags_all': f'{self.vegan.id},{self.quick.id}'})
+        self.assertEqual(ids, [self.stew.id])
+
+    def test_filter_all_limited_to_user(self):
+        """Test that another user's recipes never match"""
+        user2 = User.objects.create(
+            email='test2@example.com',
+            password='test_password'
+        )
+        sample_recipe(user=user2).tags.add(self.vegan)
+
+        ids = self._ids({'tags_all': str(self.vegan.id)})
+
+        self.assertEqual(
+            ids, [self.stew.id, self.salad.id, self.curry.id]
+        )
+
+    def test_filter_all_repeated_id(self):
+        """Test that a repeated ID is only required once"""
+        ids = self._ids({'tags_all': f'{self.quick.id},{self.quick.id}'})
+
+        self.assertEqual(ids, [self.salad.id, self.curry.id])
+
+    def test_filter_invalid_ids(self):
+        """Test that non-numeric IDs are a bad request"""
+        for name in ('tags', 'tags_all', 'ingredients', 'ingredients_all'):
+            res = self.client.get(RECIPES_URL, {name: '1,abc'})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(name, res.data)
+
+
+class RecipeSearchTestCase(TestCase):
+    """Test full-text search over recipes"""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email='test@example.com',
+            password='root1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _search(self, text, **params):
+        res = self.client.get(RECIPES_URL, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in res.data['results']]
+
+    def test_search_title(self):
+        """Test searching recipes by title words"""
+        recipe1 = sample_recipe(user=self.user, title='Chicken curry')
+        sample_recipe(user=self.user, title='Beef stew')
+
+        self.assertEqual(self._search('curry'), [recipe1.id])
+        self.assertEqual(self._search('chicken curries'), [recipe1.id])
+        self.assertEqual(self._search('lamb'), [])
+
+    def test_search_tags_and_ingredients(self):
+        """Test searching recipes by tag and ingredient names"""
+        recipe1 = sample_recipe(user=self.user, title='Stew')
+        recipe1.tags.add(sample_tag(user=self.user, name='Winter'))
+        recipe2 = sample_recipe(user=self.user, title='Salad')
+        recipe2.ingredients.add(sample_ingredient(user=self.user, name='Feta'))
+
+        self.assertEqual(self._search('winter'), [recipe1.id])
+        self.assertEqual(self._search('feta'), [recipe2.id])
+
+    def test_search_ranked(self):
+        """Test that title matches rank above tag matches"""
+        tag = sample_tag(user=self.user, name='Pasta')
+        recipe1 = sample_recipe(user=self.user, title='Carbonara')
+        recipe1.tags.add(tag)
+        recipe2 = sample_recipe(user=self.user, title='Pasta bake')
+
+        self.assertEqual(self._search('pasta'), [recipe2.id, recipe1.id])
+
+        pages = []
+        res = self.client.get(RECIPES_URL, {'search': 'pasta', 'page_size': 1})
+        while True:
+            pages.extend(row['id'] for row in res.data['results'])
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+        self.assertEqual(pages, [recipe2.id, recipe1.id])
+
+    def test_search_index_follows_changes(self):
+        """Test that the index follows renames, links and deletes"""
+        tag = sample_tag(user=self.user, name='Spicy')
+        recipe1 = sample_recipe(user=self.user, title='Chili')
+        recipe2 = sample_recipe(user=self.user, title='Tacos')
+        recipe1.tags.add(tag)
+        tag.recipe_set.add(recipe2)
+        self.assertEqual(self._search('spicy'), [recipe2.id, recipe1.id])
+
+        tag.name = 'Hot'
+        tag.save()
+        self.assertEqual(self._search('spicy'), [])
+        self.assertEqual(self._search('hot'), [recipe2.id, recipe1.id])
+
+        recipe1.tags.clear()
+        recipe2.delete()
+        self.assertEqual(self._search('hot'), [])
+
+        recipe1.title = 'Hot chili'
+        recipe1.save()
+        self.assertEqual(self._search('hot'), [recipe1.id])
+
+    def test_search_limited_to_user(self):
+        """Test that search only returns the user's recipes"""
+        user2 = User.objects.create(
+            email='test2@example.com',
+            password='test_password'
+        )
+        sample_recipe(user=user2, title='Pancakes')
+
+        self.assertEqual(self._search('pancakes'), [])
+
+
+class RecipeFuzzySearchTestCase(TestCase):
+    """Test typo-tolerant search over recipe titles"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(
+            email='test@example.com',
+            password='root1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _fuzzy(self, text):
+        res = self.client.get(RECIPES_URL, {'q': text})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in res.data['results']]
+
+    def test_fuzzy_search_titles(self):
+        """Test finding recipes with a misspelt title, closest first"""
+        recipe1 = sample_recipe(user=self.user, title='Chicken soup')
+        recipe2 = sample_recipe(user=self.user, title='Chicken')
+        sample_recipe(user=self.user, title='Beef stew')
+
+        self.assertEqual(self._fuzzy('chiken'), [recipe2.id, recipe1.id])
+        self.assertEqual(self._fuzzy('lamb'), [])
+
+    def test_fuzzy_search_follows_changes(self):
+        """Test that renamed and deleted recipes are found correctly"""
+        recipe = sample_recipe(user=self.user, title='Tomato soup')
+        self.assertEqual(self._fuzzy('tomatoe'), [recipe.id])
+
+        recipe.title = 'Onion soup'
+        with run_on_commit():
+            recipe.save()
+        self.assertEqual(self._fuzzy('tomatoe'), [])
+
+        with run_on_commit():
+            recipe.delete()
+        self.assertEqual(self._fuzzy('onion'), [])
+
+
+class RecipeBulkCreateTestCase(TestCase):
+    """Test creating recipes in bulk"""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email='test@example.com',
+            password='root1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = sample_tag(user=self.user)
+        self.ingredient = sample_ingredient(user=self.user)
+
+    def _items(self, count, **kwargs):
+        return [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '5.00',
+                **kwargs
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create(self):
+        """Test creating recipes with their tags and ingredients"""
+        items = self._items(
+            3, tags=[self.tag.id], ingredients=[self.ingredient.id]
+        )
+
+        res = self.client.post(BULK_URL, items, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        for item, data in zip(items, res.data):
+            recipe = Recipe.objects.get(id=data['id'])
+            self.assertEqual(recipe.title, item['title'])
+            self.assertEqual(list(recipe.tags.all()), [self.tag])
+            self.assertEqual(
+                list(recipe.ingredients.all()), [self.ingredient]
+            )
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.recipe_count, 3)
+        self.assertEqual(
+            Change.objects.filter(user=self.user, model='recipe').count(), 3
+        )
+
+    def test_bulk_create_searchable(self):
+        """Test that recipes created in bulk can be searched"""
+        self.client.post(
+            BULK_URL, self._items(1, title='Pumpkin pie'), format='json'
+        )
+
+        res = self.client.get(RECIPES_URL, {'search': 'pumpkin'})
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_bulk_create_errors_per_item(self):
+        """Test that invalid items are reported and nothing is created"""
+        other = User.objects.create(email='other@example.com')
+        other_tag = sample_tag(user=other)
+        items = self._items(3)
+        items[0]['tags'] = [other_tag.id]
+        items[2]['price'] = 'abc'
+
+        res = self.client.post(BULK_URL, items, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[1], {})
+        self.assertIn('price', res.data[2])
+
+        items[2]['price'] = '5.00'
+        res = self.client.post(BULK_URL, items, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data[0])
+        self.assertEqual(res.data[1:], [{}, {}])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_link_deleted(self):
+        """Test that links to rows deleted meanwhile are a 400, not a 500"""
+        items = self._items(2, tags=[self.tag.id])
+
+        with patch.object(bulk, 'insert_links', side_effect=IntegrityError):
+            res = self.client.post(BULK_URL, items, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_changes_recorded_once(self):
+        """Test that each recipe is added to the change feed once"""
+        items = self._items(3)
+
+        with patch.object(
+            bulk.changes, 'record_changes',
+            side_effect=bulk.changes.record_changes
+        ) as record_changes:
+            self.client.post(BULK_URL, items, format='json')
+
+        recorded = [
+            pk
+            for call in record_changes.call_args_list
+            if call[0][1] is Recipe
+            for pk in call[0][2]
+        ]
+        self.assertCountEqual(
+            recorded, Recipe.objects.values_list('pk', flat=True)
+        )
+
+    def test_bulk_create_requires_list(self):
+        """Test that the payload must be a list of limited length"""
+        res = self.client.post(BULK_URL, self._items(1)[0], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(BULK_URL, self._items(10001), format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_constant_queries(self):
+        """Test that the number of queries does not grow with the items"""
+        if not connection.features.can_return_rows_from_bulk_insert:
+            self.skipTest('Recipes are inserted one by one on this database')
+
+        counts = []
+        for count in (2, 20):
+            items = self._items(
+                count, tags=[self.tag.id], ingredients=[self.ingredient.id]
+            )
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(BULK_URL, items, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+
+class RecipeExportTestCase(TestCase):
+    """Test streaming exports of recipes"""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email='test@example.com',
+            password='root1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user, title='Pancakes')
+        self.recipe.tags.add(sample_tag(user=self.user, name='Sweet'))
+        self.recipe.tags.add(sample_tag(user=self.user, name='Quick'))
+        self.recipe.ingredients.add(sample_ingredient(user=self.user))
+        sample_recipe(user=self.user, title='Waffles')
+        sample_recipe(
+            user=User.objects.create(email='other@example.com'),
+            title='Crepes'
+        )
+
+    def _export(self, **params):
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+
+        return res, b''.join(res.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        """Test exporting the user's recipes as lines of JSON"""
+        res, content = self._export()
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [row['title'] for row in rows], ['Pancakes', 'Waffles']
+        )
+        detail = RecipeDetailSerializer(self.recipe).data
+        self.assertEqual(rows[0]['price'], detail['price'])
+        self.assertEqual(
+            sorted(tag['name'] for tag in rows[0]['tags']),
+            ['Quick', 'Sweet']
+        )
+        self.assertEqual(rows[0]['ingredients'], detail['ingredients'])
+
+    def test_export_csv(self):
+        """Test exporting the user's recipes as CSV"""
+        res, content = self._export(type='csv')
+
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(content.splitlines()))
+        self.assertEqual(
+            [row['title'] for row in rows], ['Pancakes', 'Waffles']
+        )
+        self.assertEqual(
+            sorted(rows[0]['tags'].split('|')), ['Quick', 'Sweet']
+        )
+        self.assertEqual(rows[1]['tags'], '')
+
+    def test_export_filtered(self):
+        """Test that exports follow the list filters"""
+        _, content = self._export(search='waffles')
+
+        self.assertEqual(
+            [json.loads(line)['title'] for line in content.splitlines()],
+            ['Waffles']
+        )
+
+    def test_export_invalid_type(self):
+        """Test that unknown export formats are rejected"""
+        res = self.client.get(EXPORT_URL, {'type': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeSparseFieldsetTestCase(TestCase):
+    """Test limiting the fields of recipe responses"""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email='test@example.com',
+            password='root1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(
+            user=self.user, title='Pancakes', link='https://example.com'
+        )
+        self.recipe.tags.add(sample_tag(user=self.user))
+        self.recipe.ingredients.add(sample_ingredient(user=self.user))
+
+    def _get(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res, ' '.join(query['sql'] for query in queries)
+
+    def test_fields(self):
+        """Test selecting fields without loading other columns or links"""
+        res, sql = self._get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(
+            res.data['results'], [{'id': self.recipe.id, 'title': 'Pancakes'}]
+        )
+        self.assertNotIn('link', sql)
+        self.assertNotIn('core_recipe_tags', sql)
+        self.assertNotIn('core_recipe_ingredients', sql)
+
+    def test_omit(self):
+        """Test dropping fields, prefetching only the remaining links"""
+        res, sql = self._get(RECIPES_URL, {'omit': 'tags,price'})
+
+        recipe = res.data['results'][0]
+        self.assertNotIn('tags', recipe)
+        self.assertNotIn('price', recipe)
+        self.assertEqual(
+            recipe['ingredients'], [self.recipe.ingredients.get().id]
+        )
+        self.assertNotIn('core_recipe_tags', sql)
+        self.assertIn('core_recipe_ingredients', sql)
+
+    def test_detail_fields(self):
+        """Test selecting fields of the recipe detail"""
+        res, _ = self._get(
+            detail_url(self.recipe.id), {'fields': 'title,tags'}
+        )
+
+        self.assertEqual(
+            res.data,
+            {'title': 'Pancakes', 'tags': [
+                {'id': self.recipe.tags.get().id, 'name': 'Main Course'}
+            ]}
+        )
+
+    def test_fields_with_search_and_pages(self):
+        """Test that pruned rows still carry the sort key of the cursor"""
+        sample_recipe(user=self.user, title='Pancakes with syrup')
+
+        res, _ = self._get(
+            RECIPES_URL,
+            {'fields': 'title', 'search': 'pancakes', 'page_size': 1}
+        )
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(list(res.data['results'][0]), ['title'])
+
+    def test_unknown_field(self):
+        """Test that unknown field names are rejected"""
+        res = self.client.get(RECIPES_URL, {'omit': 'title,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('secret', res.data['omit'][0])
+
+
+class RecipeExpandTestCase(TestCase):
+    """Test nesting tags and ingredients in recipe lists"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(
+            email='test@example.com',
+            password='root1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = sample_tag(user=self.user)
+        self.ingredient = sample_ingredient(user=self.user)
+        self.recipe = sample_recipe(user=self.user)
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+        sample_recipe(user=self.user, title='Plain')
+
+    def test_expand(self):
+        """Test that expanded lists hold the names, like the detail"""
+        res = self.client.get(RECIPES_URL, {'expand': 'tags,ingredients'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipes = res.data['results']
+        self.assertEqual(
+            recipes[1],
+            RecipeDetailSerializer(Recipe.objects.get(id=self.recipe.id)).data
+        )
+        self.assertEqual(recipes[0]['tags'], [])
+        self.assertEqual(recipes[0]['ingredients'], [])
+
+    def test_expand_one_field(self):
+        """Test that other relations are still listed by ID"""
+        res = self.client.get(RECIPES_URL, {'expand': 'tags'})
+
+        recipe = res.data['results'][1]
+        self.assertEqual(
+            recipe['tags'], [{'id': self.tag.id, 'name': self.tag.name}]
+        )
+        self.assertEqual(recipe['ingredients'], [self.ingredient.id])
+
+    def test_expand_single_query(self):
+        """Test that the database builds the nested rows where it can"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPES_URL, {'expand': 'tags,ingredients'})
+
+        expected = 1 if connection.vendor == 'postgresql' else 3
+        self.assertEqual(len(queries), expected)
+
+    def test_expand_unknown_field(self):
+        """Test that only relations can be expanded"""
+        res = self.client.get(RECIPES_URL, {'expand': 'title'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('title', res.data['expand'][0])
+
+
+class RecipesQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    """Test that the recipes API stays within its query budget"""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email='test@example.com',
+            password='root1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.recipes = []
+        for i in range(10):
+            recipe = sample_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(
+                sample_tag(user=self.user, name=f'Tag {i}'),
+                sample_tag(user=self.user, name=f'Other tag {i}')
+            )
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'Ingredient {i}'),
+                sample_ingredient(user=self.user, name=f'Other {i}')
+            )
+            self.recipes.append(recipe)
+
+    def test_list_recipes_query_budget(self):
+        """Test listing recipes runs a fixed number of queries"""
+        with self.assertMaxQueries(QUERY_BUDGETS['list']):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), len(self.recipes))
+
+    def test_filter_all_recipes_query_budget(self):
+        """Test AND-filtering recipes runs a fixed number of queries"""
+        cache.clear()
+        recipe = self.recipes[0]
+        params = {
+            'tags_all': ','.join(str(tag.id) for tag in recipe.tags.all()),
+            'ingredients_all': ','.join(
+                str(ingredient.id) for ingredient in recipe.ingredients.all()
+            ),
+        }
+
+        with self.assertMaxQueries(QUERY_BUDGETS['list_all_cold']):
+            res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(len(res.data['results']), 1)
+
+        with self.assertMaxQueries(QUERY_BUDGETS['list']):
+            res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_filter_recipes_query_budget(self):
+        """Test filtering recipes runs a fixed number of queries"""
+        tag_ids = ','.join(
+            str(tag.id) for tag in Tag.objects.filter(user=self.user)
+        )
+
+        with self.assertMaxQueries(QUERY_BUDGETS['list']):
+            res = self.client.get(RECIPES_URL, {'tags': tag_ids})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_recipe_query_budget(self):
+        """Test viewing a recipe detail runs a fixed number of queries"""
+        url = detail_url(self.recipes[0].id)
+
+        with self.assertMaxQueries(QUERY_BUDGETS['retrieve']):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 2)
+        self.assertEqual(len(res.data['ingredients']), 2)
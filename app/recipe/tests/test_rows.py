@@ -0,0 +1,128 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import serializers
+from recipe.rows import RowSerializer
+from recipe.views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class RowSerializerTests(TestCase):
+    """Test serializing values() rows like model serializers"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Dessert', 'Breakfast')
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Salt', 'Flour', 'Sugar', 'Egg')
+        ]
+        for i, price in enumerate(('5', '5.5', '0', '999.99', '12.30')):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Pancakes {i}',
+                time_minutes=i * 7,
+                price=Decimal(price),
+                link='https://example.com' if i % 2 else ''
+            )
+            recipe.tags.add(*reversed(tags[:i]))
+            recipe.ingredients.add(*ingredients[i % 2::2])
+
+    def _render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_same_output_as_serializers(self):
+        """Test that rows render to the same JSON as model instances"""
+        for serializer_class in (
+            serializers.RecipeSerializer,
+            serializers.RecipeDetailSerializer,
+            serializers.TagSerializer,
+            serializers.IngredientSerializer,
+        ):
+            model = serializer_class.Meta.model
+            instances = model.objects.order_by('id')
+            if model is Recipe:
+                instances = instances.prefetch_related(
+                    *RecipeViewSet().get_prefetches(('tags', 'ingredients'))
+                )
+            row_serializer = RowSerializer.compile(serializer_class())
+            rows = row_serializer.values(model.objects.order_by('id'))
+
+            self.assertEqual(
+                self._render(row_serializer.serialize(list(rows))),
+                self._render(serializer_class(instances, many=True).data)
+            )
+
+    def test_unsupported_serializer_not_compiled(self):
+        """Test that serializers with other fields are left alone"""
+        self.assertIsNone(
+            RowSerializer.compile(serializers.RecipeImageSerializer())
+        )
+
+    def test_same_responses(self):
+        """Test that list responses are byte for byte the same"""
+        requests = [
+            (RecipeViewSet, RECIPES_URL, {}),
+            (RecipeViewSet, RECIPES_URL, {'page_size': 2}),
+            (RecipeViewSet, RECIPES_URL, {'omit': 'tags,link'}),
+            (
+                RecipeViewSet, RECIPES_URL,
+                {'expand': 'tags,ingredients', 'page_size': 3}
+            ),
+            (
+                RecipeViewSet, RECIPES_URL,
+                {'expand': 'ingredients', 'fields': 'id,ingredients'}
+            ),
+            (RecipeViewSet, RECIPES_URL, {'search': 'pancakes'}),
+            (RecipeViewSet, RECIPES_URL, {'q': 'pancake'}),
+            (
+                RecipeViewSet, RECIPES_URL,
+                {'tags_all': Tag.objects.first().id, 'total': 1}
+            ),
+            (TagViewSet, TAGS_URL, {'ordering': '-usage', 'page_size': 1}),
+            (IngredientViewSet, INGREDIENTS_URL, {'fields': 'name'}),
+        ]
+        for view, url, params in requests:
+            cache.clear()
+            res = self.client.get(url, params)
+            cache.clear()
+            with patch.object(view, 'row_list', False):
+                expected = self.client.get(url, params)
+
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res.content, expected.content, params)
+            if res.data.get('next'):
+                cache.clear()
+                res = self.client.get(res.data['next'])
+                cache.clear()
+                with patch.object(view, 'row_list', False):
+                    expected = self.client.get(expected.data['next'])
+
+                self.assertEqual(res.content, expected.content, params)
+
+    def test_rows_read(self):
+        """Test that listed recipes aren't built as model instances"""
+        with patch.object(Recipe, '__init__') as init:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 5)
+        init.assert_not_called()
@@ -1,4 +1,8 @@
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError
 from django.urls import reverse
 from django.test import TestCase
 
@@ -6,12 +10,20 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Tag, Recipe
+from core.tests.utils import QueryBudgetMixin, run_on_commit
 
 from recipe.serializers import TagSerializer
 
 User = get_user_model()
 
 TAGS_URL = reverse('recipe:tag-list')
+AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
+BULK_URL = reverse('recipe:tag-bulk-get-or-create')
+
+# Maximum number of queries allowed per action, whatever the data size
+QUERY_BUDGETS = {
+    'list': 1,
+}
 
 
 class PublicTagsApiTestCase(TestCase):
@@ -49,7 +61,7 @@ class PrivateTagsApiTestCase(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test that tags returned are for the authenticated user"""
@@ -66,8 +78,8 @@ class PrivateTagsApiTestCase(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_create_tag_successful(self):
         """Test creating a new tag"""
@@ -82,6 +94,60 @@ class PrivateTagsApiTestCase(TestCase):
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
         self.assertTrue(exists)
 
+    def test_create_tag_duplicate_name(self):
+        """Test that a user cannot create two tags with the same name"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(TAGS_URL, {'name': ' vegan '})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data['name'], ['A tag with this name already exists.']
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_create_tag_duplicate_name_race(self):
+        """Test that a duplicate created concurrently is a bad request"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        with patch.object(TagSerializer, 'validate_name', lambda _, v: v):
+            res = self.client.post(TAGS_URL, {'name': 'vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data['name'], ['A tag with this name already exists.']
+        )
+
+    def test_create_tag_other_integrity_error(self):
+        """Test that other integrity errors aren't reported as duplicates"""
+        with patch.object(Tag, 'save', side_effect=IntegrityError('fk')):
+            with self.assertRaises(IntegrityError):
+                self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+    def test_bulk_get_or_create(self):
+        """Test getting tags by name, creating the missing ones"""
+        existing = Tag.objects.create(user=self.user, name='Vegan')
+        other = User.objects.create(email='other@example.com')
+        Tag.objects.create(user=other, name='Dessert')
+
+        res = self.client.post(BULK_URL, {
+            'names': ['VEGAN', 'Dessert', '  dessert', 'Vegan']
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        created = Tag.objects.get(user=self.user, name='Dessert')
+        self.assertEqual(
+            [row['id'] for row in res.data],
+            [existing.id, created.id, created.id, existing.id]
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_get_or_create_invalid(self):
+        """Test that an empty list of names is rejected"""
+        res = self.client.post(BULK_URL, {'names': []}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_create_tag_invalid(self):
         """Test creating a new tag with invalid payload"""
         tag_data = {'name': ''}
@@ -108,8 +174,8 @@ class PrivateTagsApiTestCase(TestCase):
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_tags_assigned_unique(self):
         """Test filtering tags by assigned returns unique items"""
@@ -134,4 +200,152 @@ class PrivateTagsApiTestCase(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_filter_tags_by_min_usage(self):
+        """Test filtering tags used by at least N recipes"""
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        tag2 = Tag.objects.create(user=self.user, name='Lunch')
+
+        for title in ('Full english', 'Omelette'):
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=10,
+                price=5.00,
+                user=self.user
+            )
+            recipe.tags.add(tag1)
+        recipe.tags.add(tag2)
+
+        res = self.client.get(TAGS_URL, {'min_usage': 2})
+
+        ids = [row['id'] for row in res.data['results']]
+        self.assertEqual(ids, [tag1.id])
+
+    def test_filter_tags_by_invalid_min_usage(self):
+        """Test that a non-numeric minimum usage is a bad request"""
+        for params in ({'min_usage': 'abc'}, {'assigned_only': 'yes'}):
+            res = self.client.get(TAGS_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_order_tags_by_usage(self):
+        """Test ordering tags by the number of recipes using them"""
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        tag2 = Tag.objects.create(user=self.user, name='Lunch')
+        tag3 = Tag.objects.create(user=self.user, name='Dinner')
+
+        for title in ('Full english', 'Omelette'):
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=10,
+                price=5.00,
+                user=self.user
+            )
+            recipe.tags.add(tag2)
+        recipe.tags.add(tag3)
+
+        res = self.client.get(TAGS_URL, {'ordering': '-usage'})
+
+        ids = [row['id'] for row in res.data['results']]
+        self.assertEqual(ids, [tag2.id, tag3.id, tag1.id])
+
+    def test_fuzzy_search_tags(self):
+        """Test finding tags with a misspelt name"""
+        cache.clear()
+        tag1 = Tag.objects.create(user=self.user, name='Vegetarian')
+        Tag.objects.create(user=self.user, name='Dessert')
+        user2 = User.objects.create(
+            email='test2@example.com',
+            password='test_password'
+        )
+        Tag.objects.create(user=user2, name='Vegetarian')
+
+        res = self.client.get(TAGS_URL, {'q': 'vegitarian'})
+
+        ids = [row['id'] for row in res.data['results']]
+        self.assertEqual(ids, [tag1.id])
+
+        with run_on_commit():
+            tag2 = Tag.objects.create(user=self.user, name='Vegetarians')
+        res = self.client.get(TAGS_URL, {'q': 'vegitarian'})
+
+        ids = [row['id'] for row in res.data['results']]
+        self.assertEqual(ids, [tag1.id, tag2.id])
+
+    def test_tag_fields(self):
+        """Test limiting the fields of listed tags"""
+        cache.clear()
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL, {'fields': 'name'})
+        self.assertEqual(res.data['results'], [{'name': 'Vegan'}])
+
+        res = self.client.get(TAGS_URL, {'omit': 'name', 'ordering': 'usage'})
+        self.assertEqual(res.data['results'], [{'id': tag.id}])
+
+    def test_autocomplete_tags(self):
+        """Test completing tag names from a prefix"""
+        cache.clear()
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Vegetarian')
+        Tag.objects.create(user=self.user, name='Dessert')
+        user2 = User.objects.create(
+            email='test2@example.com',
+            password='test_password'
+        )
+        Tag.objects.create(user=user2, name='Vegan')
+
+        for _ in range(2):
+            res = self.client.get(AUTOCOMPLETE_URL, {'prefix': 've'})
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.data, [
+                {'id': tag1.id, 'name': 'Vegan'},
+                {'id': tag2.id, 'name': 'Vegetarian'},
+            ])
+
+        res = self.client.get(
+            AUTOCOMPLETE_URL, {'prefix': 'Ve', 'limit': 1}
+        )
         self.assertEqual(len(res.data), 1)
+
+    def test_autocomplete_invalid_limit(self):
+        """Test that a non-numeric autocomplete limit is a bad request"""
+        res = self.client.get(
+            AUTOCOMPLETE_URL, {'prefix': 've', 'limit': 'abc'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TagsQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    """Test that the tags API stays within its query budget"""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email='test@example.com',
+            password='root1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_tags_query_budget(self):
+        """Test listing tags runs a fixed number of queries"""
+        for i in range(10):
+            tag = Tag.objects.create(user=self.user, name=f'Tag {i}')
+            recipe = Recipe.objects.create(
+                title=f'Recipe {i}',
+                time_minutes=10,
+                price=5.00,
+                user=self.user
+            )
+            recipe.tags.add(tag)
+
+        with self.assertMaxQueries(QUERY_BUDGETS['list']):
+            res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertMaxQueries(QUERY_BUDGETS['list']):
+            res = self.client.get(TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
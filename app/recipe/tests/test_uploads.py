@@ -0,0 +1,250 @@
+import io
+import os
+import tempfile
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from core.models import ImageUpload, Recipe
+from recipe import uploads
+
+
+def image_bytes(size, image_format, **options):
+    """Return the bytes of an image in the given format"""
+    output = io.BytesIO()
+    image = Image.new('RGB', size, (200, 100, 50))
+    image.save(output, image_format, **options)
+
+    return output.getvalue()
+
+
+def uploads_url(recipe_id):
+    """Return the URL starting chunked uploads to a recipe"""
+    return reverse('recipe:recipe-uploads', args=[recipe_id])
+
+
+class CheckHeaderTests(TestCase):
+    """Test reading the format and dimensions of images"""
+
+    def test_formats(self):
+        """Test the header of each accepted format"""
+        for image_format, options in (
+            ('JPEG', {}),
+            ('PNG', {}),
+            ('GIF', {}),
+            ('WEBP', {}),
+            ('WEBP', {'lossless': True}),
+            ('WEBP', {'exif': b'Exif\x00\x00'}),
+        ):
+            data = image_bytes((300, 200), image_format, **options)
+            self.assertEqual(
+                uploads.check_header(data[:100000]), (image_format, (300, 200))
+            )
+
+    def test_incomplete(self):
+        """Test that more bytes are asked for until the header is read"""
+        data = image_bytes((300, 200), 'JPEG')
+
+        self.assertIsNone(uploads.check_header(data[:20]))
+        with self.assertRaises(ValidationError):
+            uploads.check_header(data[:20], complete=True)
+
+    def test_invalid(self):
+        """Test rejecting files that aren't accepted images"""
+        for data in (
+            b'not an image' * 30000,
+            image_bytes((300, 200), 'BMP'),
+            b'RIFF\x00\x00\x00\x00WEBPVP8?' + b'\x00' * 30,
+        ):
+            with self.assertRaises(ValidationError):
+                uploads.check_header(data, complete=True)
+
+    @patch.object(uploads, 'MAX_IMAGE_PIXELS', 1000)
+    def test_too_many_pixels(self):
+        """Test rejecting images with too many pixels from their header"""
+        data = image_bytes((300, 200), 'PNG')
+
+        with self.assertRaises(ValidationError):
+            uploads.check_header(data[:100])
+
+
+class ImageUploadTests(TestCase):
+    """Test uploading recipe images, at once or in chunks"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.upload_dir = os.path.join(media_root.name, 'chunks')
+        settings = override_settings(
+            MEDIA_ROOT=media_root.name, CHUNKED_UPLOAD_DIR=self.upload_dir
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=5
+        )
+
+    def _upload_image(self, data, name='soup.jpg'):
+        """Post a file to the recipe's upload-image endpoint"""
+        url = reverse('recipe:recipe-upload-image', args=[self.recipe.id])
+        return self.client.post(
+            url, {'image': SimpleUploadedFile(name, data)}, format='multipart'
+        )
+
+    def _patch(self, url, data, offset):
+        """Send a chunk of a chunked upload"""
+        return self.client.patch(
+            url, data, content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def test_upload_streamed(self):
+        """Test that uploaded images are checked and stored"""
+        with patch('recipe.uploads.ImageUploadHandler.file_complete',
+                   autospec=True,
+                   side_effect=uploads.ImageUploadHandler.file_complete) \
+                as file_complete:
+            res = self._upload_image(image_bytes((300, 200), 'PNG'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(file_complete.call_count, 1)
+        self.recipe.refresh_from_db()
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+
+    def test_upload_invalid(self):
+        """Test rejecting files whose header isn't an accepted image's"""
+        res = self._upload_image(image_bytes((300, 200), 'BMP'), 'soup.bmp')
+
+        self.assertEqual(res.status_code, 400)
+        self.assertIn('image', res.data)
+
+    def test_upload_named_after_format(self):
+        """Test that images are stored with the extension of their format"""
+        data = image_bytes((300, 200), 'PNG') + b'<script>alert(1)</script>'
+
+        res = self._upload_image(data, 'evil.html')
+
+        self.assertEqual(res.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image.name.endswith('.png'))
+
+    @patch.object(uploads, 'MAX_IMAGE_PIXELS', 1000)
+    def test_upload_too_many_pixels(self):
+        """Test rejecting images with too many pixels"""
+        res = self._upload_image(image_bytes((300, 200), 'JPEG'))
+
+        self.assertEqual(res.status_code, 400)
+        self.assertIn('pixels', str(res.data['image']))
+
+    @patch.object(uploads, 'MAX_UPLOAD_SIZE', 1000)
+    @patch.object(uploads, 'MAX_FORM_OVERHEAD', 10 ** 6)
+    def test_upload_too_large(self):
+        """Test rejecting files larger than the limit while received"""
+        res = self._upload_image(os.urandom(5000))
+
+        self.assertEqual(res.status_code, 413)
+
+    @patch.object(uploads, 'MAX_UPLOAD_SIZE', 1000)
+    def test_upload_body_too_large(self):
+        """Test rejecting bodies declaring too many bytes"""
+        res = self._upload_image(os.urandom(100000))
+
+        self.assertEqual(res.status_code, 413)
+
+    def test_chunked_upload(self):
+        """Test uploading an image in chunks, resuming at the offset"""
+        data = image_bytes((400, 300), 'JPEG')
+        res = self.client.post(
+            uploads_url(self.recipe.id), {'size': len(data)}
+        )
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res['Upload-Offset'], '0')
+        url = res['Location']
+
+        res = self._patch(url, data[:1000], 0)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['offset'], 1000)
+
+        res = self._patch(url, data[500:1500], 500)
+        self.assertEqual(res.status_code, 409)
+
+        res = self.client.head(url)
+        self.assertEqual(res['Upload-Offset'], '1000')
+
+        res = self._patch(url, data[1000:], 1000)
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('image_variants', res.data)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image.name.endswith('.jpg'))
+        with open(self.recipe.image.path, 'rb') as file:
+            self.assertEqual(file.read(), data)
+        self.assertFalse(ImageUpload.objects.exists())
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_chunked_upload_invalid(self):
+        """Test dropping chunked uploads once their header is invalid"""
+        res = self.client.post(uploads_url(self.recipe.id), {'size': 300000})
+
+        res = self._patch(res['Location'], b'not an image' * 25000, 0)
+
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(ImageUpload.objects.exists())
+
+    def test_chunked_upload_past_size(self):
+        """Test rejecting chunks going past the size of the image"""
+        data = image_bytes((400, 300), 'JPEG')
+        res = self.client.post(uploads_url(self.recipe.id), {'size': 100})
+
+        res = self._patch(res['Location'], data, 0)
+
+        self.assertEqual(res.status_code, 413)
+
+    @patch.object(uploads, 'MAX_UPLOAD_SIZE', 1000)
+    def test_chunked_upload_too_large(self):
+        """Test refusing to start uploads of images that are too large"""
+        res = self.client.post(uploads_url(self.recipe.id), {'size': 1001})
+
+        self.assertEqual(res.status_code, 413)
+        self.assertFalse(ImageUpload.objects.exists())
+
+    def test_chunked_upload_cancel(self):
+        """Test cancelling a chunked upload"""
+        res = self.client.post(uploads_url(self.recipe.id), {'size': 100})
+
+        res = self.client.delete(res['Location'])
+
+        self.assertEqual(res.status_code, 204)
+        self.assertFalse(ImageUpload.objects.exists())
+
+    def test_chunked_upload_other_user(self):
+        """Test that uploads to other users' recipes are not found"""
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass'
+        )
+        recipe = Recipe.objects.create(
+            user=other, title='Stew', time_minutes=5, price=5
+        )
+        upload = ImageUpload.objects.create(recipe=recipe, size=100)
+
+        res = self.client.post(uploads_url(recipe.id), {'size': 100})
+        self.assertEqual(res.status_code, 404)
+        res = self.client.get(
+            reverse('recipe:recipe-upload', args=[recipe.id, upload.id])
+        )
+        self.assertEqual(res.status_code, 404)
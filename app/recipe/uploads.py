@@ -0,0 +1,311 @@
+import fcntl
+import io
+import os
+import struct
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
+from django.http.multipartparser import (
+    MultiPartParser as DjangoMultiPartParser, MultiPartParserError
+)
+from django.utils import timezone
+from PIL import Image
+from rest_framework import parsers, status
+from rest_framework.exceptions import (
+    APIException, NotFound, ParseError, ValidationError
+)
+
+from core.models import ImageUpload
+from recipe import images
+
+# Largest image accepted, in bytes and in pixels
+MAX_UPLOAD_SIZE = 20 * 2 ** 20
+MAX_IMAGE_PIXELS = 50 * 10 ** 6
+
+# Bytes a multipart body may hold besides its image
+MAX_FORM_OVERHEAD = 64 * 2 ** 10
+
+# Bytes read at most to find the format and dimensions of an image
+HEADER_SIZE = 256 * 2 ** 10
+
+# Formats accepted, with the extension of their files
+IMAGE_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+# Bytes read from the request at once when receiving a chunk
+CHUNK_READ_SIZE = 64 * 2 ** 10
+
+# Unfinished chunked uploads are dropped this long after their last chunk
+UPLOAD_EXPIRY = timedelta(days=1)
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = f'Images must be at most {MAX_UPLOAD_SIZE} bytes.'
+    default_code = 'too_large'
+
+
+class UploadConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The upload is at another offset.'
+    default_code = 'conflict'
+
+
+def _webp_header(head):
+    """Return the dimensions in a WebP header, or None if incomplete
+
+    Pillow only opens whole WebP files, so their header is read here.
+    """
+    if len(head) < 30:
+        return None
+    chunk = head[12:16]
+    if chunk == b'VP8X':
+        width, height = (
+            int.from_bytes(head[at:at + 3], 'little') + 1 for at in (24, 27)
+        )
+    elif chunk == b'VP8 ' and head[23:26] == b'\x9d\x01\x2a':
+        width, height = (
+            value & 0x3fff for value in struct.unpack('<HH', head[26:30])
+        )
+    elif chunk == b'VP8L' and head[20] == 0x2f:
+        bits = int.from_bytes(head[21:25], 'little')
+        width, height = (bits & 0x3fff) + 1, (bits >> 14 & 0x3fff) + 1
+    else:
+        raise ValidationError('Upload a valid image.')
+
+    return 'WEBP', (width, height)
+
+
+def check_header(head, complete=False):
+    """Return the format and dimensions of an image from its first bytes
+
+    Returns None while more bytes are needed, and raises a validation
+    error for files that aren't images of an accepted format or that have
+    too many pixels. `complete` tells that `head` holds the whole file.
+    """
+    complete = complete or len(head) >= HEADER_SIZE
+    too_many_pixels = ValidationError(
+        f'Images must have at most {MAX_IMAGE_PIXELS} pixels.'
+    )
+    header = None
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        header = _webp_header(head)
+    else:
+        try:
+            with Image.open(io.BytesIO(head)) as image:
+                header = image.format, image.size
+        except Image.DecompressionBombError:
+            raise too_many_pixels
+        except (OSError, SyntaxError, ValueError, IndexError, struct.error):
+            pass
+
+    if header is None:
+        if complete:
+            raise ValidationError('Upload a valid image.')
+        return None
+
+    image_format, (width, height) = header
+    if width * height > MAX_IMAGE_PIXELS:
+        raise too_many_pixels
+    if image_format not in IMAGE_FORMATS:
+        raise ValidationError(
+            f'Images must be in one of {", ".join(IMAGE_FORMATS)}.'
+        )
+
+    return header
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Upload handler writing images to disk as they are checked
+
+    Bodies declaring too many bytes are refused before being read, and
+    files as soon as they grow too large or their header shows they
+    aren't valid images. Received files carry their `image_header`.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        """Refuse bodies larger than an image and its form"""
+        if content_length > MAX_UPLOAD_SIZE + MAX_FORM_OVERHEAD:
+            raise UploadTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.head = b''
+        self.image_header = None
+
+    def _reject(self, exc):
+        """Drop the file being received and raise an error about it"""
+        self.file.close()
+        if isinstance(exc, ValidationError):
+            exc = ValidationError({self.field_name: exc.detail})
+        raise exc
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > MAX_UPLOAD_SIZE:
+            self._reject(UploadTooLarge())
+        if self.image_header is None:
+            self.head += raw_data[:HEADER_SIZE - len(self.head)]
+            try:
+                self.image_header = check_header(self.head)
+            except ValidationError as exc:
+                self._reject(exc)
+
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if self.image_header is None:
+            try:
+                self.image_header = check_header(self.head, complete=True)
+            except ValidationError as exc:
+                self._reject(exc)
+        file = super().file_complete(file_size)
+        file.image_header = self.image_header
+        self.head = b''
+
+        return file
+
+
+class ImageUploadParser(parsers.MultiPartParser):
+    """Multipart parser streaming files through `ImageUploadHandler`"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Return the form data and the checked image files"""
+        parser_context = parser_context or {}
+        request = parser_context['request']
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        meta = request.META.copy()
+        meta['CONTENT_TYPE'] = media_type
+        handlers = [ImageUploadHandler(request._request)]
+
+        try:
+            parser = DjangoMultiPartParser(meta, stream, handlers, encoding)
+            data, files = parser.parse()
+        except MultiPartParserError as exc:
+            raise ParseError(f'Multipart form parse error - {exc}')
+
+        return parsers.DataAndFiles(data, files)
+
+
+def _path(upload_id):
+    """Return the path of the bytes received for an upload"""
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, str(upload_id))
+
+
+def remove_received(upload_id):
+    """Delete the bytes received for an upload, if any"""
+    try:
+        os.remove(_path(upload_id))
+    except FileNotFoundError:
+        pass
+
+
+def delete_expired_uploads():
+    """Delete the chunked uploads left unfinished for too long"""
+    ImageUpload.objects.filter(
+        updated__lt=timezone.now() - UPLOAD_EXPIRY
+    ).delete()
+
+
+def start_upload(recipe, size):
+    """Return a new chunked upload of a `size` bytes image for a recipe"""
+    if size > MAX_UPLOAD_SIZE:
+        raise UploadTooLarge()
+    delete_expired_uploads()
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    upload = ImageUpload.objects.create(recipe=recipe, size=size)
+    open(_path(upload.id), 'wb').close()
+
+    return upload
+
+
+def _receive(upload, file, stream):
+    """Append a request body to an upload, checking the image header
+
+    Bytes received before the client went away are kept.
+    """
+    head = b''
+    if not upload.format:
+        file.seek(0)
+        head = file.read(min(upload.offset, HEADER_SIZE))
+    file.truncate(upload.offset)
+    file.seek(upload.offset)
+
+    while True:
+        try:
+            chunk = stream.read(CHUNK_READ_SIZE)
+        except OSError:
+            break
+        if not chunk:
+            break
+        if upload.offset + len(chunk) > upload.size:
+            raise UploadTooLarge('The chunk goes past the size of the image.')
+        file.write(chunk)
+        upload.offset += len(chunk)
+        if not upload.format:
+            head += chunk[:HEADER_SIZE - len(head)]
+            header = check_header(head, upload.offset == upload.size)
+            if header is not None:
+                upload.format = header[0]
+
+
+class _ReceivedFile(File):
+    """File moved into storage rather than copied, like uploaded files"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def _complete(upload):
+    """Make a fully received image the image of its recipe"""
+    recipe = upload.recipe
+    stale = recipe.image_variants
+    recipe.image_variants = {}
+    with open(_path(upload.id), 'rb') as file:
+        recipe.image.save(
+            f'image.{IMAGE_FORMATS[upload.format]}', _ReceivedFile(file)
+        )
+    images.schedule_variants(recipe, stale)
+    upload.delete()
+
+    return recipe
+
+
+def append_chunk(upload, offset, stream):
+    """Append a request body to a chunked upload at `offset`
+
+    Returns the recipe once its image is complete, and None before. One
+    chunk is received at a time for each upload. Invalid images are
+    dropped with their upload.
+    """
+    try:
+        file = open(_path(upload.id), 'r+b')
+    except FileNotFoundError:
+        raise NotFound()
+
+    with file:
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadConflict('Another chunk is being received.')
+        try:
+            upload.refresh_from_db()
+        except ImageUpload.DoesNotExist:
+            raise NotFound()
+        if offset != upload.offset:
+            raise UploadConflict()
+        try:
+            _receive(upload, file, stream)
+        except ValidationError as exc:
+            upload.delete()
+            raise ValidationError({'image': exc.detail})
+        finally:
+            if upload.pk is not None:
+                upload.save(update_fields=['offset', 'format', 'updated'])
+
+        if upload.offset < upload.size:
+            return None
+        with transaction.atomic():
+            return _complete(upload)
@@ -11,5 +11,6 @@ router.register('recipes', views.RecipeViewSet)
 app_name = 'recipe'
 
 urlpatterns = [
+    path('changes/', views.ChangeFeedView.as_view(), name='changes'),
     path('', include(router.urls)),
 ]
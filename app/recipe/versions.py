@@ -0,0 +1,53 @@
+import time
+
+from django.core.cache import cache
+
+
+def _version_key(scope, user_id):
+    return f'recipe:version:{scope}:{user_id}'
+
+
+def _initial_version():
+    """Return a fresh version, greater than any that may have been evicted"""
+    return time.time_ns() // 1000
+
+
+def get_version(scope, user_id):
+    """Return the current version of a user's data in the given scope"""
+    key = _version_key(scope, user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+
+    return version
+
+
+def bump_version(scope, user_id):
+    """Invalidate everything cached for a user's data in the given scope"""
+    key = _version_key(scope, user_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=None)
+        return cache.get(key)
+
+
+def _modified_key(user_id):
+    return f'recipe:modified:{user_id}'
+
+
+def get_last_modified(user_id):
+    """Return when a user's data last changed, as a Unix timestamp"""
+    key = _modified_key(user_id)
+    modified = cache.get(key)
+    if modified is None:
+        cache.add(key, int(time.time()), timeout=None)
+        modified = cache.get(key)
+
+    return modified
+
+
+def mark_modified(user_id):
+    """Record that a user's data changed now"""
+    cache.set(_modified_key(user_id), int(time.time()), timeout=None)
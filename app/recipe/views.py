@@ -1,35 +1,141 @@
+import io
+
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.views import APIView
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
-from core.models import Tag, Ingredient, Recipe
-from recipe import serializers
+from core.changes import changes_since
+from core.managers import normalize_name
+from core.models import Change, ImageUpload, Tag, Ingredient, Recipe
+from core.search import search_recipes
+from recipe import bulk, images, serializers, index, uploads
+from recipe.autocomplete import DEFAULT_LIMIT, MAX_LIMIT, prefix_matches
+from recipe.cache import (
+    CachedListMixin, ConditionalGetMixin, ConditionalRetrieveMixin
+)
+from recipe.export import EXPORT_FORMATS, export_recipes
+from recipe.fieldsets import ExpandableFieldsMixin, SparseFieldsetMixin
+from recipe.fuzzy import fuzzy_filter
+from recipe.pagination import KeysetPagination
+from recipe.rows import RowListMixin
+from user.authentication import (
+    AccessTokenAuthentication, CachedTokenAuthentication
+)
+
+UUID_PATTERN = '[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
+
+
+def int_param(params, name, default, maximum=None):
+    """Return a non-negative integer query parameter"""
+    try:
+        value = int(params.get(name, default))
+    except ValueError:
+        value = -1
+    if value < 0:
+        raise ValidationError({name: 'Must be a non-negative integer.'})
 
+    return min(value, maximum) if maximum else value
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+
+class BaseRecipeAttrViewSet(ConditionalGetMixin,
+                            CachedListMixin,
+                            SparseFieldsetMixin,
+                            RowListMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base viewset for user owned recipe attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (
+        CachedTokenAuthentication, AccessTokenAuthentication
+    )
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    ordering = ('-name', 'id')
+    ordering_choices = {
+        'usage': ('recipe_count', '-name', 'id'),
+        '-usage': ('-recipe_count', '-name', 'id'),
+    }
+
+    def get_ordering(self):
+        """Return the ordering requested by the client, if known"""
+        if self.request.query_params.get('q'):
+            return ('-similarity', 'id')
+        ordering = self.request.query_params.get('ordering')
+        return self.ordering_choices.get(ordering, self.ordering)
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
+        params = self.request.query_params
+        assigned_only = bool(int_param(params, 'assigned_only', 0))
+        min_usage = int_param(params, 'min_usage', 0)
 
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            min_usage = max(min_usage, 1)
+        if min_usage:
+            queryset = queryset.filter(recipe_count__gte=min_usage)
+        if self.request.query_params.get('q'):
+            queryset = fuzzy_filter(
+                queryset, 'name',
+                self.request.query_params['q'],
+                self.request.user.id
+            )
         return queryset.filter(
             user=self.request.user
-        ).order_by('-name').distinct()
+        ).order_by(*self.get_ordering())
 
     def perform_create(self, serializer):
         """Create a new object"""
-        serializer.save(user=self.request.user)
+        try:
+            with transaction.atomic():
+                serializer.save(user=self.request.user)
+        except IntegrityError:
+            duplicate = self.queryset.filter(
+                user=self.request.user,
+                normalized_name=normalize_name(
+                    serializer.validated_data['name']
+                )
+            ).exists()
+            if not duplicate:
+                raise
+            raise ValidationError(
+                {'name': [serializer.duplicate_name_message()]}
+            )
+
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk_get_or_create(self, request):
+        """Return the objects with the given names, creating missing ones"""
+        serializer = serializers.RecipeAttrNamesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        rows = bulk.get_or_create_attrs(
+            self.queryset.model,
+            request.user,
+            serializer.validated_data['names']
+        )
+
+        return Response(self.get_serializer(rows, many=True).data)
+
+    @action(methods=['GET'], detail=False)
+    def autocomplete(self, request):
+        """Return the most used objects whose name starts with a prefix"""
+        limit = int_param(
+            request.query_params, 'limit', DEFAULT_LIMIT, MAX_LIMIT
+        )
+        matches = prefix_matches(
+            self.queryset,
+            request.user.id,
+            request.query_params.get('prefix', ''),
+            max(1, limit)
+        )
+
+        return Response([{'id': pk, 'name': name} for pk, name in matches])
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -44,35 +150,93 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     queryset = Ingredient.objects.all()
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalRetrieveMixin,
+                    CachedListMixin,
+                    SparseFieldsetMixin,
+                    ExpandableFieldsMixin,
+                    RowListMixin,
+                    viewsets.ModelViewSet):
     """Manage recipes in the database"""
     serializer_class = serializers.RecipeSerializer
+    expandable_fields = {
+        'tags': serializers.TagSerializer,
+        'ingredients': serializers.IngredientSerializer,
+    }
     serializers = (
         ('detailed', serializers.RecipeDetailSerializer)
     )
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (
+        CachedTokenAuthentication, AccessTokenAuthentication
+    )
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    ordering = ('-id',)
 
     @staticmethod
-    def _params_to_ints(qs):
-        """Convert a list of string IDs to a list of integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+    def _params_to_ints(params, name):
+        """Convert a query parameter listing IDs to a list of integers"""
+        try:
+            return [int(str_id) for str_id in params[name].split(',')]
+        except ValueError:
+            raise ValidationError(
+                {name: ['Must be a comma-separated list of integers.']}
+            )
+
+    def _filter_any(self, queryset, model, ids):
+        """Keep recipes linked to any of the given tags or ingredients"""
+        field = f'{model._meta.model_name}_id'
+        recipe_ids = model.recipe_set.through.objects.filter(
+            **{f'{field}__in': ids}
+        ).values('recipe_id')
+
+        return queryset.filter(id__in=recipe_ids)
+
+    def _filter_all(self, queryset, model, ids):
+        """Keep recipes linked to all of the given tags or ingredients"""
+        return queryset.filter(id__in=index.recipes_with_all(model, ids))
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
+        params = self.request.query_params
         queryset = self.queryset
 
-        if tags:
-            tags = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tags)
-        if ingredients:
-            ingredients = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients)
+        for model, name in ((Tag, 'tags'), (Ingredient, 'ingredients')):
+            if params.get(name):
+                ids = self._params_to_ints(params, name)
+                queryset = self._filter_any(queryset, model, ids)
+            if params.get(f'{name}_all'):
+                ids = self._params_to_ints(params, f'{name}_all')
+                queryset = self._filter_all(queryset, model, ids)
+        if params.get('search'):
+            queryset = search_recipes(queryset, params['search'])
+        if params.get('q'):
+            queryset = fuzzy_filter(
+                queryset, 'title', params['q'], self.request.user.id
+            )
+
+        return queryset.filter(
+            user=self.request.user
+        ).prefetch_related(
+            *self.get_prefetches(('tags', 'ingredients'))
+        ).order_by(*self.get_ordering())
+
+    def get_prefetches(self, names):
+        """Return the prefetches of recipe relations, ordered by ID"""
+        models = {'tags': Tag, 'ingredients': Ingredient}
+
+        return [
+            Prefetch(name, queryset=models[name].objects.order_by('pk'))
+            for name in names
+        ]
 
-        return queryset.filter(user=self.request.user)
+    def get_ordering(self):
+        """Return the ordering, by relevance when searching"""
+        if self.request.query_params.get('search'):
+            return ('-rank', '-id')
+        if self.request.query_params.get('q'):
+            return ('-similarity', '-id')
+        return self.ordering
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -80,14 +244,53 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeDetailSerializer
         if self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        if self.action == 'bulk_create':
+            return serializers.RecipeBulkSerializer
+        if self.action in ('start_upload', 'upload'):
+            return serializers.ImageUploadSerializer
         return self.serializer_class
 
     def perform_create(self, serializer):
         return serializer.save(user=self.request.user)
 
-    @action(methods=['POST'], detail=True, url_path='upload-image')
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk_create(self, request):
+        """Create a list of recipes at once"""
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        recipes = bulk.create_recipes(
+            request.user, serializer.validated_data
+        )
+
+        return Response(
+            self.get_serializer(recipes, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """Stream the user's recipes as NDJSON or CSV"""
+        export_format = request.query_params.get('type', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError(
+                {'type': [f'Must be one of {", ".join(EXPORT_FORMATS)}.']}
+            )
+
+        response = StreamingHttpResponse(
+            export_recipes(self.get_queryset(), export_format),
+            content_type=EXPORT_FORMATS[export_format]
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="recipes.{export_format}"'
+
+        return response
+
+    @action(
+        methods=['POST'], detail=True, url_path='upload-image',
+        parser_classes=(uploads.ImageUploadParser,)
+    )
     def upload_image(self, request, pk=None):
-        """Upload an image to a recipe"""
+        """Upload an image to a recipe, making its variants afterwards"""
         recipe = self.get_object()
         serializer = self.get_serializer(
             recipe,
@@ -95,7 +298,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            serializer.save()
+            stale = recipe.image_variants
+            recipe = serializer.save(image_variants={})
+            images.schedule_variants(recipe, stale)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK,
@@ -105,3 +310,126 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    def _upload_response(self, upload, **kwargs):
+        """Return the state of a chunked upload"""
+        response = Response(
+            serializers.ImageUploadSerializer(upload).data, **kwargs
+        )
+        response['Upload-Offset'] = upload.offset
+
+        return response
+
+    @action(methods=['POST'], detail=True, url_path='uploads',
+            url_name='uploads')
+    def start_upload(self, request, pk=None):
+        """Start uploading an image to a recipe in chunks"""
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = uploads.start_upload(
+            recipe, serializer.validated_data['size']
+        )
+        location = reverse(
+            'recipe:recipe-upload', args=[recipe.id, upload.id],
+            request=request
+        )
+
+        return self._upload_response(
+            upload, status=status.HTTP_201_CREATED,
+            headers={'Location': location}
+        )
+
+    @action(methods=['GET', 'PATCH', 'DELETE'], detail=True,
+            url_path=f'uploads/(?P<upload_id>{UUID_PATTERN})')
+    def upload(self, request, pk=None, upload_id=None):
+        """Return, continue or cancel a chunked upload
+
+        PATCH appends the request body at the `Upload-Offset` header, and
+        returns the recipe image like `upload-image` once all is received.
+        """
+        upload = get_object_or_404(
+            ImageUpload, pk=upload_id, recipe=self.get_object()
+        )
+        if request.method == 'DELETE':
+            upload.delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if request.method == 'PATCH':
+            offset = request.META.get('HTTP_UPLOAD_OFFSET', '')
+            if not offset.isdigit():
+                raise ValidationError(
+                    {'Upload-Offset': ['Must be a non-negative integer.']}
+                )
+            recipe = uploads.append_chunk(
+                upload, int(offset), request.stream or io.BytesIO()
+            )
+            if recipe is not None:
+                return Response(serializers.RecipeImageSerializer(
+                    recipe, context=self.get_serializer_context()
+                ).data)
+
+        return self._upload_response(upload)
+
+
+class ChangeFeedView(APIView):
+    """List the changes to the user's recipes, tags and ingredients"""
+    authentication_classes = (
+        CachedTokenAuthentication, AccessTokenAuthentication
+    )
+    permission_classes = (IsAuthenticated,)
+    default_limit = 500
+    max_limit = 1000
+    feed_serializers = {
+        Change.RECIPE: serializers.RecipeSerializer,
+        Change.TAG: serializers.TagSerializer,
+        Change.INGREDIENT: serializers.IngredientSerializer,
+    }
+
+    def _load(self, feed):
+        """Return the current rows of the changed objects, by model"""
+        rows = {}
+        for name, serializer_class in self.feed_serializers.items():
+            ids = [
+                change.object_id for change in feed
+                if change.model == name and not change.deleted
+            ]
+            if ids:
+                queryset = serializer_class.Meta.model.objects.filter(
+                    user=self.request.user, id__in=ids
+                )
+                if name == Change.RECIPE:
+                    queryset = queryset.prefetch_related('tags', 'ingredients')
+                rows[name] = {row.id: row for row in queryset}
+
+        return rows
+
+    def get(self, request):
+        """Return the changes after the `since` cursor, oldest first"""
+        since = int_param(request.query_params, 'since', 0)
+        limit = int_param(
+            request.query_params, 'limit', self.default_limit, self.max_limit
+        ) or self.default_limit
+
+        feed = changes_since(request.user.id, since, limit)
+        has_more = len(feed) > limit
+        feed = feed[:limit]
+        rows = self._load(feed)
+
+        results = []
+        for change in feed:
+            row = rows.get(change.model, {}).get(change.object_id)
+            data = None
+            if row is not None:
+                data = self.feed_serializers[change.model](row).data
+            results.append({
+                'type': change.model,
+                'id': change.object_id,
+                'deleted': row is None,
+                'data': data,
+            })
+
+        return Response({
+            'cursor': feed[-1].seq if feed else since,
+            'has_more': has_more,
+            'changes': results,
+        })
@@ -0,0 +1,145 @@
+import hashlib
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.local_cache import LocalLRUCache
+from user.tokens import read_access_token
+
+# Seconds a user snapshot is kept in the shared cache, when the cache is
+# shared by every process
+CACHE_TIMEOUT = 60 * 5
+
+# Snapshots kept in each process, and for how many seconds. Other
+# processes see a revoked token after at most LOCAL_CACHE_TTL seconds.
+LOCAL_CACHE_SIZE = 10000
+LOCAL_CACHE_TTL = 1
+
+# User fields kept in snapshots, the others being loaded on access
+SNAPSHOT_FIELDS = (
+    'id', 'email', 'first_name', 'last_name', 'is_active', 'is_staff',
+    'is_superuser',
+)
+
+_snapshots = LocalLRUCache(maxsize=LOCAL_CACHE_SIZE, ttl=LOCAL_CACHE_TTL)
+
+
+def _cache_key(key):
+    """Return the shared cache key of a token, which doesn't reveal it"""
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+    return f'user:token:{digest}'
+
+
+@lru_cache(maxsize=None)
+def _snapshot_fields():
+    """Return the snapshot fields, in the model's field order"""
+    return tuple(
+        field.attname for field in get_user_model()._meta.concrete_fields
+        if field.attname in SNAPSHOT_FIELDS
+    )
+
+
+def forget_tokens(keys):
+    """Drop the cached users of tokens, in this process and the cache"""
+    keys = list(keys)
+    for key in keys:
+        _snapshots.delete(key)
+    cache.delete_many([_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication reading users from a cache
+
+    Users are cached as compact snapshots of SNAPSHOT_FIELDS: in a small
+    in-process LRU with a short TTL, then in the shared cache, and only
+    loaded with their token from the database when both miss. A cache
+    kept by each process is skipped, as deleting a snapshot there would
+    leave it in the other processes until it expires. Every
+    request gets its own user instance, whose other fields are loaded
+    from the database on access and which saves only its loaded fields.
+    Signals drop the snapshots of deleted tokens and of saved or deleted
+    users (see user.signals).
+    """
+    model = Token
+
+    def _load(self, key):
+        """Return the snapshot of a token's user, from the database"""
+        fields = _snapshot_fields()
+        try:
+            token = self.get_model().objects.select_related('user').get(
+                key=key
+            )
+        except self.get_model().DoesNotExist:
+            raise AuthenticationFailed(_('Invalid token.'))
+
+        return tuple(getattr(token.user, field) for field in fields)
+
+    def authenticate_credentials(self, key):
+        snapshot = _snapshots.get(key)
+        if snapshot is None:
+            shared = settings.CACHE_SHARED
+            snapshot = cache.get(_cache_key(key)) if shared else None
+            if snapshot is None:
+                snapshot = self._load(key)
+                if shared:
+                    cache.set(_cache_key(key), snapshot, CACHE_TIMEOUT)
+            _snapshots.set(key, None, snapshot)
+
+        User = get_user_model()
+        db = router.db_for_read(User)
+        user = User.from_db(db, _snapshot_fields(), snapshot)
+        if not user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+
+        token = self.get_model().from_db(
+            db, ['key', 'user_id'], [key, user.pk]
+        )
+        token.user = user
+
+        return user, token
+
+
+def _deferred_user(user_id):
+    """Return a user with only its ID loaded, the rest loaded on access
+
+    Loading the fields of a user that doesn't exist (anymore) fails the
+    authentication.
+    """
+    User = get_user_model()
+    user = User.from_db(router.db_for_read(User), ['id'], [user_id])
+    refresh_from_db = user.refresh_from_db
+
+    def refresh(*args, **kwargs):
+        try:
+            refresh_from_db(*args, **kwargs)
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+
+    user.refresh_from_db = refresh
+
+    return user
+
+
+class AccessTokenAuthentication(TokenAuthentication):
+    """Authentication with signed access tokens, reading no database
+
+    Clients send `Authorization: Bearer <access token>`. The user's
+    fields besides its ID are loaded from the database on access, and the
+    access tokens of a deactivated or deleted user work until they expire.
+    """
+    keyword = 'Bearer'
+
+    def authenticate_credentials(self, key):
+        user_id = read_access_token(key)
+        if user_id is None:
+            raise AuthenticationFailed(_('Invalid or expired token.'))
+
+        return _deferred_user(user_id), key
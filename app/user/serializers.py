@@ -2,6 +2,8 @@ from django.contrib.auth import get_user_model, authenticate
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
+from user.tokens import rotate_refresh_token
+
 User = get_user_model()
 
 
@@ -55,3 +57,20 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = user
         return attrs
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """Serializer for replacing a refresh token"""
+
+    refresh = serializers.CharField(trim_whitespace=False)
+
+    def validate(self, attrs):
+        """Validate the refresh token and replace it"""
+        rotated = rotate_refresh_token(attrs['refresh'])
+
+        if rotated is None:
+            msg = _('Invalid or expired refresh token')
+            raise serializers.ValidationError(msg, code='authentication')
+
+        attrs['user'], attrs['refresh'] = rotated
+        return attrs
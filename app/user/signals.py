@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import forget_tokens
+
+
+@receiver(post_delete, sender=Token)
+def token_post_delete(sender, instance, **kwargs):
+    """Stop authenticating with a deleted token at once"""
+    forget_tokens([instance.key])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_post_save(sender, instance, created, **kwargs):
+    """Drop the cached snapshots of a changed user, e.g. deactivated"""
+    if not created:
+        forget_tokens(
+            Token.objects.filter(user=instance).values_list('key', flat=True)
+        )
@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user import authentication
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating with cached tokens"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass', first_name='name'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_cached(self):
+        """Test that only the first request reads the token"""
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], 'test@example.com')
+        self.assertEqual(len(queries), 0)
+
+    @override_settings(CACHE_SHARED=True)
+    def test_shared_cache(self):
+        """Test that other processes find the user in the shared cache"""
+        self.client.get(ME_URL)
+        authentication._snapshots.delete(self.token.key)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 0)
+
+    @override_settings(CACHE_SHARED=False)
+    def test_local_memory_cache_skipped(self):
+        """Test that a cache kept by each process holds no snapshots"""
+        self.client.get(ME_URL)
+        authentication._snapshots.delete(self.token.key)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+
+    def test_invalid_token(self):
+        """Test that unknown tokens are rejected"""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_deleted(self):
+        """Test that a deleted token stops working at once"""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_deactivated(self):
+        """Test that a deactivated user is rejected at once"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_update_cached_user(self):
+        """Test that updating a cached user keeps its other fields"""
+        self.client.get(ME_URL)
+
+        res = self.client.patch(ME_URL, {'last_name': 'surname'})
+        self.user.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.user.first_name, 'name')
+        self.assertEqual(self.user.last_name, 'surname')
+        self.assertTrue(self.user.check_password('testpass'))
+        self.assertEqual(self.client.get(ME_URL).data['last_name'], 'surname')
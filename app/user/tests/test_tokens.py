@@ -0,0 +1,137 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import RefreshToken
+from user import tokens
+from user.authentication import AccessTokenAuthentication
+
+TOKEN_URL = reverse('user:token')
+REFRESH_URL = reverse('user:token-refresh')
+ME_URL = reverse('user:me')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class AccessTokenTests(TestCase):
+    """Test authenticating with access and refresh tokens"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass'
+        )
+        self.client = APIClient()
+        res = self.client.post(
+            TOKEN_URL, {'email': 'test@example.com', 'password': 'testpass'}
+        )
+        self.tokens = res.data
+
+    def _authenticate(self, access):
+        request = APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION=f'Bearer {access}'
+        )
+        return AccessTokenAuthentication().authenticate(request)
+
+    def _refresh(self, refresh):
+        return self.client.post(REFRESH_URL, {'refresh': refresh})
+
+    def test_create_tokens(self):
+        """Test that logging in gives all three tokens"""
+        self.assertIn('token', self.tokens)
+        self.assertIn('refresh', self.tokens)
+        self.assertEqual(
+            self.tokens['expires_in'], tokens.ACCESS_TOKEN_LIFETIME
+        )
+
+    def test_access_token(self):
+        """Test that access tokens authenticate without queries"""
+        with self.assertNumQueries(0):
+            user, access = self._authenticate(self.tokens['access'])
+
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.email, self.user.email)
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {self.tokens["access"]}'
+        )
+        self.assertEqual(self.client.get(TAGS_URL).status_code, 200)
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.data['email'], 'test@example.com')
+
+    def test_invalid_access_token(self):
+        """Test that tampered and expired access tokens are rejected"""
+        user_id, expires, signature = self.tokens['access'].split(':')
+        tampered = f'{user_id}:{int(expires) + 3600}:{signature}'
+        expired = tokens.create_access_token(self.user.pk)
+
+        with patch('time.time', return_value=int(expires) + 1):
+            for access in (tampered, expired, 'invalid'):
+                self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+                res = self.client.get(TAGS_URL)
+
+                self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_access_token_deleted_user(self):
+        """Test that loading a deleted user fails authentication"""
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {tokens.create_access_token(999)}'
+        )
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh(self):
+        """Test that refresh tokens are replaced on use"""
+        res = self._refresh(self.tokens['refresh'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['refresh'], self.tokens['refresh'])
+        user, _ = self._authenticate(res.data['access'])
+        self.assertEqual(user.pk, self.user.pk)
+
+        res = self._refresh(res.data['refresh'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_refresh_reused(self):
+        """Test that reusing a refresh token revokes its replacement"""
+        res = self._refresh(self.tokens['refresh'])
+        replacement = res.data['refresh']
+
+        res = self._refresh(self.tokens['refresh'])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self._refresh(replacement)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_refresh_invalid(self):
+        """Test that expired tokens and inactive users can't refresh"""
+        RefreshToken.objects.update(expires=timezone.now())
+        res = self._refresh(self.tokens['refresh'])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        refresh = tokens.create_refresh_token(self.user)
+        self.user.is_active = False
+        self.user.save()
+        res = self._refresh(refresh)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(tokens.rotate_refresh_token('invalid'), None)
+
+    def test_expired_refresh_tokens_deleted(self):
+        """Test that logging in deletes expired refresh tokens"""
+        RefreshToken.objects.update(
+            expires=timezone.now() - timedelta(days=1)
+        )
+
+        tokens.create_refresh_token(self.user)
+
+        self.assertEqual(RefreshToken.objects.count(), 1)
@@ -0,0 +1,88 @@
+import hashlib
+import secrets
+import time
+import uuid
+from datetime import timedelta
+
+from django.core import signing
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import RefreshToken
+
+# Seconds an access token is valid for
+ACCESS_TOKEN_LIFETIME = 60 * 5
+
+# Days a refresh token is valid for while unused
+REFRESH_TOKEN_LIFETIME = 30
+
+_ACCESS_SALT = 'user.tokens.access'
+
+
+def _digest(key):
+    """Return the digest a refresh token is stored as"""
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def create_access_token(user_id):
+    """Return a signed access token of a user, carrying its expiry"""
+    expires = int(time.time()) + ACCESS_TOKEN_LIFETIME
+
+    return signing.Signer(salt=_ACCESS_SALT).sign(f'{user_id}:{expires}')
+
+
+def read_access_token(token):
+    """Return the user ID of a valid access token, or None"""
+    try:
+        value = signing.Signer(salt=_ACCESS_SALT).unsign(token)
+    except signing.BadSignature:
+        return None
+
+    user_id, expires = value.split(':')
+    if int(expires) <= time.time():
+        return None
+
+    return int(user_id)
+
+
+def create_refresh_token(user, family=None):
+    """Return a new refresh token of a user, in a new family by default"""
+    now = timezone.now()
+    if family is None:
+        family = uuid.uuid4()
+        RefreshToken.objects.filter(user=user, expires__lte=now).delete()
+
+    key = secrets.token_urlsafe(32)
+    RefreshToken.objects.create(
+        digest=_digest(key),
+        user=user,
+        family=family,
+        expires=now + timedelta(days=REFRESH_TOKEN_LIFETIME)
+    )
+
+    return key
+
+
+def rotate_refresh_token(key):
+    """Return the user of a refresh token and a new token replacing it
+
+    Unknown, expired and used tokens and inactive users give None. Using a
+    token twice revokes the tokens that replaced it, as one of the two
+    users of the token must have stolen it.
+    """
+    with transaction.atomic():
+        token = RefreshToken.objects.select_for_update(of=('self',)) \
+            .select_related('user').filter(digest=_digest(key)).first()
+        if token is None:
+            return None
+        if token.used:
+            RefreshToken.objects.filter(family=token.family).delete()
+            return None
+        if token.expires <= timezone.now() or not token.user.is_active:
+            token.delete()
+            return None
+
+        token.used = True
+        token.save(update_fields=['used'])
+
+        return token.user, create_refresh_token(token.user, token.family)
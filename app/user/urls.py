@@ -1,11 +1,16 @@
 from django.urls import path
 
+from core.offload import offload
 from user import views
 
 app_name = 'user'
 
 urlpatterns = [
-    path('create/', views.CreateUserView.as_view(), name='create'),
-    path('token/', views.CreateTokenView.as_view(), name='token'),
+    path('create/', offload(views.CreateUserView.as_view()), name='create'),
+    path('token/', offload(views.CreateTokenView.as_view()), name='token'),
+    path(
+        'token/refresh/', views.RefreshTokenView.as_view(),
+        name='token-refresh'
+    ),
     path('me/', views.ManageUserView.as_view(), name='me'),
 ]
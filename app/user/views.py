@@ -1,7 +1,25 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
-from user.serializers import UserSerializer, AuthTokenSerializer
+from rest_framework.views import APIView
+from user import tokens
+from user.authentication import (
+    AccessTokenAuthentication, CachedTokenAuthentication
+)
+from user.serializers import (
+    UserSerializer, AuthTokenSerializer, RefreshTokenSerializer
+)
+
+
+def _token_pair(user, refresh):
+    """Return a new access token of a user with its refresh token"""
+    return {
+        'access': tokens.create_access_token(user.pk),
+        'refresh': refresh,
+        'expires_in': tokens.ACCESS_TOKEN_LIFETIME,
+    }
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -10,15 +28,47 @@ class CreateUserView(generics.CreateAPIView):
 
 
 class CreateTokenView(ObtainAuthToken):
-    """Create a new auth token for user"""
+    """Create a new auth token for user, with access and refresh tokens"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(
+            data=request.data, context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        token, created = Token.objects.get_or_create(user=user)
+
+        return Response({
+            'token': token.key,
+            **_token_pair(user, tokens.create_refresh_token(user)),
+        })
+
+
+class RefreshTokenView(APIView):
+    """Replace a refresh token, returning a new access token"""
+    authentication_classes = ()
+    permission_classes = ()
+    throttle_classes = ()
+
+    def post(self, request, *args, **kwargs):
+        serializer = RefreshTokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return Response(_token_pair(
+            serializer.validated_data['user'],
+            serializer.validated_data['refresh']
+        ))
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (
+        CachedTokenAuthentication, AccessTokenAuthentication
+    )
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):